@@ -1,7 +1,8 @@
 from common.layout_display import LayoutDisplayMixin
+from common.packing_base import PackingBase
+from common.occupancy_grid import criar_grid
+from common.feasibility_map import BUSCA_CONVOLUCAO, BUSCA_VARREDURA, BUSCAS, buscar_retangulo, buscar_stamp
 import copy
-import math
-import numpy as np
 
 """
 Implementa a heurística Bottom-Left Packing para otimizar a disposição de recortes dentro de uma chapa.
@@ -10,153 +11,39 @@ Implementa a heurística Bottom-Left Packing para otimizar a disposição de rec
 - Suporta peças retangulares, circulares e diamantes, incluindo rotações para melhor aproveitamento do espaço.
 - Utiliza uma matriz de ocupação (grid) para verificar colisões e garantir que as peças não se sobreponham.
 - Adiciona uma margem opcional entre os recortes para evitar cortes imprecisos ou colisões mecânicas.
+- Círculos e diamantes podem ser testados posição a posição (busca="varredura") ou por um mapa de colisões
+  calculado por convolução 2D (busca="convolucao").
+- A matriz de ocupação usa 1 byte por célula, ou 1 bit por célula com grade_compacta=True.
+- As buscas começam da primeira linha com células livres, mantida de forma incremental pelo grid.
 - Melhora a eficiência do empacotamento ao ordenar os recortes do maior para o menor antes de posicioná-los.
 """
-class BottomLeftPacking (LayoutDisplayMixin):
-    def __init__(self, sheet_width, sheet_height, recortes_disponiveis):
+class BottomLeftPacking (LayoutDisplayMixin, PackingBase):
+    def __init__(self, sheet_width, sheet_height, recortes_disponiveis, busca=BUSCA_VARREDURA, grade_compacta=False):
+        if busca not in BUSCAS:
+            raise ValueError(f"Busca desconhecida: {busca}. Opções: {', '.join(BUSCAS)}")
+
         self.sheet_width = sheet_width
         self.sheet_height = sheet_height
         self.recortes = sorted(recortes_disponiveis, key=lambda p: self.get_area(p), reverse=True)
         self.layout = []
-        self.grid = np.zeros((sheet_width, sheet_height), dtype=int)
+        self.grade_compacta = grade_compacta
+        self.grid = criar_grid(sheet_width, sheet_height, grade_compacta)
         self.margem = 1
+        self.busca = busca
 
-    def get_area(self, peca):
-        """ Retorna a área da peça """
-        if peca["tipo"] == "retangular":
-            return peca["largura"] * peca["altura"]
-        if peca["tipo"] == "circular":
-            return math.pi * (peca["r"] ** 2)
-        if peca["tipo"] == "diamante":
-            return (peca["largura"] * peca["altura"]) / 2
-        return 0
-
-    def get_bounding_box(self, peca):
-        """ Retorna a largura e altura reais da peça após rotação """
-        if peca["tipo"] == "circular":
-            return 2 * peca["r"], 2 * peca["r"]
-        
-        angulo = math.radians(peca["rotacao"])
-        largura_original = peca.get("largura", 2 * peca.get("r", 0))
-        altura_original = peca.get("altura", 2 * peca.get("r", 0))
-
-        # Calcula bounding box após rotação usando trigonometria
-        largura_rotacionada = abs(largura_original * math.cos(angulo)) + abs(altura_original * math.sin(angulo))
-        altura_rotacionada = abs(largura_original * math.sin(angulo)) + abs(altura_original * math.cos(angulo))
-
-        return int(round(largura_rotacionada)), int(round(altura_rotacionada))
-    
-    def get_rotated_vertices(self, peca, x, y):
-        """
-        Retorna os vértices reais do diamante após a rotação, preservando seu tamanho original.
-        """
-        largura = peca["largura"]
-        altura = peca["altura"]
-        cx, cy = x + largura / 2, y + altura / 2 
-        angulo = math.radians(peca["rotacao"])
-
-        # Vértices antes da rotação
-        vertices_originais = [
-            (cx, y),  # Topo
-            (x + largura, cy),  # Direita
-            (cx, y + altura),  # Base
-            (x, cy)  # Esquerda
-        ]
-
-        # Aplica rotação a cada vértice
-        vertices_rotacionados = [
-            (
-                (vx - cx) * math.cos(angulo) - (vy - cy) * math.sin(angulo) + cx,
-                (vx - cx) * math.sin(angulo) + (vy - cy) * math.cos(angulo) + cy
-            )
-            for vx, vy in vertices_originais
-        ]
-
-        return vertices_rotacionados
-    
-    def get_circle_mask(self, raio):
-        """
-        Gera uma máscara booleana para um círculo com raio 'raio' e margem self.margem.
-        A máscara terá tamanho = 2*(raio + margem) + 1 e True para os pontos dentro do círculo expandido.
-        """
-        total = raio + self.margem
-        # Cria uma grade de coordenadas
-        y, x = np.ogrid[-total:total+1, -total:total+1]
-        mask = x**2 + y**2 <= (raio + self.margem)**2
-        return mask
-
-    def cabe_no_espaco(self, peca, x, y):
+    def cabe_no_espaco(self, peca, x, y, stamp=None):
         """
         Verifica se a peça pode ser colocada sem ultrapassar os limites da chapa e sem sobreposição.
         Agora adiciona uma margem de 1 pixel entre os recortes.
+        Usa o stamp (pegada rasterizada e cacheada) da peça, compartilhado com o FlexiblePacking.
         """
+        if stamp is None:
+            stamp = self.get_stamp(peca, self.margem)
 
-        if peca["tipo"] == "circular":
-            raio = peca["r"]
-            centro_x = x + raio
-            centro_y = y + raio
-
-            # Verifica se o círculo (com margem) está dentro dos limites
-            if (centro_x - raio - self.margem < 0 or 
-                centro_x + raio + self.margem > self.sheet_width or 
-                centro_y - raio - self.margem < 0 or 
-                centro_y + raio + self.margem > self.sheet_height):
-                return False
-
-            # Obtém a máscara do círculo
-            mask = self.get_circle_mask(raio)
-            mask_shape = mask.shape
+        if not self.cabe_na_chapa(peca, stamp, x, y):
+            return False
 
-            # Determina a posição inicial da máscara no grid
-            start_x = int(round(centro_x - (raio + self.margem)))
-            start_y = int(round(centro_y - (raio + self.margem)))
-
-            # Verifica a sobreposição usando a máscara
-            for i in range(mask_shape[0]):
-                for j in range(mask_shape[1]):
-                    if mask[i, j]:
-                        grid_x = start_x + i
-                        grid_y = start_y + j
-                        if grid_x < 0 or grid_x >= self.sheet_width or grid_y < 0 or grid_y >= self.sheet_height:
-                            continue
-                        if self.grid[grid_x, grid_y] == 1:
-                            return False
-                        
-        elif peca["tipo"] == "diamante":
-            vertices = self.get_rotated_vertices(peca, x, y)
-
-            # Verifica se os vértices estão dentro dos limites da chapa
-            for vx, vy in vertices:
-                if not (self.margem <= vx < self.sheet_width - self.margem and self.margem <= vy < self.sheet_height - self.margem):
-                    return False
-
-            # Verifica sobreposição de TODO o diamante
-            min_x = max(int(min(v[0] for v in vertices)) - self.margem, 0)
-            max_x = min(int(max(v[0] for v in vertices)) + self.margem, self.sheet_width - 1)
-            min_y = max(int(min(v[1] for v in vertices)) - self.margem, 0)
-            max_y = min(int(max(v[1] for v in vertices)) + self.margem, self.sheet_height - 1)
-
-            for i in range(min_x, max_x + 1):
-                for j in range(min_y, max_y + 1):
-                    if self.is_point_inside_diamond(i, j, vertices):
-                        if self.grid[i, j] == 1:
-                            return False
-
-        else:
-            largura, altura = self.get_bounding_box(peca)
-
-            # Evita que a peça ultrapasse os limites considerando a margem
-            if x - self.margem < 0 or y - self.margem < 0 or x + largura + self.margem > self.sheet_width or y + altura + self.margem > self.sheet_height:
-                return False  
-
-            # Verifica se há sobreposição considerando a margem
-            for i in range(-self.margem, largura + self.margem):
-                for j in range(-self.margem, altura + self.margem):
-                    if 0 <= x + i < self.sheet_width and 0 <= y + j < self.sheet_height:
-                        if self.grid[x + i, y + j] == 1:
-                            return False
-
-        return True
+        return not self.grid.colide(stamp, x, y)
 
     def ajustar_posicao_para_dentro(self, peca, x, y):
         """
@@ -172,71 +59,42 @@ class BottomLeftPacking (LayoutDisplayMixin):
 
         return x, y
 
-    def marcar_ocupacao(self, peca):
+    def marcar_ocupacao(self, peca, stamp=None):
         """
         Marca a área ocupada pela peça na matriz de ocupação, garantindo uma margem de 1 pixel.
         """
-        x, y = peca["x"], peca["y"]
+        if stamp is None:
+            stamp = self.get_stamp(peca, self.margem)
 
-        if peca["tipo"] == "circular":
-            raio = peca["r"]
-            centro_x = x + raio
-            centro_y = y + raio
+        self.grid.marcar(stamp, peca["x"], peca["y"])
 
-            mask = self.get_circle_mask(raio)
-            mask_shape = mask.shape
-            start_x = int(round(centro_x - (raio + self.margem)))
-            start_y = int(round(centro_y - (raio + self.margem)))
-            
-            for i in range(mask_shape[0]):
-                for j in range(mask_shape[1]):
-                    if mask[i, j]:
-                        grid_x = start_x + i
-                        grid_y = start_y + j
-                        if 0 <= grid_x < self.sheet_width and 0 <= grid_y < self.sheet_height:
-                            self.grid[grid_x, grid_y] = 1
-
-        elif peca["tipo"] == "diamante":
-            vertices = self.get_rotated_vertices(peca, x, y)
-
-            # Calcula os limites do diamante na grade
-            min_x = max(int(min(v[0] for v in vertices)) - self.margem, 0)
-            max_x = min(int(max(v[0] for v in vertices)) + self.margem, self.sheet_width - 1)
-            min_y = max(int(min(v[1] for v in vertices)) - self.margem, 0)
-            max_y = min(int(max(v[1] for v in vertices)) + self.margem, self.sheet_height - 1)
-
-            # Preenche o interior do diamante na grade
-            for i in range(min_x, max_x + 1):
-                for j in range(min_y, max_y + 1):
-                    if self.is_point_inside_diamond(i, j, vertices):
-                        if 0 <= i < self.sheet_width and 0 <= j < self.sheet_height:
-                            self.grid[i, j] = 1
-
-        else:            
-            largura, altura = self.get_bounding_box(peca)
-
-            for i in range(-self.margem, largura + self.margem):
-                for j in range(-self.margem, altura + self.margem):
-                    if 0 <= x + i < self.sheet_width and 0 <= y + j < self.sheet_height:
-                        self.grid[x + i, y + j] = 1
-
-
-    def is_point_inside_diamond(self, px, py, vertices):
+    def buscar_posicao(self, peca, stamp, largura, altura):
         """
-        Verifica se um ponto (px, py) está dentro do diamante definido por seus vértices.
-        Utiliza a fórmula do produto vetorial para determinar se está dentro do losango.
+        Retorna a posição mais baixa e mais à esquerda em que a peça cabe, ou None.
+        Retângulos são buscados no mapa de viabilidade da imagem integral do grid; com
+        busca="convolucao", as demais peças usam o mapa de colisões calculado por convolução.
         """
-        A, B, C, D = vertices  # Vértices do diamante em ordem
+        if stamp.cheio or self.busca == BUSCA_CONVOLUCAO:
+            faixa = self.faixa_valida(peca, stamp)
+            if faixa is None:
+                return None
+
+            x_min, x_max, y_min, y_max = faixa
+            limites = self.grid.limitar_busca(stamp, max(x_min, 0), min(x_max, self.sheet_width - largura - 1),
+                                              max(y_min, 0), min(y_max, self.sheet_height - altura - 1))
 
-        def sign(p1, p2, p3):
-            return (p1[0] - p3[0]) * (p2[1] - p3[1]) - (p2[0] - p3[0]) * (p1[1] - p3[1])
+            if not stamp.cheio:
+                return buscar_stamp(self.grid.densa(), stamp, *limites)
+            return buscar_retangulo(self.grid.integral(), stamp, *limites)
 
-        b1 = sign((px, py), A, B) < 0.0
-        b2 = sign((px, py), B, C) < 0.0
-        b3 = sign((px, py), C, D) < 0.0
-        b4 = sign((px, py), D, A) < 0.0
+        # Começa da primeira linha com células livres; as anteriores já estão cheias
+        x0, x1, y0, y1 = self.grid.limitar_busca(stamp, 0, self.sheet_width - largura - 1, 0, self.sheet_height - altura - 1)
+        for y in range(y0, y1 + 1):
+            for x in range(x0, x1 + 1):
+                if self.cabe_no_espaco(peca, x, y, stamp):
+                    return x, y
 
-        return b1 == b2 == b3 == b4
+        return None
 
     def empacotar(self):
         """
@@ -255,23 +113,19 @@ class BottomLeftPacking (LayoutDisplayMixin):
             for rotacao in rotacoes:
                 peca["rotacao"] = rotacao
                 largura, altura = self.get_bounding_box(peca)
+                stamp = self.get_stamp(peca, self.margem)
 
-                for y in range(self.sheet_height - altura + self.margem - self.margem):  
-                    for x in range(self.sheet_width - largura + self.margem - self.margem): 
-                        if self.cabe_no_espaco(peca, x, y):
-                            x, y = self.ajustar_posicao_para_dentro(peca, x, y)
+                posicao = self.buscar_posicao(peca, stamp, largura, altura)
+                if posicao is not None:
+                    x, y = self.ajustar_posicao_para_dentro(peca, *posicao)
 
-                            # Atualiza a peça com novas dimensões após rotação
-                            peca["x"], peca["y"] = x, y
+                    # Atualiza a peça com novas dimensões após rotação
+                    peca["x"], peca["y"] = x, y
 
-                            self.layout.append(copy.deepcopy(peca))
-                            self.marcar_ocupacao(peca)
-                            encontrou_posicao = True
-                            break  
-                    if encontrou_posicao:
-                        break  
-                if encontrou_posicao:
-                    break  
+                    self.layout.append(copy.deepcopy(peca))
+                    self.marcar_ocupacao(peca, stamp)
+                    encontrou_posicao = True
+                    break
 
         return self.layout
 
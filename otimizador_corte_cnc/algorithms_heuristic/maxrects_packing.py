@@ -0,0 +1,181 @@
+from common.layout_display import LayoutDisplayMixin
+from common.packing_base import PackingBase
+import copy
+import math
+import numpy as np
+
+"""
+Implementa a heurística MaxRects para posicionar recortes sem rasterizar a chapa.
+
+- Mantém a lista de retângulos livres maximais da chapa; cada peça é posicionada em um deles e os
+  retângulos livres que ela intersecta são divididos, descartando os que ficam contidos em outros.
+- Regras de escolha do retângulo livre:
+    - "bottom_left": posição mais baixa (menor y) e, em seguida, mais à esquerda.
+    - "best_short_side_fit": menor sobra no lado mais curto.
+    - "best_area_fit": menor sobra de área.
+- Retângulos podem ser girados em 0 ou 90 graus; diamantes e círculos ocupam o bounding box inteiro
+  (diamantes testam rotações de 0 a 90 graus em incrementos de 10 graus).
+- A margem é respeitada expandindo cada peça pela margem em todos os lados, como nos empacotadores
+  baseados em grid: peças ficam a pelo menos 2 * margem umas das outras e a margem das bordas.
+- O custo depende do número de peças e de retângulos livres, não da resolução da chapa, e o layout
+  gerado tem o mesmo formato dos demais empacotadores.
+"""
+
+REGRAS = ("bottom_left", "best_short_side_fit", "best_area_fit")
+
+
+class MaxRectsPacking(LayoutDisplayMixin, PackingBase):
+    def __init__(self, sheet_width, sheet_height, recortes_disponiveis, regra="bottom_left", margem=1, ordenar=True):
+        if regra not in REGRAS:
+            raise ValueError(f"Regra desconhecida: {regra}. Opções: {', '.join(REGRAS)}")
+
+        self.sheet_width = sheet_width
+        self.sheet_height = sheet_height
+        self.recortes = sorted(recortes_disponiveis, key=lambda p: self.get_area(p), reverse=True) if ordenar else recortes_disponiveis
+        self.regra = regra
+        self.margem = margem
+        self.layout = []
+        self.livres = np.array([[0, 0, sheet_width, sheet_height]], dtype=np.int64)
+
+    def caixa(self, peca):
+        """
+        Retorna (deslocamento_x, deslocamento_y, largura, altura) do retângulo inteiro que contém a peça
+        na rotação atual, relativo à posição (x, y) da peça e já expandido pela margem.
+        """
+        if peca["tipo"] == "diamante":
+            vertices = self.get_rotated_vertices(peca, 0, 0)
+            min_x, max_x = math.floor(min(v[0] for v in vertices)), math.ceil(max(v[0] for v in vertices))
+            min_y, max_y = math.floor(min(v[1] for v in vertices)), math.ceil(max(v[1] for v in vertices))
+        else:
+            largura, altura = self.get_bounding_box(peca)
+            min_x, max_x, min_y, max_y = 0, largura, 0, altura
+
+        return (min_x - self.margem, min_y - self.margem,
+                max_x - min_x + 2 * self.margem, max_y - min_y + 2 * self.margem)
+
+    def pontuar(self, largura, altura):
+        """
+        Retorna os índices dos retângulos livres em que cabe um retângulo largura x altura e as
+        chaves de ordenação da regra configurada (menor é melhor), como (indices, primaria, secundaria).
+        """
+        livres = self.livres
+        indices = np.flatnonzero((livres[:, 2] >= largura) & (livres[:, 3] >= altura))
+        candidatos = livres[indices]
+
+        sobra_x = candidatos[:, 2] - largura
+        sobra_y = candidatos[:, 3] - altura
+        lado_curto = np.minimum(sobra_x, sobra_y)
+
+        if self.regra == "bottom_left":
+            return indices, candidatos[:, 1], candidatos[:, 0]
+        if self.regra == "best_short_side_fit":
+            return indices, lado_curto, np.maximum(sobra_x, sobra_y)
+        return indices, candidatos[:, 2] * candidatos[:, 3] - largura * altura, lado_curto
+
+    def dividir_livres(self, x, y, largura, altura):
+        """
+        Remove os retângulos livres intersectados pelo retângulo ocupado (x, y, largura, altura),
+        substituindo-os pelas suas sobras maximais, e descarta as sobras contidas em outro retângulo livre.
+        """
+        livres = self.livres
+        fx, fy, fw, fh = livres[:, 0], livres[:, 1], livres[:, 2], livres[:, 3]
+        intersecta = (x < fx + fw) & (fx < x + largura) & (y < fy + fh) & (fy < y + altura)
+        if not intersecta.any():
+            return
+
+        f = livres[intersecta]
+        fx, fy, fw, fh = f[:, 0], f[:, 1], f[:, 2], f[:, 3]
+        sobras = [
+            _retangulos(fx, fy, x - fx, fh)[x > fx],
+            _retangulos(x + largura, fy, fx + fw - (x + largura), fh)[x + largura < fx + fw],
+            _retangulos(fx, fy, fw, y - fy)[y > fy],
+            _retangulos(fx, y + altura, fw, fy + fh - (y + altura))[y + altura < fy + fh]
+        ]
+        novos = np.concatenate(sobras)
+        mantidos = livres[~intersecta]
+
+        # Os retângulos mantidos já não se contêm entre si; basta descartar os novos contidos em outros
+        todos = np.concatenate([mantidos, novos])
+        nx, ny = novos[:, 0:1], novos[:, 1:2]
+        nx1, ny1 = nx + novos[:, 2:3], ny + novos[:, 3:4]
+        tx, ty = todos[None, :, 0], todos[None, :, 1]
+        tx1, ty1 = tx + todos[None, :, 2], ty + todos[None, :, 3]
+        contido = (tx <= nx) & (ty <= ny) & (nx1 <= tx1) & (ny1 <= ty1)
+
+        # Um novo retângulo não conta como contido em si mesmo; entre duplicatas, mantém a primeira
+        indices_novos = np.arange(len(novos))
+        posicao_propria = len(mantidos) + indices_novos
+        contido[indices_novos, posicao_propria] = False
+        duplicata_posterior = (np.arange(len(todos))[None, :] > posicao_propria[:, None]) & \
+            (tx == nx) & (ty == ny) & (tx1 == nx1) & (ty1 == ny1)
+        contido &= ~duplicata_posterior
+
+        self.livres = np.concatenate([mantidos, novos[~contido.any(axis=1)]])
+
+    def empacotar(self):
+        """ Posiciona as peças nos retângulos livres segundo a regra configurada. """
+
+        self.layout = []
+        self.livres = np.array([[0, 0, self.sheet_width, self.sheet_height]], dtype=np.int64)
+
+        for peca in self.recortes:
+            if peca["tipo"] == "retangular":
+                rotacoes = [0, 90] if peca["largura"] != peca["altura"] else [0]
+            else:
+                rotacoes = [0] if peca["tipo"] == "circular" else range(0, 100, 10)
+
+            melhor = None
+            for rotacao in rotacoes:
+                peca["rotacao"] = rotacao
+                dx, dy, largura, altura = self.caixa(peca)
+                indices, primaria, secundaria = self.pontuar(largura, altura)
+                if indices.size == 0:
+                    continue
+
+                escolhido = np.lexsort((secundaria, primaria))[0]
+                chave = (primaria[escolhido], secundaria[escolhido])
+                if melhor is None or chave < melhor[0]:
+                    livre = self.livres[indices[escolhido]]
+                    melhor = (chave, rotacao, int(livre[0]), int(livre[1]), dx, dy, largura, altura)
+
+            if melhor is None:
+                continue
+
+            _, rotacao, x, y, dx, dy, largura, altura = melhor
+            peca["rotacao"] = rotacao
+            peca["x"], peca["y"] = x - dx, y - dy
+            self.layout.append(copy.deepcopy(peca))
+            self.dividir_livres(x, y, largura, altura)
+
+        return self.layout
+
+def _retangulos(x, y, largura, altura):
+    """ Monta uma matriz (n, 4) de retângulos a partir de colunas (escalares são replicados). """
+    return np.stack(np.broadcast_arrays(x, y, largura, altura), axis=1)
+
+def main():
+
+    recortes_disponiveis = [
+        {"tipo": "retangular", "largura": 29, "altura": 29, "x": 1, "y": 1, "rotacao": 0},
+        {"tipo": "retangular", "largura": 29, "altura": 29, "x": 31, "y": 1, "rotacao": 0},
+        {"tipo": "retangular", "largura": 29, "altura": 29, "x": 1, "y": 31, "rotacao": 0},
+        {"tipo": "retangular", "largura": 29, "altura": 29, "x": 1, "y": 69, "rotacao": 0},
+        {"tipo": "retangular", "largura": 139, "altura": 29, "x": 60, "y": 70, "rotacao": 0},
+        {"tipo": "retangular", "largura": 60, "altura": 8, "x": 66, "y": 52, "rotacao": 0},
+        {"tipo": "retangular", "largura": 44, "altura": 4, "x": 117, "y": 39, "rotacao": 0},
+        {"tipo": "diamante", "largura": 29, "altura": 48, "x": 32, "y": 31, "rotacao": 0},
+        {"tipo": "diamante", "largura": 29, "altura": 48, "x": 62, "y": 2, "rotacao": 0},
+        {"tipo": "diamante", "largura": 29, "altura": 48, "x": 94, "y": 2, "rotacao": 0},
+        {"tipo": "circular", "r": 16, "x": 124, "y": 2},
+        {"tipo": "circular", "r": 16, "x": 158, "y": 2}
+    ]
+
+    for regra in REGRAS:
+        packing = MaxRectsPacking(sheet_width=200, sheet_height=100, recortes_disponiveis=copy.deepcopy(recortes_disponiveis), regra=regra)
+        novo_layout = packing.empacotar()
+
+        print(f"Novo Layout ({regra}): {len(novo_layout)} de {len(recortes_disponiveis)} recortes posicionados")
+        packing.display_layout(novo_layout, title=f"Novo Layout - MaxRects ({regra})")
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,139 @@
 from common.layout_display import LayoutDisplayMixin
 from flexible_packing import FlexiblePacking
+from geometric_packing import GeometricPacking
+from multi_sheet_packing import MultiSheetPacking
 from common.packing_base import PackingBase
-import random
-import copy
-import time
+from common.occupancy_grid import criar_grid
+from common.layout_cache import LayoutCache
+from common.packing_checkpoints import PackingCheckpoints
+from common.piece import CIRCULAR, DIAMANTE, RETANGULAR, dicts_de_pecas, pecas_de_dicts
+from common.piece_table import SharedGrids, SharedPieceTable, tabela_de_pecas
+from common.instrumentation import Instrumentacao, criar_instrumentacao
+from common.rotation import ANGULOS_ROTACAO
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+import cProfile
+import json
+import logging
+import multiprocessing
 import numpy as np
+import os
+import time
+
+# Mensagens do otimizador. Sem configuração de logging, nada é exibido (a aplicação escolhe o nível
+# e os handlers, por exemplo com logging.basicConfig(level=logging.INFO)):
+# - INFO: resumo de cada iteração (o registro carrega os campos de record_iteration como atributos),
+#   parada antecipada ou por prazo e relatório final da execução;
+# - DEBUG: inicialização e cada layout construído pelas formigas.
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+# Colônia usada pelos processos de trabalho do modo paralelo. É criada uma única vez por
+# processo (em _init_worker), com a configuração da chapa e as tabelas compartilhadas.
+_worker_colony = None
+
+# Opções de varredura da chapa: nome -> (varrer_esquerda_direita, varrer_cima_baixo).
+# A ordem das opções é a ordem das posições em pheromones_scan (e de DIRECTIONS em pheromones_direction).
+SCAN_OPTIONS = {
+    "left_to_right_top_to_bottom": (True, True),
+    "right_to_left_bottom_to_top": (False, False),
+    "left_to_right_bottom_to_top": (True, False),
+    "right_to_left_top_to_bottom": (False, True)
+}
+SCAN_NAMES = tuple(SCAN_OPTIONS)
+DIRECTIONS = ("horizontal", "vertical")
+ANGLE_INDEX = {angle: i for i, angle in enumerate(ANGULOS_ROTACAO)}
+
+# Variantes do ACO: Ant System (todas as formigas depositam), elitista, por ranking e Max-Min Ant System
+ANT_SYSTEM, ELITIST, RANK_BASED, MAX_MIN = "ant_system", "elitist", "rank", "mmas"
+VARIANTS = (ANT_SYSTEM, ELITIST, RANK_BASED, MAX_MIN)
+
+# Geometria do empacotamento: grid de ocupação (FlexiblePacking) ou geometria contínua (GeometricPacking)
+RASTER, CONTINUOUS = "raster", "continuous"
+GEOMETRIES = (RASTER, CONTINUOUS)
+
+# Profilers que podem ser ligados por iteração (pyinstrument é opcional e importado só quando usado)
+PROFILERS = ("cprofile", "pyinstrument")
+
+# Probabilidade de uma formiga sortear novas rotações para as peças (senão, mantém as rotações de entrada)
+RANDOM_ROTATION_RATE = 0.1
+
+def _init_worker(config, shared, slot_counter):
+    """
+    Inicializa um processo de trabalho: anexa a tabela de peças, a tabela de resultados e os grids
+    de rascunho compartilhados (enviados apenas pelo nome) e reserva um grid de rascunho para o processo.
+    """
+    global _worker_colony
+    _worker_colony = AntColony.__new__(AntColony)
+    _worker_colony.__dict__.update(config)
+    _worker_colony.layout_cache = LayoutCache(config["layout_cache_size"])
+    _worker_colony.layout_cache.entradas.update(config.pop("layout_cache_entries"))
+    _worker_colony.checkpoints = _worker_colony.create_checkpoints()
+    _worker_colony.instrumentation = criar_instrumentacao(config["instrumentation"])
+
+    pieces_ref, results_ref, grids_ref = shared
+    pieces = SharedPieceTable.anexar(pieces_ref)
+    grids = SharedGrids.anexar(grids_ref)
+    with slot_counter.get_lock():
+        slot = slot_counter.value
+        slot_counter.value += 1
+
+    _worker_colony.initial_layout = pieces.pecas()
+    _worker_colony.initial_pieces = pecas_de_dicts(_worker_colony.initial_layout)
+    _worker_colony.shared_results = SharedPieceTable.anexar(results_ref)
+    _worker_colony.scratch_grid = grids.grade(slot)
+    _worker_colony.shared_blocks = (pieces, grids)
+
+def _build_ant_worker(task):
+    """
+    Constrói e avalia, em um processo de trabalho, a solução de uma formiga a partir das decisões
+    sorteadas pela colônia. O layout é escrito na linha da formiga na tabela de resultados
+    compartilhada, e apenas o seu tamanho é devolvido.
+    """
+    ant, decision = task
+    solution = _worker_colony.construct_and_evaluate(ant, decision)
+
+    layout = solution.pop("layout")
+    tabela_de_pecas(layout, _worker_colony.shared_results.tabela[ant])
+    solution["layout"] = None
+    solution["layout_size"] = len(layout)
+
+    # Tempos e contadores desta formiga, somados à instrumentação da colônia
+    if _worker_colony.instrumentation.ativa:
+        solution["instrumentation"] = _worker_colony.instrumentation.extrair()
+    return solution
+
+def roulette_select(weights, u):
+    """
+    Seleção por roleta vetorizada sobre o último eixo de weights: para cada linha, retorna o índice i
+    com probabilidade weights[..., i] / sum(weights[...]), a partir do número uniforme correspondente
+    em u (em [0, 1), com a forma de weights sem o último eixo, ou compatível por broadcast).
+    Pesos negativos contam como nulos, e pesos nulos nunca são escolhidos; linhas com soma nula
+    escolhem o índice 0.
+    """
+    cumulative = np.cumsum(np.maximum(weights, 0.0), axis=-1)
+    total = cumulative[..., -1]
+    choice = np.sum(cumulative <= (u * total)[..., None], axis=-1)
+    # u * total pode arredondar para total: limita a escolha ao último índice com peso positivo
+    choice = np.minimum(choice, np.argmax(cumulative >= total[..., None], axis=-1))
+    return np.where(total > 0, choice, 0)
+
+def _evaluate_worker(task):
+    """ Avalia, em um processo de trabalho, o layout guardado em tabela[inicio:fim] de uma tabela compartilhada. """
+
+    reference, start, end = task
+    table = SharedPieceTable.anexar(reference)
+    try:
+        layout = table.pecas(slice(start, end))
+    finally:
+        table.fechar()
+    return _worker_colony.evaluate_layout(layout)
 
 class AntColony(LayoutDisplayMixin, PackingBase):
-    def __init__(self, num_ants, num_iterations, sheet_width, sheet_height, recortes_disponiveis):
+    def __init__(self, num_ants, num_iterations, sheet_width, sheet_height, recortes_disponiveis, num_workers=1, seed=None, compact_grid=False, multi_sheet=False,
+                 layout_cache_size=1024, layout_cache_file=None, checkpoint_budget_mb=64,
+                 order_alpha=1.0, order_beta=2.0, variant=ANT_SYSTEM, evap_factor=0.9, elitist_weight=None, rank_size=6,
+                 mmas_min_ratio=None, stagnation_limit=None, target_utilization=None, time_limit=None,
+                 instrumentation=False, profiler=None, profile_dir="profiles", metrics_file=None, geometry=RASTER):
         """
         Initializes the Ant Colony optimizer.
         :param num_ants: Number of ants.
@@ -15,222 +141,667 @@ class AntColony(LayoutDisplayMixin, PackingBase):
         :param sheet_width: Width of the cutting sheet.
         :param sheet_height: Height of the cutting sheet.
         :param recortes_disponiveis: List of available parts (JSON structure).
+        :param num_workers: Number of worker processes used to build the ants of each iteration (1 = sequential).
+        :param seed: Seed of the numpy.random.Generator that samples the decisions of all ants (None = random seed per run).
+        :param compact_grid: Use bit-packed occupancy grids (1 bit per cell) for packing and evaluation.
+        :param multi_sheet: Overflow pieces that do not fit to new sheets and minimize the number of sheets used.
+        :param layout_cache_size: Maximum number of layouts memoized by decision vector (0 = disabled).
+        :param layout_cache_file: Optional file where the layout cache is loaded from and saved to at the end of run().
+        :param checkpoint_budget_mb: Memory budget (MB) of the packing checkpoints shared by ants with a common
+            piece prefix (0 = disabled).
+        :param order_alpha: Weight of the position x piece pheromone when sampling the piece order.
+        :param order_beta: Weight of the piece visibility (bounding-box area) when sampling the piece order.
+        :param variant: Pheromone update rule: "ant_system" (every ant deposits), "elitist" (plus an extra deposit
+            of the best-so-far solution), "rank" (only the best ants deposit, weighted by rank) or "mmas"
+            (Max-Min Ant System: only the best-so-far solution deposits and trails are kept within bounds).
+        :param evap_factor: Fraction of the pheromone kept after each iteration's evaporation.
+        :param elitist_weight: Weight of the best-so-far deposit in the elitist variant (None = num_ants).
+        :param rank_size: Rank-based variant: the best rank_size - 1 ants of the iteration and the best-so-far
+            solution deposit, with weights rank_size - rank and rank_size.
+        :param mmas_min_ratio: MMAS lower bound as a fraction of the upper bound (None = 1 / (2 * number of pieces)).
+        :param stagnation_limit: Stop after this many iterations without improving the best quality (None = never).
+        :param target_utilization: Stop once the best layout reaches this area utilization (placed area over the
+            area of the sheets used, between 0 and 1; None = never).
+        :param time_limit: Default wall-clock budget of run() in seconds, checked between ants (None = no limit).
+        :param instrumentation: Collect named timers (sampling, packing, search, marking, evaluation, pheromones)
+            and counters (rotations and positions tested, cabe_no_espaco calls, pieces resumed from checkpoints)
+            per iteration. Worker timers are summed, so in parallel mode they add up CPU time of all processes.
+        :param profiler: Profile each iteration of the main process with "cprofile" or "pyinstrument" (None = off).
+        :param profile_dir: Directory where the per-iteration profiles are written.
+        :param metrics_file: Optional JSON lines file that receives one metrics record per iteration.
+        :param geometry: Collision model of the packer: "raster" (occupancy grid, FlexiblePacking) or "continuous"
+            (exact convex geometry with a spatial hash, GeometricPacking; compact_grid and checkpoints do not apply).
         """
-        print("Ant Colony para Otimização do Corte de Chapa. Executado por Iad.")
+        if variant not in VARIANTS:
+            raise ValueError(f"Variante desconhecida: {variant}. Opções: {', '.join(VARIANTS)}")
+        if geometry not in GEOMETRIES:
+            raise ValueError(f"Geometria desconhecida: {geometry}. Opções: {', '.join(GEOMETRIES)}")
+        if profiler is not None and profiler not in PROFILERS:
+            raise ValueError(f"Profiler desconhecido: {profiler}. Opções: {', '.join(PROFILERS)}")
+
+        logger.debug("Ant Colony para Otimização do Corte de Chapa. Executado por Iad.")
 
         self.num_ants = num_ants
         self.num_iterations = num_iterations
         self.sheet_width = sheet_width
         self.sheet_height = sheet_height
         self.initial_layout = recortes_disponiveis
+        self.initial_pieces = pecas_de_dicts(recortes_disponiveis)
+        self.order_alpha = order_alpha
+        self.order_beta = order_beta
+        self.order_visibility = self.order_heuristic()
+        self.variant = variant
+        self.evap_factor = evap_factor
+        self.elitist_weight = num_ants if elitist_weight is None else elitist_weight
+        self.rank_size = rank_size
+        self.mmas_min_ratio = mmas_min_ratio if mmas_min_ratio is not None else 1.0 / (2 * max(len(recortes_disponiveis), 1))
+        self.stagnation_limit = stagnation_limit
+        self.target_utilization = target_utilization
+        self.time_limit = time_limit
+        self.instrumentation = criar_instrumentacao(instrumentation)
+        self.profiler = profiler
+        self.profile_dir = profile_dir
+        self.metrics_file = metrics_file
+        self.iteration_metrics = []
+        self.instrumentation_totals = None
+        self.num_workers = num_workers
+        self.seed = seed
+        self.compact_grid = compact_grid
+        self.multi_sheet = multi_sheet
+        self.geometry = geometry
+        self.layout_cache_size = layout_cache_size
+        self.layout_cache = LayoutCache(layout_cache_size, layout_cache_file)
+        self.checkpoint_budget_mb = checkpoint_budget_mb
+        self.checkpoints = self.create_checkpoints()
+        self.scratch_grid = None
+        self.shared_blocks = None
         self.optimized_layout = None
         self.optimized_solution = None
-        print("Ant Colony Optimization Initialized.")
+        self.stop_reason = None
+        self.iterations_run = 0
+        logger.debug("Ant Colony Optimization Initialized.")
 
     def initialize_pheromones(self):
         """
-        Inicializa as estruturas de feromônio para as decisões:
-          - Configuração de varredura: opções para a ordem de varredura da chapa.
-          - Ordem dos recortes: uma lista de feromônios, um para cada recorte.
-          - Rotação: níveis de feromônio para cada ângulo possível (0, 10, ..., 90).
-          - Direção de priorização: define se a busca será priorizada horizontalmente ou verticalmente.
+        Inicializa as estruturas de feromônio para as decisões, todas como arrays do NumPy:
+          - Configuração de varredura: um nível por opção de SCAN_NAMES.
+          - Ordem dos recortes: uma matriz de feromônios posição x recorte (tau[k, j] favorece
+            colocar o recorte j na k-ésima posição da ordem de empacotamento).
+          - Rotação: uma tabela recorte x ângulo (0, 10, ..., 90). Só os ângulos permitidos para o tipo
+            do recorte começam com feromônio (retângulos: 0 e 90; círculos: 0; diamantes: todos);
+            os demais ficam em 0 e nunca são sorteados.
+          - Direção de priorização: um nível por opção de DIRECTIONS (horizontal ou vertical).
         Inicializamos todos os níveis com 1.0.
         """
+        num_pieces = len(self.initial_pieces)
+        self.pheromones_scan = np.ones(len(SCAN_NAMES))
+        self.pheromones_order = np.ones((num_pieces, num_pieces))
+        self.pheromones_direction = np.ones(len(DIRECTIONS))
 
-        self.pheromones_scan = {
-            "left_to_right_top_to_bottom": 1.0,
-            "right_to_left_bottom_to_top": 1.0,
-            "left_to_right_bottom_to_top": 1.0,
-            "right_to_left_top_to_bottom": 1.0
-        }
-        self.pheromones_order = [1.0 for _ in range(len(self.initial_layout))]
-        self.pheromones_rotation = {angle: 1.0 for angle in range(0, 100, 10)}
-        self.pheromones_direction = {"horizontal": 1.0, "vertical": 1.0}
-
-    def construct_solution(self, ant):
-        # 1. Seleção da configuração de varredura
-        scan_options = list(self.pheromones_scan.keys())
-        scan_weights = [self.pheromones_scan[opt] for opt in scan_options]
-        selected_scan = random.choices(scan_options, weights=scan_weights, k=1)[0]
-        
-        if selected_scan == "left_to_right_top_to_bottom":
-            varrer_esquerda_direita = True
-            varrer_cima_baixo = True
-        elif selected_scan == "right_to_left_bottom_to_top":
-            varrer_esquerda_direita = False
-            varrer_cima_baixo = False
-        elif selected_scan == "left_to_right_bottom_to_top":
-            varrer_esquerda_direita = True
-            varrer_cima_baixo = False
-        elif selected_scan == "right_to_left_top_to_bottom":
-            varrer_esquerda_direita = False
-            varrer_cima_baixo = True
-
-        # 2. Ordenação dos recortes
-        recortes = copy.deepcopy(self.initial_layout)
-        recortes.sort(key=lambda p: self.get_area(p), reverse=True)
+        codes = np.array([peca.codigo for peca in self.initial_pieces], dtype=int)
+        self.pheromones_rotation = np.zeros((num_pieces, len(ANGULOS_ROTACAO)))
+        self.pheromones_rotation[:, ANGLE_INDEX[0]] = 1.0
+        self.pheromones_rotation[codes == RETANGULAR, ANGLE_INDEX[90]] = 1.0
+        self.pheromones_rotation[codes == DIAMANTE] = 1.0
+        self.rotation_allowed = self.pheromones_rotation > 0
+
+        # Limites (mínimo, máximo) dos feromônios no MMAS, definidos a partir da primeira solução
+        self.pheromone_bounds = None
+
+    def sample_decisions(self, rng):
+        """
+        Sorteia, de uma só vez, as decisões de todas as formigas da iteração com o gerador rng
+        (numpy.random.Generator): varredura, direção, ordem dos recortes e, com probabilidade
+        RANDOM_ROTATION_RATE, novas rotações para os recortes. Retorna uma lista com as decisões de
+        cada formiga; "rotations" é a rotação de cada recorte de initial_layout, ou None para manter as de entrada.
+        """
+        num_ants = self.num_ants
+        num_pieces = len(self.initial_pieces)
+
+        scans = roulette_select(self.pheromones_scan, rng.random(num_ants))
+        directions = roulette_select(self.pheromones_direction, rng.random(num_ants))
+        orders = self.sample_orders(rng, num_ants)
+        random_rotation = rng.random(num_ants) < RANDOM_ROTATION_RATE
+        angles = np.asarray(ANGULOS_ROTACAO)[roulette_select(self.pheromones_rotation, rng.random((num_ants, num_pieces)))]
+
+        return [{
+            "scan": SCAN_NAMES[scans[ant]],
+            "direction": DIRECTIONS[directions[ant]],
+            "order": orders[ant].tolist(),
+            "rotations": angles[ant].tolist() if random_rotation[ant] else None
+        } for ant in range(num_ants)]
+
+    def construct_solution(self, decision):
+        """
+        Constrói o layout de uma formiga a partir das decisões sorteadas em sample_decisions.
+        O empacotamento é determinístico: as mesmas decisões geram sempre o mesmo layout.
+        """
+        # 1. Configuração de varredura
+        selected_scan = decision["scan"]
+        varrer_esquerda_direita, varrer_cima_baixo = SCAN_OPTIONS[selected_scan]
+
+        # 2. Ordenação dos recortes (cópias dos Pieces de entrada, sem deepcopy)
+        order = decision["order"]
+        recortes = [self.initial_pieces[i].copia() for i in order]
         
-        # 3. Escolha da rotação para cada recorte
-        if random.random() < 0.1:
-            for peca in recortes:
-                if peca["tipo"] ==  "diamante":
-                    angles = list(self.pheromones_rotation.keys())
-                    rotation_weights = [self.pheromones_rotation[angle] for angle in angles]
-                    peca["rotacao"] = random.choices(angles, weights=rotation_weights, k=1)[0]
-                elif peca["tipo"] == "retangular":
-                    angles = [0,90]
-                    rotation_weights = [self.pheromones_rotation[angle] for angle in angles]
-                    peca["rotacao"] = random.choices(angles, weights=rotation_weights, k=1)[0]
-                else:
-                    peca["rotacao"] = 0
-
-        # 4. Seleção da priorização com base no feromônio
-        direction_choice = random.choices(
-            ["horizontal", "vertical"],
-            weights=[self.pheromones_direction["horizontal"], self.pheromones_direction["vertical"]],
-            k=1
-        )[0]
+        # 3. Rotação de cada recorte (a tabela de feromônios já restringe os ângulos de cada tipo)
+        if decision["rotations"] is not None:
+            for i, peca in zip(order, recortes):
+                peca.rotacao = decision["rotations"][i]
+
+        # 4. Priorização horizontal ou vertical
+        direction_choice = decision["direction"]
         priorizar_horizontal = (direction_choice == "horizontal")
 
-        # 5. Constrói o layout com FlexiblePacking
-        gerar_layout = FlexiblePacking(
-            sheet_width=self.sheet_width,
-            sheet_height=self.sheet_height,
-            recortes_disponiveis=recortes,
+        # O layout depende só das decisões acima: reaproveita o layout memorizado, se houver
+        cache_key = self.decision_key(selected_scan, direction_choice, recortes)
+        cached = self.layout_cache.obter(cache_key) if self.layout_cache_size > 0 else None
+        if cached is not None:
+            layout, quality, rotations = cached
+            return {"layout": [dict(peca) for peca in layout], "scan": selected_scan, "direction": direction_choice,
+                    "order": order, "rotation": self.rotation_from_sequence(order, rotations), "cache_key": cache_key,
+                    "quality": quality}
+
+        # 5. Constrói o layout com FlexiblePacking ou GeometricPacking (em várias chapas no modo multi_sheet)
+        opcoes = dict(
             varrer_esquerda_direita=varrer_esquerda_direita,
             varrer_cima_baixo=varrer_cima_baixo,
             priorizar_horizontal=priorizar_horizontal,
-            margem=1
+            margem=1,
+            instrumentacao=self.instrumentation
         )
-        layout = gerar_layout.empacotar()
-        
-        print('Layout criado!')
+        if self.geometry == RASTER:
+            packer_class = FlexiblePacking
+            opcoes.update(grade_compacta=self.compact_grid, grade=self.scratch_grid, checkpoints=self.checkpoints)
+        else:
+            packer_class = GeometricPacking
+        if self.multi_sheet:
+            opcoes["empacotador"] = packer_class
+            packer_class = MultiSheetPacking
+        gerar_layout = packer_class(self.sheet_width, self.sheet_height, recortes, **opcoes)
+        with self.instrumentation.cronometro("empacotamento"):
+            layout = gerar_layout.empacotar()
+
+        # Rotação efetivamente usada por cada recorte posicionado (o empacotador altera as cópias)
+        unplaced = {id(peca) for peca in gerar_layout.nao_posicionados}
+        rotation = {i: peca.rotacao for i, peca in zip(order, recortes) if peca.codigo != CIRCULAR and id(peca) not in unplaced}
+        logger.debug("Layout criado!")
         # Retorne o layout juntamente com as escolhas feitas
-        return {"layout": layout, "scan": selected_scan, "direction": direction_choice}
+        return {"layout": layout, "scan": selected_scan, "direction": direction_choice, "order": order,
+                "rotation": rotation, "cache_key": cache_key}
 
+    def order_heuristic(self):
+        """
+        Visibilidade de cada recorte na construção da ordem: a área do bounding box (a região que ele
+        bloqueia na chapa), normalizada e elevada a order_beta. Favorece posicionar as peças grandes primeiro,
+        como a ordenação por área usada antes dos feromônios de ordem.
+        """
+        areas = np.array([float(np.prod(self.get_bounding_box(peca))) for peca in self.initial_pieces])
+        if areas.size == 0 or areas.max() <= 0:
+            return np.ones(len(areas))
+        return (areas / areas.max()) ** self.order_beta
 
-    def update_pheromones(self, solutions):
+    def sample_orders(self, rng, num_ants):
         """
-        Atualiza os níveis de feromônio com base nas soluções construídas pelas formigas.
-        Para cada solução, deposita uma quantidade de feromônio proporcional à sua qualidade.
-        Aqui, assumimos que uma solução melhor tem um valor de qualidade (fitness) maior.
-        Atualizamos os feromônios das decisões (varredura, ordem e rotação) que levaram à solução.
+        Amostra a ordem de empacotamento dos recortes para num_ants formigas, posição a posição e
+        todas as formigas juntas: o recorte da posição k de cada formiga é escolhido entre os que ela
+        ainda não usou por roleta, com peso tau[k, j] ** order_alpha * visibilidade[j].
+        Retorna um array formigas x recortes com os índices (em initial_layout) na ordem escolhida.
+        """
+        num_pieces = len(self.initial_pieces)
+        # Pesos não negativos: com feromônio negativo, a roleta poderia escolher um recorte já usado (e
+        # a potência fracionária de order_alpha daria NaN)
+        weights = np.maximum(self.pheromones_order, 0.0) ** self.order_alpha * self.order_visibility
+        available = np.ones((num_ants, num_pieces))
+        orders = np.empty((num_ants, num_pieces), dtype=int)
+        ants = np.arange(num_ants)
+
+        # Buffers reaproveitados a cada posição: pesos acumulados por formiga e a comparação com o sorteio
+        cumulative = np.empty((num_ants, num_pieces))
+        below = np.empty((num_ants, num_pieces), dtype=bool)
+
+        for position in range(num_pieces):
+            np.multiply(available, weights[position], out=cumulative)
+            np.cumsum(cumulative, axis=1, out=cumulative)
+
+            # Feromônios totalmente evaporados para os restantes: escolha uniforme entre eles
+            empty = cumulative[:, -1] <= 0
+            if empty.any():
+                cumulative[empty] = np.cumsum(available[empty], axis=1)
+
+            threshold = rng.random(num_ants) * cumulative[:, -1]
+            np.less_equal(cumulative, threshold[:, None], out=below)
+            choice = np.count_nonzero(below, axis=1)
+            # Como em roulette_select, a escolha fica limitada ao último recorte disponível com peso positivo
+            # (o sorteio pode arredondar para o total), então nunca repete um recorte já usado
+            np.greater_equal(cumulative, cumulative[:, -1:], out=below)
+            np.minimum(choice, np.argmax(below, axis=1), out=choice)
+            orders[:, position] = choice
+            available[ants, choice] = 0.0
+
+        return orders
+
+    def create_checkpoints(self):
+        """
+        Cria a trie de checkpoints de empacotamento (ou None, se desativada). Formigas com o mesmo
+        prefixo de peças e rotações retomam o empacotamento do estado salvo por uma formiga anterior.
+        Cada processo de trabalho tem a sua.
         """
-        for sol in solutions:
+        if not self.checkpoint_budget_mb:
+            return None
+        return PackingCheckpoints(int(self.checkpoint_budget_mb * 1024 * 1024))
+
+    def decision_key(self, selected_scan, direction_choice, recortes):
+        """
+        Chave do cache de layouts: hash das decisões da formiga (varredura, direção e peças na ordem
+        de empacotamento, com suas rotações) e da instância (chapa, modo de várias chapas e geometria).
+        """
+        pieces = tuple((peca.codigo, peca.largura, peca.altura, peca.r, peca.rotacao) for peca in recortes)
+        return LayoutCache.chave((self.sheet_width, self.sheet_height, self.multi_sheet, self.geometry,
+                                  selected_scan, direction_choice, pieces))
+
+    @staticmethod
+    def rotation_sequence(order, rotation):
+        """
+        Rotações usadas na ordem de empacotamento (None para recortes não posicionados e círculos), como
+        são guardadas no cache de layouts. A chave do cache só descreve as peças de cada posição, então
+        outra formiga pode reaproveitar a entrada com peças idênticas vindas de outros índices.
+        """
+        return tuple(rotation.get(i) for i in order)
+
+    @staticmethod
+    def rotation_from_sequence(order, rotations):
+        """ Converte as rotações por posição do cache em {índice do recorte: rotação} para a ordem da formiga. """
+        return {i: angle for i, angle in zip(order, rotations) if angle is not None}
+
+
+    def construct_and_evaluate(self, ant, decision):
+        """
+        Constrói a solução de uma formiga a partir das suas decisões, avalia sua qualidade e
+        retorna as informações usadas na atualização dos feromônios, junto com o tempo gasto.
+        """
+        start_time = time.time()
+
+        sol = self.construct_solution(decision)
+        layout = sol["layout"]
+        cache_hit = "quality" in sol
+        if cache_hit:
             quality = sol["quality"]
-            # Atualiza feromônios para a configuração de varredura
-            selected_scan = sol["scan"]
-            self.pheromones_scan[selected_scan] += quality
+        else:
+            with self.instrumentation.cronometro("avaliacao"):
+                quality = self.evaluate_layout(layout, from_packer=True)
+            if self.layout_cache_size > 0:
+                self.layout_cache.guardar(sol["cache_key"], dicts_de_pecas(layout), quality,
+                                          self.rotation_sequence(sol["order"], sol["rotation"]))
+
+        return {
+            "layout": layout,
+            "scan": sol["scan"],
+            "rotation": sol["rotation"],
+            "direction": sol["direction"],
+            "order": sol["order"],
+            "quality": quality,
+            "cache_key": sol["cache_key"],
+            "cache_hit": cache_hit,
+            "time": time.time() - start_time
+        }
+
+    def build_ants(self, executor, rng, deadline=None, wait_first=False):
+        """
+        Constrói e avalia as formigas de uma iteração, em paralelo se houver executor (um gerador).
+        As decisões de todas as formigas são sorteadas de uma vez na colônia, com o gerador rng,
+        de modo que o resultado não depende do número de processos de trabalho; os processos
+        recebem apenas as decisões. As soluções são produzidas na ordem das formigas, assim que
+        ficam prontas. No modo paralelo, os layouts ficam na tabela de resultados compartilhada até
+        serem lidos com solution_layout.
+        Se o instante deadline (time.time()) for atingido, as formigas restantes são descartadas;
+        com wait_first=True, a primeira formiga é aguardada mesmo depois do prazo.
+        """
+        with self.instrumentation.cronometro("amostragem"):
+            decisions = self.sample_decisions(rng)
+
+        if executor is None:
+            for ant, decision in enumerate(decisions):
+                if deadline is not None and time.time() >= deadline and not (wait_first and ant == 0):
+                    return
+                yield self.construct_and_evaluate(ant, decision)
+            return
+
+        futures = [executor.submit(_build_ant_worker, task) for task in enumerate(decisions)]
+        try:
+            for ant, future in enumerate(futures):
+                timeout = None
+                if deadline is not None and not (wait_first and ant == 0):
+                    timeout = max(deadline - time.time(), 0.0)
+                try:
+                    solution = future.result(timeout)
+                except TimeoutError:
+                    return
+                solution["ant"] = ant
+                if "instrumentation" in solution:
+                    self.instrumentation.mesclar(solution.pop("instrumentation"))
+
+                # Os processos têm caches próprios; o cache da colônia reúne os layouts novos (e é o que é salvo)
+                if not solution["cache_hit"] and self.layout_cache_size > 0:
+                    self.layout_cache.guardar(solution["cache_key"], self.solution_layout(solution), solution["quality"],
+                                              self.rotation_sequence(solution["order"], solution["rotation"]))
+                yield solution
+        finally:
+            for future in futures:
+                future.cancel()
+
+    def solution_layout(self, solution):
+        """
+        Retorna o layout de uma solução como lista de dicionários, lendo-o da tabela de resultados
+        compartilhada quando a solução veio de um processo de trabalho. A tabela é reescrita a cada
+        iteração, então o layout deve ser lido na mesma iteração.
+        """
+        if solution["layout"] is None:
+            results = self.shared_blocks[1]
+            solution["layout"] = results.pecas(solution["ant"], slice(0, solution["layout_size"]))
+        else:
+            solution["layout"] = dicts_de_pecas(solution["layout"])
+        return solution["layout"]
+
+    def create_executor(self):
+        """
+        Cria o pool de processos do modo paralelo (ou None no modo sequencial). A configuração da
+        chapa é enviada aos processos uma única vez; as peças, os layouts das formigas e um grid de
+        rascunho por processo ficam em blocos de memória compartilhada, acessados sem cópia.
+        """
+        if self.num_workers is None or self.num_workers <= 1:
+            return None
+
+        pieces = SharedPieceTable.criar(len(self.initial_layout), self.initial_layout)
+        results = SharedPieceTable.criar((self.num_ants, len(self.initial_layout)))
+        grids = SharedGrids.criar(self.num_workers, self.sheet_width, self.sheet_height, self.compact_grid)
+        self.shared_blocks = (pieces, results, grids)
+
+        config = {
+            "num_ants": self.num_ants,
+            "sheet_width": self.sheet_width,
+            "sheet_height": self.sheet_height,
+            "compact_grid": self.compact_grid,
+            "multi_sheet": self.multi_sheet,
+            "geometry": self.geometry,
+            "layout_cache_size": self.layout_cache_size,
+            "checkpoint_budget_mb": self.checkpoint_budget_mb,
+            "instrumentation": self.instrumentation.ativa,
+            "layout_cache_entries": self.layout_cache.entradas
+        }
+        shared = (pieces.referencia, results.referencia, grids.referencia)
+        slot_counter = multiprocessing.Value("i", 0)
+        return ProcessPoolExecutor(max_workers=self.num_workers, initializer=_init_worker,
+                                   initargs=(config, shared, slot_counter))
+
+    def close_executor(self, executor, wait=True):
+        """
+        Encerra o pool de processos e libera os blocos de memória compartilhada. Com wait=False, as
+        tarefas pendentes são canceladas e as que estão em execução não são aguardadas.
+        """
+        if executor is None:
+            return
+
+        executor.shutdown(wait=wait, cancel_futures=not wait)
+        for block in self.shared_blocks:
+            block.fechar()
+        self.shared_blocks = None
+
+    def evaluate_layouts(self, layouts, executor=None):
+        """
+        Avalia vários layouts (como evaluate_layout), em paralelo se houver executor. Os layouts são
+        escritos, um após o outro, em uma tabela compartilhada; cada processo lê apenas a sua fatia.
+        """
+        if executor is None:
+            return [self.evaluate_layout(layout) for layout in layouts]
+
+        offsets = [0]
+        for layout in layouts:
+            offsets.append(offsets[-1] + len(layout))
+
+        table = SharedPieceTable.criar(offsets[-1], [peca for layout in layouts for peca in layout])
+        try:
+            tasks = [(table.referencia, offsets[i], offsets[i + 1]) for i in range(len(layouts))]
+            return list(executor.map(_evaluate_worker, tasks))
+        finally:
+            table.fechar()
+
+    def select_deposits(self, solutions, best_solution):
+        """
+        Escolhe as soluções que depositam feromônio na iteração e o peso de cada depósito, conforme a variante:
+          - ant_system: todas as formigas, com peso 1;
+          - elitist: todas as formigas e, com peso elitist_weight, a melhor solução encontrada até agora;
+          - rank: as rank_size - 1 melhores formigas da iteração (peso rank_size - posição) e a melhor
+            solução até agora (peso rank_size);
+          - mmas: apenas a melhor solução até agora.
+        Retorna (soluções, pesos).
+        """
+        if self.variant == ANT_SYSTEM:
+            return solutions, np.ones(len(solutions))
+
+        if self.variant == ELITIST:
+            return solutions + [best_solution], np.append(np.ones(len(solutions)), self.elitist_weight)
+
+        if self.variant == RANK_BASED:
+            ranked = sorted(solutions, key=lambda sol: sol["quality"], reverse=True)[:max(self.rank_size - 1, 0)]
+            weights = [self.rank_size - rank for rank in range(1, len(ranked) + 1)] + [self.rank_size]
+            return ranked + [best_solution], np.array(weights, dtype=float)
+
+        return [best_solution], np.ones(1)
+
+    def update_pheromones(self, solutions, weights=None):
+        """
+        Atualiza os níveis de feromônio com base nas soluções construídas pelas formigas.
+        Para cada solução, deposita uma quantidade de feromônio proporcional à sua qualidade
+        (multiplicada pelo peso da solução em weights, se informado).
+        Aqui, assumimos que uma solução melhor tem um valor de qualidade (fitness) maior. A qualidade fica
+        negativa quando faltam peças (penalidade de 1.0 por peça), e essas soluções não depositam nada:
+        um depósito negativo deixaria os feromônios negativos, e a roleta deixaria de ser uma distribuição.
+        Atualizamos os feromônios das decisões (varredura, ordem, rotação e direção) que levaram à solução.
+        Os depósitos de todas as formigas são feitos de uma vez com np.add.at (decisões repetidas acumulam).
+        """
+        if not solutions:
+            return
 
-            # Atualiza feromônios para a rotação de cada peça rotacionável
-            for angle in sol["rotation"].values():
-                self.pheromones_rotation[angle] += quality
+        qualities = np.maximum([sol["quality"] for sol in solutions], 0.0)
+        if weights is not None:
+            qualities *= weights
 
-            # Atualiza feromônios para a ordem dos recortes
-            for i in range(len(self.pheromones_order)):
-                self.pheromones_order[i] += quality * 0.01  # fator pequeno para atualização
+        # Feromônios da configuração de varredura e da direção de priorização
+        scans = [SCAN_NAMES.index(sol["scan"]) for sol in solutions]
+        np.add.at(self.pheromones_scan, scans, qualities)
+        directions = [DIRECTIONS.index(sol.get("direction", "horizontal")) for sol in solutions]
+        np.add.at(self.pheromones_direction, directions, qualities)
 
-            # Atualiza feromônios para a direção de priorização
-            direction = sol.get("direction", "horizontal")
-            self.pheromones_direction[direction] += quality
+        # Feromônios da ordem dos recortes: o recorte escolhido em cada posição, para cada formiga
+        orders = np.array([sol["order"] for sol in solutions], dtype=int)
+        positions = np.broadcast_to(np.arange(orders.shape[1]), orders.shape)
+        np.add.at(self.pheromones_order, (positions, orders), qualities[:, None])
+
+        # Feromônios da rotação efetivamente usada por cada recorte posicionado (ângulos fora da tabela são ignorados)
+        pieces, angles, deposits = [], [], []
+        for sol, quality in zip(solutions, qualities):
+            for i, angle in sol["rotation"].items():
+                if angle in ANGLE_INDEX:
+                    pieces.append(i)
+                    angles.append(ANGLE_INDEX[angle])
+                    deposits.append(quality)
+        np.add.at(self.pheromones_rotation, (pieces, angles), deposits)
 
     def evaporate_pheromones(self):
         """
         Aplica evaporação aos feromônios para diminuir os níveis de feromônio existentes,
         evitando que valores muito altos impeçam a exploração de novas soluções.
-        Multiplica cada feromônio por um fator de evaporação (por exemplo, 0.9).
+        Multiplica cada feromônio pelo fator de evaporação evap_factor (por exemplo, 0.9).
+        """
+        self.pheromones_scan *= self.evap_factor
+        self.pheromones_rotation *= self.evap_factor
+        self.pheromones_order *= self.evap_factor
+        self.pheromones_direction *= self.evap_factor
+
+    def apply_pheromone_bounds(self, best_quality):
         """
-        evap_factor = 0.9
+        Max-Min Ant System: mantém os feromônios entre tau_min e tau_max, com tau_max = melhor qualidade /
+        (1 - evap_factor) (o nível de equilíbrio de uma decisão reforçada a cada iteração pela melhor solução)
+        e tau_min = tau_max * mmas_min_ratio. Quando os limites são definidos pela primeira vez, todos os
+        feromônios começam em tau_max, favorecendo a exploração no início. Ângulos de rotação não
+        permitidos para o tipo do recorte continuam em 0.
+        """
+        if best_quality <= 0 or self.evap_factor >= 1:
+            # Sem limites a aplicar, só garante que os feromônios não fiquem negativos
+            for pheromones in (self.pheromones_scan, self.pheromones_order, self.pheromones_direction, self.pheromones_rotation):
+                np.maximum(pheromones, 0.0, out=pheromones)
+            return
+
+        tau_max = best_quality / (1 - self.evap_factor)
+        tau_min = tau_max * self.mmas_min_ratio
+        first = self.pheromone_bounds is None
+        self.pheromone_bounds = (tau_min, tau_max)
 
-        for key in self.pheromones_scan:
-            self.pheromones_scan[key] *= evap_factor
+        for pheromones in (self.pheromones_scan, self.pheromones_order, self.pheromones_direction):
+            if first:
+                pheromones.fill(tau_max)
+            np.clip(pheromones, tau_min, tau_max, out=pheromones)
 
-        for angle in self.pheromones_rotation:
-            self.pheromones_rotation[angle] *= evap_factor
+        rotation = self.pheromones_rotation
+        rotation[self.rotation_allowed] = tau_max if first else np.clip(rotation[self.rotation_allowed], tau_min, tau_max)
 
-        # Atualiza a lista de feromônios para ordem
-        self.pheromones_order = [val * evap_factor for val in self.pheromones_order]
+    def utilization(self, layout):
+        """
+        Aproveitamento da área de um layout: área das peças posicionadas dividida pela área
+        das chapas usadas (uma chapa fora do modo multi_sheet).
+        """
+        num_sheets = 1
+        if self.multi_sheet:
+            num_sheets = max(max((peca.get("chapa", 0) for peca in layout), default=-1) + 1, 1)
+        used_area = sum(self.get_area(peca) for peca in layout)
+        return used_area / (num_sheets * self.sheet_width * self.sheet_height)
 
-        for key in self.pheromones_direction:
-            self.pheromones_direction[key] *= evap_factor
+    def stopping_reason(self, iteration, last_improvement, best_utilization, deadline):
+        """
+        Verifica os critérios de parada antecipada depois de uma iteração e retorna o motivo
+        ("stagnation", "target" ou "time"), ou None para continuar.
+        """
+        if self.target_utilization is not None and best_utilization >= self.target_utilization:
+            return "target"
+        if self.stagnation_limit is not None and iteration - last_improvement >= self.stagnation_limit:
+            return "stagnation"
+        if deadline is not None and time.time() >= deadline:
+            return "time"
+        return None
     
-    def evaluate_layout(self, layout):
+    def evaluate_layout(self, layout, from_packer=False):
         """
         Avalia a qualidade de um layout considerando:
         - Aproveitamento da área (área utilizada / área total da chapa);
         - Penalizações para sobreposição (somente nas células ocupadas em excesso);
         - Penalizações para peças fora dos limites;
         - Penalizações se houver peças faltantes.
+
+        Layouts gerados pelos empacotadores (from_packer=True) não têm sobreposição nem peças
+        fora da chapa por construção: a pegada de cada peça com margem, marcada no grid do
+        FlexiblePacking, contém a pegada sem margem usada aqui, e o GeometricPacking mantém a margem
+        entre as formas exatas. Nesse caso a avaliação é analítica;
+        a rasterização só é feita para layouts externos.
+        
+        No modo multi_sheet a avaliação é feita por evaluate_multi_sheet.
         
         Retorna um valor numérico, onde valores maiores indicam layouts melhores.
         """
+        if self.multi_sheet:
+            return self.evaluate_multi_sheet(layout, from_packer)
+
         total_sheet_area = self.sheet_width * self.sheet_height
-        used_area = 0.0
-        out_of_bounds_penalty = 0.0
+        used_area = sum(self.get_area(peca) for peca in layout)
+        area_utilization = used_area / total_sheet_area
 
         # Se o layout tiver menos peças que o esperado, aplica penalidade
         missing_penalty = (len(self.initial_layout) - len(layout)) * 1.0 if len(layout) < len(self.initial_layout) else 0
 
-        # Cria um grid para marcar as células efetivamente ocupadas
-        grid = np.zeros((self.sheet_width, self.sheet_height), dtype=int)
+        if from_packer:
+            return area_utilization - missing_penalty
+
+        overlap_penalty, out_of_bounds_penalty = self.rasterized_penalties(layout)
+
+        quality = area_utilization - (overlap_penalty + missing_penalty + out_of_bounds_penalty)
+        return quality
+
+    def evaluate_multi_sheet(self, layout, from_packer=False):
+        """
+        Avalia um layout em várias chapas (campo "chapa" de cada peça). O objetivo é, em ordem:
+        - Usar o menor número de chapas;
+        - Reduzir o desperdício na última chapa: área do retângulo que envolve as peças da última
+          chapa não ocupada por elas, relativa à área da chapa (o restante da chapa é uma sobra reaproveitável).
+        A qualidade (2 - desperdicio_ultima) / (2 * num_chapas) fica entre 1/(2n) e 1/n, de modo que
+        menos chapas sempre vencem e o valor permanece positivo para o depósito de feromônio.
+        As penalizações de peças faltantes, sobreposição e limites de evaluate_layout são
+        calculadas em cada chapa e subtraídas.
+        """
+        total_sheet_area = self.sheet_width * self.sheet_height
+        sheets = {}
+        for peca in layout:
+            sheets.setdefault(peca.get("chapa", 0), []).append(peca)
+
+        num_sheets = max(sheets) + 1 if sheets else 0
+        missing_penalty = (len(self.initial_layout) - len(layout)) * 1.0 if len(layout) < len(self.initial_layout) else 0
+
+        last_sheet = sheets.get(num_sheets - 1, [])
+        last_sheet_waste = 0.0
+        if last_sheet:
+            extents = []
+            for peca in last_sheet:
+                min_x, max_x, min_y, max_y = self.get_stamp(peca).extensao
+                extents.append((peca["x"] + min_x, peca["x"] + max_x, peca["y"] + min_y, peca["y"] + max_y))
+            envelope_area = (max(e[1] for e in extents) - min(e[0] for e in extents)) * \
+                (max(e[3] for e in extents) - min(e[2] for e in extents))
+            last_sheet_waste = max(envelope_area - sum(self.get_area(peca) for peca in last_sheet), 0.0) / total_sheet_area
+
+        penalties = 0.0
+        if not from_packer:
+            for sheet_layout in sheets.values():
+                penalties += sum(self.rasterized_penalties(sheet_layout))
+
+        quality = (2.0 - last_sheet_waste) / (2 * num_sheets) if num_sheets else 0.0
+        return quality - (missing_penalty + penalties)
+
+    def rasterized_penalties(self, layout):
+        """
+        Rasteriza o layout em um grid de ocupação e retorna as penalizações por sobreposição
+        e por peças fora dos limites da chapa.
+        """
+        out_of_bounds_penalty = 0.0
+
+        # Cria um grid para marcar as células efetivamente ocupadas (ou reaproveita o grid de rascunho do processo)
+        if self.scratch_grid is not None:
+            grid = self.scratch_grid
+            grid.limpar()
+        else:
+            grid = criar_grid(self.sheet_width, self.sheet_height, self.compact_grid)
+        overlap_cells = 0
 
         for peca in layout:
-            used_area += self.get_area(peca)
-            width, height = self.get_bounding_box(peca)
+            stamp = self.get_stamp(peca)
+            min_x, max_x, min_y, max_y = stamp.extensao
             x = peca["x"]
             y = peca["y"]
 
-            # Verifica se o bounding box da peça está fora dos limites
-            if x < 0 or y < 0 or x + width > self.sheet_width or y + height > self.sheet_height:
+            # Verifica se a extensão real da peça (diamantes rotacionados não ficam
+            # dentro de [x, x + largura do bounding box]) está fora dos limites
+            if x + min_x < 0 or y + min_y < 0 or x + max_x > self.sheet_width or y + max_y > self.sheet_height:
                 out_of_bounds_penalty += 0.1
 
-            # Marcação no grid, de acordo com o tipo da peça:
-            if peca["tipo"] == "circular":
-                raio = peca["r"]
-                centro_x = x + raio
-                centro_y = y + raio
-                mask = self.get_circle_mask(raio, margem=0)
-                mask_shape = mask.shape
-                start_x = int(round(centro_x - raio))
-                start_y = int(round(centro_y - raio))
-
-                for i in range(mask_shape[0]):
-                    for j in range(mask_shape[1]):
-                        if mask[i, j]:
-                            gx = start_x + i
-                            gy = start_y + j
-                            if 0 <= gx < self.sheet_width and 0 <= gy < self.sheet_height:
-                                grid[gx, gy] += 1
-
-            elif peca["tipo"] == "diamante":
-                vertices = self.get_rotated_vertices(peca, x, y)
-                min_x = max(int(min(v[0] for v in vertices)), 0)
-                max_x = min(int(max(v[0] for v in vertices)), self.sheet_width - 1)
-                min_y = max(int(min(v[1] for v in vertices)), 0)
-                max_y = min(int(max(v[1] for v in vertices)), self.sheet_height - 1)
-                
-                for i in range(min_x, max_x + 1):
-                    for j in range(min_y, max_y + 1):
-                        if self.is_point_inside_diamond(i, j, vertices):
-                            grid[i, j] += 1
-
-            else:  # Retangular
-                for i in range(x, min(x + width, self.sheet_width)):
-                    for j in range(y, min(y + height, self.sheet_height)):
-                        grid[i, j] += 1
+            # Marcação no grid usando o stamp (sem margem) da peça, contando antes
+            # as células que já estavam ocupadas por peças anteriores
+            overlap_cells += grid.sobreposicao(stamp, x, y)
+            grid.marcar(stamp, x, y)
 
         # Penalização por sobreposição: cada célula ocupada mais de uma vez gera penalização
-        overlap_cells = grid[grid > 1] - 1
-        overlap_penalty = 0.001 * np.sum(overlap_cells)
-
-        area_utilization = used_area / total_sheet_area
-
-        quality = area_utilization - (overlap_penalty + missing_penalty + out_of_bounds_penalty)
-        return quality
+        overlap_penalty = 0.001 * overlap_cells
+        return overlap_penalty, out_of_bounds_penalty
 
-    def run(self):
+    def improvements(self, time_budget=None):
         """
-        Loop principal do algoritmo de Colônia de Formigas:
+        Versão anytime do loop principal do algoritmo de Colônia de Formigas (um gerador):
         1. Inicializa os feromônios.
         2. Para cada iteração:
             - Cada formiga constrói uma solução.
@@ -238,7 +809,17 @@ class AntColony(LayoutDisplayMixin, PackingBase):
             - Atualiza os feromônios com base nas soluções.
             - Aplica evaporação aos feromônios.
             - (Opcional) Armazena a melhor solução da iteração.
-        3. Retorna a melhor solução encontrada (layout).
+            - Encerra antes de num_iterations se algum critério de parada for atingido (estagnação,
+              aproveitamento alvo ou tempo limite); o motivo fica em stop_reason.
+        3. A cada melhora da melhor solução, produz um dicionário com o layout (lista de dicionários),
+           a qualidade, o aproveitamento, a iteração, a formiga e o tempo decorrido.
+        O prazo (time_budget, ou time_limit se não informado, em segundos) também é verificado entre as
+        formigas de uma iteração: ao ser atingido, as formigas restantes são descartadas e a busca termina.
+        Um empacotamento já iniciado não é interrompido, e a primeira formiga é sempre aguardada, para
+        que haja uma solução. A melhor solução encontrada fica em optimized_layout / optimized_solution,
+        e as métricas de cada iteração, em iteration_metrics (ver record_iteration).
+        Formigas que repetem as decisões de uma formiga anterior reaproveitam o layout e a qualidade
+        memorizados no cache de layouts, sem empacotar novamente.
         """
         self.initialize_pheromones()
 
@@ -246,86 +827,279 @@ class AntColony(LayoutDisplayMixin, PackingBase):
         best_overall = None
         best_overall_quality = -float("inf")
         best_solution = None
+        best_utilization = 0.0
+        last_improvement = 0
         avg_individual_times = []
+        cache_hits = 0
+        ants_built = 0
+        self.optimized_layout = None
+        self.optimized_solution = None
+        self.stop_reason = "iterations"
+        self.iterations_run = 0
+        self.iteration_metrics = []
+        self.instrumentation.extrair()
+        self.instrumentation_totals = Instrumentacao() if self.instrumentation.ativa else None
         
-        print("Iniciando o loop principal do Ant Colony...")
-        
-        for it in range(self.num_iterations):
-            solutions = []
-            total_individual_time = 0.0
-
-            for ant in range(self.num_ants):
-                start_time = time.time()
-
-                sol = self.construct_solution(ant)
-                layout = sol["layout"]
-                quality = self.evaluate_layout(layout)
-                solution_info = {
-                    "layout": layout,
-                    "scan": sol["scan"],
-                    "rotation": {i: peca["rotacao"] for i, peca in enumerate(self.initial_layout) if peca["tipo"] in ["retangular", "diamante"]},
-                    "direction": sol["direction"],
-                    "quality": quality
-                }
-
-                solutions.append(solution_info)
-                
-                # Atualiza a melhor solução global
-                if quality > best_overall_quality:
-                    best_overall_quality = quality
-                    best_overall = layout
-                    best_solution = solution_info
-
-                end_time = time.time()
-                total_individual_time += (end_time - start_time)
-
-            # Calcula tempo médio gasto pelas formigas para criar a solução
-            avg_individual_time = total_individual_time / self.num_ants
-            avg_individual_times.append(avg_individual_time)
-            print(f"Iteração {it}: Melhor qualidade = {best_overall_quality} | Tempo médio por indivíduo = {avg_individual_time:.4f} s")
-
-            # Atualiza os feromônios com base nas soluções desta iteração
-            self.update_pheromones(solutions)
-            # Aplica evaporação
-            self.evaporate_pheromones()
-        
-        overall_avg_time = sum(avg_individual_times) / len(avg_individual_times)
-        print(f"Tempo médio total por indivíduo: {overall_avg_time:.4f} s")
+        start_time = time.time()
+        time_budget = self.time_limit if time_budget is None else time_budget
+        deadline = None if time_budget is None else start_time + time_budget
+        rng = np.random.default_rng(self.seed)
+        executor = self.create_executor()
+
+        logger.debug("Iniciando o loop principal do Ant Colony...")
         
-        self.optimized_layout = best_overall
-        self.optimized_solution = best_solution
+        try:
+            for it in range(self.num_iterations):
+                iteration_start = time.time()
+                profiler = self.start_profiler()
+                solutions = []
+                total_individual_time = 0.0
+
+                try:
+                    for solution_info in self.build_ants(executor, rng, deadline, wait_first=best_solution is None):
+                        solutions.append(solution_info)
+                        quality = solution_info["quality"]
+                        total_individual_time += solution_info["time"]
+                        cache_hits += solution_info["cache_hit"]
+                        ants_built += 1
+
+                        # Atualiza a melhor solução global
+                        if quality > best_overall_quality:
+                            best_overall_quality = quality
+                            best_overall = self.solution_layout(solution_info)
+                            best_solution = solution_info
+                            best_utilization = self.utilization(best_overall)
+                            last_improvement = it
+                            self.optimized_layout = best_overall
+                            self.optimized_solution = best_solution
+                            yield {
+                                "layout": best_overall,
+                                "quality": quality,
+                                "utilization": best_utilization,
+                                "iteration": it,
+                                "ant": len(solutions) - 1,
+                                "elapsed": time.time() - start_time
+                            }
+
+                    # Atualiza os feromônios com base nas soluções desta iteração (conforme a variante),
+                    # a menos que o prazo tenha sido atingido no meio da iteração
+                    complete = len(solutions) == self.num_ants
+                    if complete:
+                        with self.instrumentation.cronometro("feromonios"):
+                            self.update_pheromones(*self.select_deposits(solutions, best_solution))
+                            # Aplica evaporação
+                            self.evaporate_pheromones()
+                            if self.variant == MAX_MIN:
+                                self.apply_pheromone_bounds(best_overall_quality)
+                finally:
+                    self.stop_profiler(profiler, it)
+
+                metrics = self.record_iteration(it, solutions, best_overall_quality, total_individual_time,
+                                                time.time() - iteration_start)
+
+                # Prazo atingido no meio da iteração: as formigas restantes foram descartadas
+                if not complete:
+                    self.stop_reason = "time"
+                    logger.info("Prazo atingido na iteração %d (%d de %d formigas).", it, len(solutions), self.num_ants)
+                    break
+
+                # Tempo médio gasto pelas formigas para criar a solução
+                avg_individual_times.append(metrics["avg_ant_time"])
+
+                self.iterations_run = it + 1
+                reason = self.stopping_reason(it, last_improvement, best_utilization, deadline)
+                if reason is not None:
+                    self.stop_reason = reason
+                    logger.info("Parada antecipada na iteração %d (%s).", it, reason)
+                    break
+        finally:
+            # No prazo, não espera as formigas que ainda estão empacotando nos processos de trabalho
+            self.close_executor(executor, wait=self.stop_reason != "time")
+            self.report_run(avg_individual_times, cache_hits, ants_built)
+
+    def record_iteration(self, iteration, solutions, best_quality, total_individual_time, elapsed):
+        """
+        Registra as métricas de uma iteração em iteration_metrics (e, se configurado, como uma linha JSON
+        em metrics_file) e emite o resumo da iteração no log (INFO), com as métricas como atributos do registro: melhor qualidade global e da iteração, qualidade média, formigas construídas,
+        acertos do cache, tempo da iteração e tempo médio por formiga. Com a instrumentação ativa, inclui
+        os cronômetros (timers, em segundos, e timer_counts) e os contadores (counters) da iteração.
+        """
+        qualities = [sol["quality"] for sol in solutions]
+        metrics = {
+            "iteration": iteration,
+            "ants": len(solutions),
+            "best_quality": best_quality,
+            "iteration_best": max(qualities) if qualities else None,
+            "mean_quality": sum(qualities) / len(qualities) if qualities else None,
+            "cache_hits": sum(sol["cache_hit"] for sol in solutions),
+            "time": elapsed,
+            "avg_ant_time": total_individual_time / len(solutions) if solutions else 0.0
+        }
+
+        if self.instrumentation.ativa:
+            data = self.instrumentation.extrair()
+            self.instrumentation_totals.mesclar(data)
+            metrics["timers"] = data["tempos"]
+            metrics["timer_counts"] = data["medicoes"]
+            metrics["counters"] = data["contadores"]
+
+        self.iteration_metrics.append(metrics)
+        if self.metrics_file is not None:
+            with open(self.metrics_file, "a") as metrics_file:
+                metrics_file.write(json.dumps(metrics) + "\n")
+        logger.info("Iteração %d: Melhor qualidade = %s | Tempo médio por indivíduo = %.4f s",
+                    iteration, best_quality, metrics["avg_ant_time"], extra=metrics)
+        return metrics
+
+    def start_profiler(self):
+        """ Inicia o profiler da iteração (cProfile ou pyinstrument), se configurado. """
+
+        if self.profiler is None:
+            return None
+
+        if self.profiler == "cprofile":
+            profiler = cProfile.Profile()
+            profiler.enable()
+        else:
+            from pyinstrument import Profiler
+            profiler = Profiler()
+            profiler.start()
+        return profiler
+
+    def stop_profiler(self, profiler, iteration):
+        """ Encerra o profiler da iteração e grava o perfil em profile_dir (iteration_<n>.prof ou .html). """
+
+        if profiler is None:
+            return
+
+        os.makedirs(self.profile_dir, exist_ok=True)
+        path = os.path.join(self.profile_dir, f"iteration_{iteration:04d}")
+        if isinstance(profiler, cProfile.Profile):
+            profiler.disable()
+            profiler.dump_stats(f"{path}.prof")
+        else:
+            profiler.stop()
+            with open(f"{path}.html", "w") as output:
+                output.write(profiler.output_html())
+
+    def report_run(self, avg_individual_times, cache_hits, total_ants):
+        """ Reporta o tempo médio por formiga e as estatísticas do cache de layouts ao fim de uma execução. """
+
+        overall_avg_time = sum(avg_individual_times) / max(len(avg_individual_times), 1)
+        logger.info("Tempo médio total por indivíduo: %.4f s", overall_avg_time)
+
+        # Relatório do cache de layouts (acertos e falhas de todas as formigas, inclusive nos processos de trabalho)
+        self.cache_stats = {"hits": cache_hits, "misses": total_ants - cache_hits}
+        if self.layout_cache_size > 0:
+            logger.info("Cache de layouts: %d acertos, %d falhas (%.1f%% de acertos, %d layouts em cache)",
+                        cache_hits, total_ants - cache_hits, 100 * cache_hits / max(total_ants, 1), len(self.layout_cache))
+            self.layout_cache.salvar()
+
+    def run(self, time_budget=None, callback=None):
+        """
+        Executa a otimização até o fim (ou até o prazo time_budget, em segundos) e retorna a melhor
+        solução encontrada (layout). Se callback for informado, ele é chamado com cada melhora
+        produzida por improvements(), por exemplo para exibir planos de corte cada vez melhores.
+        """
+        for improvement in self.improvements(time_budget):
+            if callback is not None:
+                callback(improvement)
         return self.optimized_layout
 
+    def optimize(self, time_budget=None, callback=None):
+        """
+        Executa a otimização sem exibir nada (não importa matplotlib) e retorna o layout otimizado
+        com as métricas da execução:
+        - layout, quality (qualidade da melhor solução) e area_utilization (como em optimize_and_display);
+        - num_sheets, placed e missing (peças posicionadas e faltantes);
+        - time (segundos), iterations, stop_reason e cache_stats;
+        - iteration_metrics (métricas de cada iteração) e instrumentation (cronômetros e contadores
+          somados, se a instrumentação estiver ativa).
+        time_budget e callback são repassados a run().
+        """
+        start_time = time.time()
+        layout = self.run(time_budget, callback) or []
+        total_time = time.time() - start_time
+
+        # Aproveitamento da área do layout otimizado (por chapa usada no modo multi_sheet)
+        num_sheets = len(self.sheet_layouts(layout))
+        area_utilization = self.utilization(layout) if self.multi_sheet else self.evaluate_layout(layout)
+
+        return {
+            "layout": layout,
+            "quality": self.optimized_solution["quality"] if self.optimized_solution else None,
+            "area_utilization": area_utilization,
+            "num_sheets": num_sheets,
+            "placed": len(layout),
+            "missing": len(self.initial_layout) - len(layout),
+            "time": total_time,
+            "iterations": self.iterations_run,
+            "stop_reason": self.stop_reason,
+            "cache_stats": self.cache_stats,
+            "iteration_metrics": self.iteration_metrics,
+            "instrumentation": self.instrumentation_summary()
+        }
+
+    def instrumentation_summary(self):
+        """ Cronômetros e contadores somados de todas as iterações da última execução (None sem instrumentação). """
+
+        totals = self.instrumentation_totals
+        if totals is None:
+            return None
+        return {"timers": dict(totals.tempos), "timer_counts": dict(totals.medicoes), "counters": dict(totals.contadores)}
+
+    def sheet_layouts(self, layout):
+        """ Separa o layout por chapa (campo "chapa"; uma única chapa fora do modo multi_sheet). """
+
+        if not self.multi_sheet:
+            return [layout] if layout else []
+        num_sheets = max((peca.get("chapa", 0) for peca in layout), default=-1) + 1
+        return [[peca for peca in layout if peca.get("chapa", 0) == sheet] for sheet in range(num_sheets)]
+
+    def save_layouts(self, path, layout=None, title="Optimized Layout - Ant Colony"):
+        """
+        Grava o layout (por padrão, o otimizado) fora da tela, em PNG, SVG ou outro formato dado pela
+        extensão de path. No modo multi_sheet é gravado um arquivo por chapa, com o sufixo _chapa<n>
+        no nome. Retorna a lista de arquivos gravados.
+        """
+        layout = (self.optimized_layout if layout is None else layout) or []
+        if not self.multi_sheet:
+            return [self.save_layout(layout, path, title=title)]
+
+        sheets = self.sheet_layouts(layout)
+        root, extension = os.path.splitext(path)
+        return [self.save_layout(sheet_layout, f"{root}_chapa{sheet + 1}{extension}",
+                                 title=f"{title} (chapa {sheet + 1}/{len(sheets)})")
+                for sheet, sheet_layout in enumerate(sheets)]
+
     def optimize_and_display(self):
         """
-        Exibe o layout inicial, executa a otimização, exibe o layout otimizado e reporta:
+        Exibe o layout inicial, executa a otimização, exibe o layout otimizado e reporta no log (INFO):
         - Tempo de processamento total.
         - Aproveitamento da área (indicador de economia de matéria-prima).
+        As janelas do matplotlib bloqueiam até serem fechadas; para execuções sem interface,
+        use optimize() e save_layouts().
         """
         # Exibe o layout inicial
         self.display_layout(self.initial_layout, title="Initial Layout - Ant Colony")
         
-        # Registra o tempo de início
-        start_time = time.time()
-        
         # Executa a otimização
-        self.optimized_layout = self.run()
-        
-        # Registra o tempo de término e calcula o tempo total
-        end_time = time.time()
-        total_time = end_time - start_time
+        metrics = self.optimize()
         
-        # Calcula o aproveitamento da área do layout otimizado
-        area_utilization = self.evaluate_layout(self.optimized_layout)
-        
-        # Exibe o layout otimizado
-        self.display_layout(self.optimized_layout, title="Optimized Layout - Ant Colony")
+        # Exibe o layout otimizado (uma figura por chapa no modo multi_sheet)
+        if self.multi_sheet:
+            num_sheets = metrics["num_sheets"]
+            for sheet, sheet_layout in enumerate(self.sheet_layouts(self.optimized_layout)):
+                self.display_layout(sheet_layout, title=f"Optimized Layout - Ant Colony (chapa {sheet + 1}/{num_sheets})")
+        else:
+            self.display_layout(self.optimized_layout, title="Optimized Layout - Ant Colony")
         
         # Exibe os resultados de tempo e aproveitamento
-        print(f"Tempo de processamento: {total_time:.2f} segundos")
-        print(f"Aproveitamento da área: {area_utilization*100:.2f}%")
-        print(f"Solução: f{self.optimized_solution}")
+        logger.info("Tempo de processamento: %.2f segundos", metrics["time"])
+        if self.multi_sheet:
+            logger.info("Chapas utilizadas: %d", num_sheets)
+        logger.info("Aproveitamento da área: %.2f%%", metrics["area_utilization"] * 100)
+        logger.info("Solução: %s", self.optimized_solution)
         
         return self.optimized_layout
 
-    
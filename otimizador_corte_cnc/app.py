@@ -1,6 +1,10 @@
 from ant_colony import AntColony
+import logging
 
 def main():
+    # Exibe o resumo de cada iteração e o relatório final do otimizador
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
     # Define sheet dimensions
     sheet_width = 200
     sheet_height = 100
@@ -0,0 +1,342 @@
+from algorithms_heuristic.bottom_left_packing import BottomLeftPacking
+from ant_colony import AntColony
+from benchmarks.instancias import SUITES, instancias
+from common.packing_base import PackingBase
+from flexible_packing import FlexiblePacking
+from geometric_packing import GeometricPacking
+import argparse
+import json
+import platform
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+import numpy as np
+
+"""
+Benchmarks dos caminhos críticos de empacotamento e do ACO, com comparação contra um baseline.
+
+Uso (a partir de otimizador_corte_cnc/):
+    python -m benchmarks.benchmark --suite rapida --saida resultados.json
+    python -m benchmarks.benchmark --suite rapida --baseline resultados.json
+
+- Cada benchmark é medido em `repeticoes` execuções (a preparação, como copiar as peças ou empacotar o
+  layout de entrada, fica fora da medição). São reportados a mediana e o mínimo dos tempos, operações por
+  segundo (chamadas por segundo nos benchmarks de funções pequenas, como cabe_no_espaco), o pico de memória
+  alocada (tracemalloc, em uma execução extra, para não distorcer os tempos) e o aproveitamento do layout.
+- Benchmarks que aceleram ou substituem outro (como a busca multirresolução do FlexiblePacking e o
+  GeometricPacking) também reportam a aceleração em relação a ele na mesma instância (REFERENCIAS).
+- Os resultados são gravados em JSON. Com --baseline, cada resultado é comparado com o de mesma chave
+  (benchmark/instância) no arquivo indicado: queda de operações por segundo ou aumento do pico de memória
+  acima da tolerância, ou queda de aproveitamento, é reportado como regressão, e o processo termina com código 1.
+  O tempo é comparado pelo mínimo das repetições (menos sensível a ruído que a mediana) e só quando as duas
+  execuções têm pelo menos REPETICOES_MINIMAS repetições; com menos, a comparação de tempo é só informativa.
+"""
+
+# Número de posições testadas por repetição no benchmark de cabe_no_espaco
+CHAMADAS_CABE_NO_ESPACO = 2000
+
+# Avaliações do mesmo layout por repetição no benchmark de evaluate_layout (uma avaliação isolada é curta demais)
+CHAMADAS_AVALIACAO = 20
+
+# Fator de redução do grid grosso no benchmark da busca multirresolução do FlexiblePacking
+FATOR_REDUCAO = 4
+
+# Repetições mínimas (na execução atual e no baseline) para que uma queda de desempenho conte como regressão
+REPETICOES_MINIMAS = 5
+
+# Variação relativa tolerada, por padrão, antes de acusar regressão de tempo ou de memória
+TOLERANCIA_PADRAO = 0.25
+
+# Instâncias com mais peças que isto não rodam o benchmark de uma iteração do ACO
+MAX_PECAS_ACO = 50
+
+# Instâncias com mais peças que isto não rodam o benchmark do GeometricPacking (o custo cresce com o
+# número de peças já posicionadas, não com a resolução da chapa)
+MAX_PECAS_GEOMETRICO = 100
+
+_base = PackingBase()
+
+
+def copiar(recortes):
+    """ Cópia das peças de entrada (dicionários com campos imutáveis). """
+    return [dict(peca) for peca in recortes]
+
+
+def aproveitamento(layout, instancia):
+    """ Área das peças posicionadas dividida pela área da chapa. """
+    return sum(_base.get_area(peca) for peca in layout) / (instancia.largura * instancia.altura)
+
+
+def empacotar(instancia):
+    """ Layout da instância pelo FlexiblePacking (usado como entrada dos benchmarks de verificação e avaliação). """
+    return FlexiblePacking(instancia.largura, instancia.altura, copiar(instancia.recortes), margem=1).empacotar()
+
+
+def bench_flexible_packing(instancia):
+    """ FlexiblePacking.empacotar com a configuração padrão de varredura. """
+
+    def preparar():
+        recortes = copiar(instancia.recortes)
+        return lambda: FlexiblePacking(instancia.largura, instancia.altura, recortes, margem=1).empacotar()
+    return preparar, 1
+
+
+def bench_flexible_packing_multirresolucao(instancia):
+    """ FlexiblePacking.empacotar com a busca multirresolução (grid grosso com fator FATOR_REDUCAO). """
+
+    def preparar():
+        recortes = copiar(instancia.recortes)
+        return lambda: FlexiblePacking(instancia.largura, instancia.altura, recortes, margem=1,
+                                       fator_reducao=FATOR_REDUCAO).empacotar()
+    return preparar, 1
+
+
+def bench_geometric_packing(instancia):
+    """ GeometricPacking.empacotar (geometria contínua, sem grid) com a configuração padrão de varredura. """
+
+    if len(instancia.recortes) > MAX_PECAS_GEOMETRICO:
+        return None
+
+    def preparar():
+        recortes = copiar(instancia.recortes)
+        return lambda: GeometricPacking(instancia.largura, instancia.altura, recortes, margem=1).empacotar()
+    return preparar, 1
+
+
+def bench_bottom_left(instancia):
+    """ BottomLeftPacking.empacotar. """
+
+    def preparar():
+        recortes = copiar(instancia.recortes)
+        return lambda: BottomLeftPacking(instancia.largura, instancia.altura, recortes).empacotar()
+    return preparar, 1
+
+
+def bench_cabe_no_espaco(instancia):
+    """ FlexiblePacking.cabe_no_espaco em posições sorteadas sobre o grid de um layout já empacotado. """
+
+    packer = FlexiblePacking(instancia.largura, instancia.altura, copiar(instancia.recortes), margem=1)
+    packer.empacotar()
+    rng = random.Random(0)
+    testes = [(dict(peca), rng.randrange(instancia.largura), rng.randrange(instancia.altura))
+              for peca in rng.choices(instancia.recortes, k=CHAMADAS_CABE_NO_ESPACO)]
+
+    def executar():
+        for peca, x, y in testes:
+            packer.cabe_no_espaco(peca, x, y)
+    return (lambda: executar), CHAMADAS_CABE_NO_ESPACO
+
+
+def bench_evaluate_layout(instancia):
+    """ AntColony.evaluate_layout (avaliação rasterizada) do layout do FlexiblePacking. """
+
+    colonia = AntColony(1, 1, instancia.largura, instancia.altura, copiar(instancia.recortes),
+                        layout_cache_size=0, checkpoint_budget_mb=0)
+    layout = empacotar(instancia)
+
+    def executar():
+        for _ in range(CHAMADAS_AVALIACAO):
+            colonia.evaluate_layout(layout)
+        return layout
+    return (lambda: executar), CHAMADAS_AVALIACAO
+
+
+def bench_aco_iteracao(instancia):
+    """ Uma iteração do AntColony com 4 formigas (sem cache de layouts e sem checkpoints). """
+
+    if len(instancia.recortes) > MAX_PECAS_ACO:
+        return None
+
+    def preparar():
+        colonia = AntColony(4, 1, instancia.largura, instancia.altura, copiar(instancia.recortes), seed=0,
+                            layout_cache_size=0, checkpoint_budget_mb=0)
+        return colonia.run
+    return preparar, 1
+
+
+BENCHMARKS = {
+    "flexible_packing": bench_flexible_packing,
+    "flexible_packing_multirresolucao": bench_flexible_packing_multirresolucao,
+    "geometric_packing": bench_geometric_packing,
+    "bottom_left": bench_bottom_left,
+    "cabe_no_espaco": bench_cabe_no_espaco,
+    "evaluate_layout": bench_evaluate_layout,
+    "aco_iteracao": bench_aco_iteracao
+}
+
+# Benchmarks que são variantes mais rápidas de outro: a aceleração em relação a ele (razão entre as
+# medianas, na mesma instância) é reportada quando os dois são executados
+REFERENCIAS = {
+    "flexible_packing_multirresolucao": "flexible_packing",
+    "geometric_packing": "flexible_packing"
+}
+
+
+def medir(preparar, repeticoes):
+    """
+    Mede `repeticoes` execuções (cada uma com uma preparação nova, fora da medição) e o pico de memória
+    de uma execução extra. Uma execução de aquecimento, não medida, paga antes os custos que só ocorrem
+    uma vez por processo (imports sob demanda, como o do SciPy, e caches de stamps), que senão distorceriam
+    a primeira medição. Retorna (tempos, pico de memória em bytes, resultado da última execução).
+    """
+    preparar()()
+    tempos = []
+    resultado = None
+    for _ in range(repeticoes):
+        executar = preparar()
+        inicio = time.perf_counter()
+        resultado = executar()
+        tempos.append(time.perf_counter() - inicio)
+
+    executar = preparar()
+    tracemalloc.start()
+    try:
+        executar()
+        pico = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return tempos, pico, resultado
+
+
+def executar_benchmarks(suite="rapida", nomes=None, repeticoes=REPETICOES_MINIMAS, saida=sys.stdout):
+    """ Executa os benchmarks (todos, ou os de `nomes`) em cada instância da suíte e retorna os resultados por chave. """
+
+    resultados = {}
+    for instancia in instancias(suite):
+        for nome in nomes or BENCHMARKS:
+            caso = BENCHMARKS[nome](instancia)
+            if caso is None:
+                continue
+
+            preparar, chamadas = caso
+            tempos, pico, layout = medir(preparar, repeticoes)
+            mediana = statistics.median(tempos)
+            resultado = {
+                "benchmark": nome,
+                "instancia": instancia.nome,
+                "pecas": len(instancia.recortes),
+                "chapa": [instancia.largura, instancia.altura],
+                "repeticoes": repeticoes,
+                "chamadas": chamadas,
+                "mediana_s": mediana,
+                "minimo_s": min(tempos),
+                "ops_por_segundo": chamadas / mediana if mediana > 0 else float("inf"),
+                "memoria_pico_bytes": pico,
+                "posicionadas": len(layout) if layout is not None else None,
+                "aproveitamento": aproveitamento(layout, instancia) if layout is not None else None
+            }
+            referencia = resultados.get(f"{REFERENCIAS.get(nome)}/{instancia.nome}")
+            if referencia is not None:
+                resultado["referencia"] = referencia["benchmark"]
+                resultado["aceleracao"] = referencia["mediana_s"] / mediana if mediana > 0 else float("inf")
+            resultados[f"{nome}/{instancia.nome}"] = resultado
+            print(formatar(resultado), file=saida, flush=True)
+    return resultados
+
+
+def formatar(resultado):
+    """ Linha de relatório de um resultado. """
+
+    chave = f"{resultado['benchmark']}/{resultado['instancia']}"
+    linha = (f"{chave:<48} {resultado['ops_por_segundo']:>12.2f} ops/s  mediana {resultado['mediana_s'] * 1000:>10.2f} ms  "
+             f"pico {resultado['memoria_pico_bytes'] / 1024 / 1024:>8.2f} MB")
+    if resultado["aproveitamento"] is not None:
+        linha += f"  aproveitamento {resultado['aproveitamento']:.1%} ({resultado['posicionadas']}/{resultado['pecas']})"
+    if "aceleracao" in resultado:
+        linha += f"  {resultado['aceleracao']:.2f}x mais rápido que {resultado['referencia']}"
+    return linha
+
+
+def comparar(resultados, baseline, tolerancia=TOLERANCIA_PADRAO):
+    """
+    Compara os resultados com os do baseline (mesma chave) e retorna (linhas do relatório, regressões).
+    É regressão: ops/s (pelo tempo mínimo das repetições) abaixo de (1 - tolerancia) vezes o baseline,
+    se as duas execuções tiverem pelo menos REPETICOES_MINIMAS repetições; pico de memória acima de
+    (1 + tolerancia) vezes o baseline; ou aproveitamento menor que o do baseline.
+    """
+    linhas, regressoes = [], []
+    for chave, atual in resultados.items():
+        base = baseline.get(chave)
+        if base is None:
+            linhas.append(f"{chave:<48} (sem baseline)")
+            continue
+
+        # Razão de ops/s pelo tempo mínimo: atual mais rápido dá razão maior que 1
+        razao = base["minimo_s"] / atual["minimo_s"] if atual["minimo_s"] > 0 else float("inf")
+        memoria = atual["memoria_pico_bytes"] / base["memoria_pico_bytes"] if base["memoria_pico_bytes"] else 1.0
+        tempo_comparavel = min(atual["repeticoes"], base["repeticoes"]) >= REPETICOES_MINIMAS
+        problemas = []
+        if razao < 1 - tolerancia and tempo_comparavel:
+            problemas.append("tempo")
+        if memoria > 1 + tolerancia:
+            problemas.append("memória")
+        if atual["aproveitamento"] is not None and base["aproveitamento"] is not None \
+                and atual["aproveitamento"] < base["aproveitamento"] - 1e-9:
+            problemas.append("aproveitamento")
+
+        linha = f"{chave:<48} {razao:>6.2f}x ops/s  {memoria:>6.2f}x memória"
+        if not tempo_comparavel:
+            linha += f"  (tempo não avaliado: menos de {REPETICOES_MINIMAS} repetições)"
+        if problemas:
+            linha += f"  REGRESSÃO ({', '.join(problemas)})"
+            regressoes.append(chave)
+        linhas.append(linha)
+    return linhas, regressoes
+
+
+def metadados(suite, repeticoes):
+    """ Ambiente da execução, gravado junto com os resultados. """
+
+    return {
+        "suite": suite,
+        "repeticoes": repeticoes,
+        "data": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "plataforma": platform.platform(),
+        "processador": platform.processor()
+    }
+
+
+def main(argumentos=None):
+    parser = argparse.ArgumentParser(description="Benchmarks de empacotamento e do ACO.")
+    parser.add_argument("--suite", choices=tuple(SUITES), default="rapida", help="conjunto de instâncias")
+    parser.add_argument("--benchmarks", default=None,
+                        help=f"benchmarks separados por vírgula (padrão: todos; opções: {', '.join(BENCHMARKS)})")
+    parser.add_argument("--repeticoes", type=int, default=REPETICOES_MINIMAS, help="execuções medidas por benchmark")
+    parser.add_argument("--saida", default="resultados_benchmark.json", help="arquivo JSON com os resultados")
+    parser.add_argument("--baseline", default=None, help="arquivo JSON de uma execução anterior para comparação")
+    parser.add_argument("--tolerancia", type=float, default=TOLERANCIA_PADRAO,
+                        help="variação relativa tolerada antes de acusar regressão")
+    args = parser.parse_args(argumentos)
+
+    nomes = args.benchmarks.split(",") if args.benchmarks else None
+    for nome in nomes or ():
+        if nome not in BENCHMARKS:
+            parser.error(f"Benchmark desconhecido: {nome}. Opções: {', '.join(BENCHMARKS)}")
+
+    resultados = executar_benchmarks(args.suite, nomes, args.repeticoes)
+    with open(args.saida, "w") as arquivo:
+        json.dump({"metadados": metadados(args.suite, args.repeticoes), "resultados": resultados}, arquivo, indent=2)
+    print(f"Resultados gravados em {args.saida}")
+
+    if args.baseline is None:
+        return 0
+
+    with open(args.baseline) as arquivo:
+        baseline = json.load(arquivo)["resultados"]
+    linhas, regressoes = comparar(resultados, baseline, args.tolerancia)
+    print(f"\nComparação com {args.baseline} (tolerância {args.tolerancia:.0%}):")
+    for linha in linhas:
+        print(linha)
+    if regressoes:
+        print(f"{len(regressoes)} regressão(ões) encontrada(s).")
+        return 1
+    print("Nenhuma regressão encontrada.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,90 @@
+from collections import namedtuple
+import math
+import random
+
+"""
+Gerador de instâncias sintéticas para os benchmarks.
+
+- "readme": as 12 peças do README (e de app.py) na chapa 200 x 100, opcionalmente com a chapa e as
+  peças escaladas (readme_x2, readme_x4, ...) para medir o efeito da resolução do grid.
+- "mista_<n>": n peças sorteadas (com semente fixa) entre retângulos, círculos e diamantes, em uma chapa
+  2:1 dimensionada para que a soma dos bounding boxes ocupe uma fração `ocupacao` da sua área.
+- As instâncias são determinísticas: a mesma chamada gera sempre as mesmas peças.
+"""
+
+Instancia = namedtuple("Instancia", ["nome", "largura", "altura", "recortes"])
+
+PECAS_README = [
+    {"tipo": "retangular", "largura": 29, "altura": 29, "x": 1, "y": 1, "rotacao": 0},
+    {"tipo": "retangular", "largura": 29, "altura": 29, "x": 31, "y": 1, "rotacao": 0},
+    {"tipo": "retangular", "largura": 29, "altura": 29, "x": 1, "y": 31, "rotacao": 0},
+    {"tipo": "retangular", "largura": 29, "altura": 29, "x": 1, "y": 69, "rotacao": 0},
+    {"tipo": "retangular", "largura": 139, "altura": 29, "x": 60, "y": 70, "rotacao": 0},
+    {"tipo": "retangular", "largura": 60, "altura": 8, "x": 66, "y": 52, "rotacao": 0},
+    {"tipo": "retangular", "largura": 44, "altura": 4, "x": 117, "y": 39, "rotacao": 0},
+    {"tipo": "diamante", "largura": 29, "altura": 48, "x": 32, "y": 31, "rotacao": 0},
+    {"tipo": "diamante", "largura": 29, "altura": 48, "x": 62, "y": 2, "rotacao": 0},
+    {"tipo": "diamante", "largura": 29, "altura": 48, "x": 94, "y": 2, "rotacao": 0},
+    {"tipo": "circular", "r": 16, "x": 124, "y": 2},
+    {"tipo": "circular", "r": 16, "x": 158, "y": 2}
+]
+
+# Proporção padrão de retângulos, círculos e diamantes nas instâncias mistas
+PROPORCOES_PADRAO = (0.6, 0.2, 0.2)
+
+# Instâncias de cada suíte, da mais rápida à mais completa
+SUITES = {
+    "rapida": (("readme", 1), ("readme", 2), ("mista", 100)),
+    "padrao": (("readme", 1), ("readme", 2), ("readme", 4), ("mista", 100), ("mista", 1000)),
+    "completa": (("readme", 1), ("readme", 2), ("readme", 4), ("readme", 8), ("mista", 100), ("mista", 1000),
+                 ("mista", 10000))
+}
+
+
+def instancia_readme(escala=1):
+    """ Peças do README na chapa 200 x 100, com dimensões e posições multiplicadas por `escala`. """
+
+    recortes = []
+    for peca in PECAS_README:
+        escalada = dict(peca)
+        for campo in ("largura", "altura", "r", "x", "y"):
+            if campo in escalada:
+                escalada[campo] *= escala
+        recortes.append(escalada)
+
+    nome = "readme" if escala == 1 else f"readme_x{escala}"
+    return Instancia(nome, 200 * escala, 100 * escala, recortes)
+
+
+def instancia_mista(num_pecas, semente=0, proporcoes=PROPORCOES_PADRAO, ocupacao=0.6):
+    """
+    Sorteia num_pecas peças (retângulos de 5 a 40, círculos de raio 3 a 15 e diamantes de 8 a 48)
+    nas proporções dadas e dimensiona uma chapa 2:1 em que os bounding boxes ocupam `ocupacao` da área.
+    """
+    rng = random.Random(semente)
+    recortes = []
+    area_caixas = 0
+    for _ in range(num_pecas):
+        tipo = rng.choices(("retangular", "circular", "diamante"), weights=proporcoes, k=1)[0]
+        if tipo == "circular":
+            r = rng.randint(3, 15)
+            recortes.append({"tipo": "circular", "r": r, "x": 0, "y": 0, "rotacao": 0})
+            area_caixas += (2 * r) ** 2
+        else:
+            minimo, maximo = (5, 40) if tipo == "retangular" else (8, 48)
+            largura, altura = rng.randint(minimo, maximo), rng.randint(minimo, maximo)
+            recortes.append({"tipo": tipo, "largura": largura, "altura": altura, "x": 0, "y": 0, "rotacao": 0})
+            area_caixas += largura * altura
+
+    altura_chapa = max(int(math.ceil(math.sqrt(area_caixas / ocupacao / 2))), 100)
+    return Instancia(f"mista_{num_pecas}", 2 * altura_chapa, altura_chapa, recortes)
+
+
+def instancias(suite="rapida"):
+    """ Retorna as instâncias da suíte ("rapida", "padrao" ou "completa"). """
+
+    if suite not in SUITES:
+        raise ValueError(f"Suíte desconhecida: {suite}. Opções: {', '.join(SUITES)}")
+
+    return [instancia_readme(parametro) if tipo == "readme" else instancia_mista(parametro)
+            for tipo, parametro in SUITES[suite]]
@@ -0,0 +1,71 @@
+from common.occupancy_grid import OccupancyGrid
+from common.packing_base import Stamp
+import numpy as np
+
+"""
+Grid grosso (reduzido por max-pooling) usado pela busca multirresolução do FlexiblePacking.
+
+- Cada célula do grid grosso cobre um bloco fator x fator do grid de ocupação e fica ocupada se
+  qualquer célula do bloco estiver ocupada. A redução é conservadora: se a pegada reduzida de uma
+  peça só cobre células grossas livres, todas as células finas sob a pegada também estão livres.
+- Os stamps são reduzidos da mesma forma, para a fase (deslocamento dentro do bloco) em que serão
+  usados: em uma âncora grossa i, a peça fica na posição fina i * fator.
+- O grid grosso é mantido junto com o grid fino: marcar reduz a pegada marcada no grid fino, e
+  reconstruir recalcula o grid inteiro (por exemplo, ao restaurar um checkpoint).
+"""
+class CoarseGrid:
+    def __init__(self, largura, altura, fator):
+        if fator < 2:
+            raise ValueError(f"Fator de redução inválido: {fator}. O grid grosso exige fator >= 2.")
+
+        self.fator = fator
+        self.largura = largura
+        self.altura = altura
+        self.grid = OccupancyGrid(-(-largura // fator), -(-altura // fator))
+        self._stamps = {}
+
+    def reduzir_mascara(self, mask, fase_x, fase_y):
+        """
+        Reduz por max-pooling uma máscara que começa na fase (fase_x, fase_y) de um bloco:
+        a célula [i, j] do resultado é verdadeira se a máscara cobre alguma célula do bloco (i, j).
+        """
+        f = self.fator
+        largura, altura = mask.shape
+        blocos_x, blocos_y = -(-(fase_x + largura) // f), -(-(fase_y + altura) // f)
+        deslocada = np.zeros((blocos_x * f, blocos_y * f), dtype=bool)
+        deslocada[fase_x:fase_x + largura, fase_y:fase_y + altura] = mask
+        return deslocada.reshape(blocos_x, f, blocos_y, f).any(axis=(1, 3))
+
+    def stamp_reduzido(self, stamp):
+        """
+        Retorna o stamp reduzido para as âncoras alinhadas (x = i * fator, y = j * fator): com ele, a
+        âncora grossa (i, j) não colide no grid grosso só se a fina (i * fator, j * fator) estiver livre.
+        Os stamps reduzidos são reaproveitados enquanto a máscara original for a mesma.
+        """
+        cache = self._stamps.get(id(stamp.mask))
+        if cache is not None and cache[0] is stamp.mask:
+            return cache[1]
+
+        f = self.fator
+        mask = self.reduzir_mascara(stamp.mask, stamp.dx % f, stamp.dy % f)
+        mask.flags.writeable = False
+        reduzido = Stamp(mask, stamp.dx // f, stamp.dy // f, bool(mask.all()), None)
+        self._stamps[id(stamp.mask)] = (stamp.mask, reduzido)
+        return reduzido
+
+    def marcar(self, stamp, x, y):
+        """ Marca no grid grosso as células que contêm alguma célula coberta pelo stamp na posição fina (x, y). """
+
+        inicio_x, inicio_y = x + stamp.dx, y + stamp.dy
+        mask = self.reduzir_mascara(stamp.mask, inicio_x % self.fator, inicio_y % self.fator)
+        self.grid.marcar(Stamp(mask, 0, 0, False, None), inicio_x // self.fator, inicio_y // self.fator)
+
+    def reconstruir(self, densa):
+        """ Recalcula o grid grosso inteiro a partir do grid fino (matriz booleana largura x altura). """
+
+        self.grid.limpar()
+        self.grid.celulas[...] = self.reduzir_mascara(densa, 0, 0)
+
+    def limpar(self):
+        """ Marca todas as células grossas como livres. """
+        self.grid.limpar()
@@ -0,0 +1,162 @@
+from functools import lru_cache
+import numpy as np
+
+# Funções para busca de posições viáveis sobre a matriz de ocupação inteira de uma só vez,
+# em vez de testar cada (x, y) individualmente. Um mapa de viabilidade é uma matriz booleana
+# em que viavel[i, j] indica se a peça cabe na posição (x0 + i, y0 + j).
+
+# Estratégias de busca para peças não retangulares (círculos e diamantes):
+# - "varredura": testa cada posição com cabe_no_espaco, na ordem de varredura.
+# - "convolucao": calcula o mapa de colisões do stamp contra o grid inteiro por convolução 2D.
+BUSCA_VARREDURA = "varredura"
+BUSCA_CONVOLUCAO = "convolucao"
+BUSCAS = (BUSCA_VARREDURA, BUSCA_CONVOLUCAO)
+
+# Regiões menores que isto (em células) são correlacionadas com a FFT do NumPy, tão rápida quanto a do
+# SciPy nesse tamanho: as buscas em grids pequenos (como o grid grosso da busca multirresolução) não
+# pagam o import do SciPy, que leva mais tempo que um empacotamento inteiro de uma chapa pequena.
+REGIAO_MINIMA_SCIPY = 65536
+
+
+def integral_image(grid):
+    """
+    Retorna a imagem integral (tabela de somas acumuladas) do grid, com uma linha e uma
+    coluna de zeros à esquerda: integral[i, j] = soma de grid[:i, :j].
+    Com ela, a soma de qualquer retângulo do grid é obtida em O(1).
+    Para grids binários, int32 basta enquanto o número de células não ultrapassa 2^31.
+    """
+    dtype = np.int32 if grid.size < 2 ** 31 else np.int64
+    integral = np.zeros((grid.shape[0] + 1, grid.shape[1] + 1), dtype=dtype)
+    np.cumsum(grid, axis=0, out=integral[1:, 1:])
+    np.cumsum(integral[1:, 1:], axis=1, out=integral[1:, 1:])
+    return integral
+
+
+def mapa_retangulo(integral, largura, altura, x0, x1, y0, y1):
+    """
+    Calcula, em uma única passada vetorizada, se o retângulo largura x altura ancorado em
+    cada posição (x, y) com x0 <= x <= x1 e y0 <= y <= y1 está totalmente livre.
+    As âncoras devem manter o retângulo dentro do grid.
+    """
+    a = integral[x0:x1 + 1, y0:y1 + 1]
+    b = integral[x0 + largura:x1 + largura + 1, y0:y1 + 1]
+    c = integral[x0:x1 + 1, y0 + altura:y1 + altura + 1]
+    d = integral[x0 + largura:x1 + largura + 1, y0 + altura:y1 + altura + 1]
+    return (d - b - c + a) == 0
+
+
+def primeira_posicao(viavel, esquerda_direita=True, cima_baixo=True, priorizar_horizontal=True):
+    """
+    Retorna os índices (i, j) da primeira posição viável do mapa na ordem de varredura
+    configurada, ou None se nenhuma posição for viável.
+    - priorizar_horizontal: percorre cada linha (y) por completo antes de avançar para a próxima.
+    - esquerda_direita / cima_baixo: sentido da varredura em x / y.
+    """
+    if viavel.size == 0:
+        return None
+
+    if priorizar_horizontal:
+        j = _primeiro_indice(viavel.any(axis=0), cima_baixo)
+        if j is None:
+            return None
+        return _primeiro_indice(viavel[:, j], esquerda_direita), j
+
+    i = _primeiro_indice(viavel.any(axis=1), esquerda_direita)
+    if i is None:
+        return None
+    return i, _primeiro_indice(viavel[i, :], cima_baixo)
+
+
+def buscar_retangulo(integral, stamp, x0, x1, y0, y1, esquerda_direita=True, cima_baixo=True, priorizar_horizontal=True):
+    """
+    Retorna a primeira posição (x, y), na ordem de varredura, em que a peça de stamp cheio
+    (retângulo) não colide com o grid, considerando apenas x0 <= x <= x1 e y0 <= y <= y1.
+    """
+    largura, altura = stamp.mask.shape
+    max_x = integral.shape[0] - 1 - largura - stamp.dx
+    max_y = integral.shape[1] - 1 - altura - stamp.dy
+    x0, x1 = max(x0, -stamp.dx), min(x1, max_x)
+    y0, y1 = max(y0, -stamp.dy), min(y1, max_y)
+
+    if x0 > x1 or y0 > y1:
+        return None
+
+    viavel = mapa_retangulo(integral, largura, altura, x0 + stamp.dx, x1 + stamp.dx, y0 + stamp.dy, y1 + stamp.dy)
+    posicao = primeira_posicao(viavel, esquerda_direita, cima_baixo, priorizar_horizontal)
+    if posicao is None:
+        return None
+    return x0 + int(posicao[0]), y0 + int(posicao[1])
+
+
+def mapa_stamp(grid, stamp, x0, x1, y0, y1):
+    """
+    Calcula, por convolução 2D, se o stamp posicionado em cada (x, y) com x0 <= x <= x1 e
+    y0 <= y <= y1 não cobre nenhuma célula ocupada do grid. Partes do stamp fora do grid são
+    ignoradas, como em stamp_colide.
+    """
+    largura, altura = stamp.mask.shape
+    inicio_x, inicio_y = x0 + stamp.dx, y0 + stamp.dy
+    regiao = np.zeros((x1 - x0 + largura, y1 - y0 + altura))
+
+    # Copia para a região a parte do grid coberta pelas âncoras (o restante fica livre)
+    gx0, gy0 = max(inicio_x, 0), max(inicio_y, 0)
+    gx1 = min(inicio_x + regiao.shape[0], grid.shape[0])
+    gy1 = min(inicio_y + regiao.shape[1], grid.shape[1])
+    if gx0 < gx1 and gy0 < gy1:
+        regiao[gx0 - inicio_x:gx1 - inicio_x, gy0 - inicio_y:gy1 - inicio_y] = grid[gx0:gx1, gy0:gy1]
+
+    colisoes = _correlacao(regiao, stamp.mask.astype(float))
+    return colisoes < 0.5
+
+
+def buscar_stamp(grid, stamp, x0, x1, y0, y1, esquerda_direita=True, cima_baixo=True, priorizar_horizontal=True):
+    """
+    Retorna a primeira posição (x, y), na ordem de varredura, em que o stamp não colide com o grid,
+    considerando apenas x0 <= x <= x1 e y0 <= y <= y1.
+    """
+    if x0 > x1 or y0 > y1:
+        return None
+
+    viavel = mapa_stamp(grid, stamp, x0, x1, y0, y1)
+    posicao = primeira_posicao(viavel, esquerda_direita, cima_baixo, priorizar_horizontal)
+    if posicao is None:
+        return None
+    return x0 + int(posicao[0]), y0 + int(posicao[1])
+
+
+@lru_cache(maxsize=None)
+def _fftconvolve():
+    """
+    Retorna scipy.signal.fftconvolve, importado só na primeira convolução (o import do SciPy
+    é lento e a maioria das buscas não usa convolução), ou None se o SciPy não estiver instalado.
+    """
+    try:
+        from scipy.signal import fftconvolve
+    except ImportError:  # SciPy é opcional: sem ele a convolução usa a FFT do NumPy
+        return None
+    return fftconvolve
+
+
+def _correlacao(regiao, mask):
+    """
+    Correlação 2D no modo 'valid': resultado[i, j] = soma(regiao[i:i+a, j:j+b] * mask).
+    Usa scipy.signal.fftconvolve quando disponível e a região tem pelo menos REGIAO_MINIMA_SCIPY células;
+    caso contrário, a FFT do NumPy.
+    """
+    kernel = mask[::-1, ::-1]
+    fftconvolve = _fftconvolve() if regiao.size >= REGIAO_MINIMA_SCIPY else None
+    if fftconvolve is not None:
+        return fftconvolve(regiao, kernel, mode="valid")
+
+    forma = (regiao.shape[0] + mask.shape[0] - 1, regiao.shape[1] + mask.shape[1] - 1)
+    completa = np.fft.irfft2(np.fft.rfft2(regiao, forma) * np.fft.rfft2(kernel, forma), forma)
+    return completa[mask.shape[0] - 1:regiao.shape[0], mask.shape[1] - 1:regiao.shape[1]]
+
+
+def _primeiro_indice(vetor, crescente):
+    """ Primeiro índice verdadeiro do vetor no sentido indicado, ou None. """
+
+    indices = np.flatnonzero(vetor)
+    if indices.size == 0:
+        return None
+    return int(indices[0] if crescente else indices[-1])
@@ -0,0 +1,264 @@
+from common.rotation import caixa_rotacionada, deslocamentos_vertices
+from collections import namedtuple
+from functools import lru_cache
+import math
+
+"""
+Geometria contínua (sem rasterização) das peças, usada pelo GeometricPacking.
+
+- Retângulos e diamantes são polígonos convexos; círculos são (centro, raio). As coordenadas são exatas,
+  inclusive para diamantes rotacionados, e não dependem da resolução da chapa.
+- A forma de cada (tipo, dimensões, rotação) é calculada uma única vez na origem (forma_relativa) e
+  transladada para cada posição testada.
+- colidem(a, b, distancia) verifica se duas formas ficam a menos de `distancia` uma da outra:
+    - polígono x polígono: teorema dos eixos separadores (SAT) sobre as normais das arestas; as formas
+      estão separadas se a folga entre as projeções em algum eixo for de pelo menos `distancia`. Em
+      cantos, a folga é medida ao longo dos eixos (como a margem quadrada dos stamps), não em diagonal;
+    - círculo x círculo: distância entre os centros;
+    - círculo x polígono: distância do centro ao polígono (zero se estiver dentro).
+- intervalo_colisao(movel, fixa, eixo, distancia) retorna, com o mesmo critério, o intervalo de
+  deslocamentos de `movel` ao longo de um eixo em que as formas colidem. Como as formas são convexas,
+  esse conjunto é sempre um intervalo, e as posições livres de uma linha inteira da chapa saem de uma
+  única ordenação dos intervalos das peças vizinhas.
+"""
+
+# Tolerância das comparações em ponto flutuante
+EPSILON = 1e-9
+
+# Forma de uma peça posicionada:
+# - circulo: (cx, cy, r) para círculos, None para polígonos;
+# - vertices / normais: vértices do polígono convexo, em ordem, e normais unitárias das arestas sem
+#   repetir direções paralelas e sem as dos eixos x e y, já cobertas pela caixa (None para círculos);
+# - caixa: (x0, x1, y0, y1) da forma.
+Forma = namedtuple("Forma", ["circulo", "vertices", "normais", "caixa"])
+
+# Quantidade máxima de formas distintas (tipo, dimensões e rotação) mantidas em cache
+FORMA_CACHE_SIZE = 1024
+
+
+def _normais(vertices):
+    """
+    Normais unitárias das arestas do polígono, descartando as paralelas a uma já incluída e as dos eixos
+    x e y: a separação nesses eixos é a das caixas, testada antes dos eixos separadores.
+    """
+    normais = [(1.0, 0.0), (0.0, 1.0)]
+    for (x0, y0), (x1, y1) in zip(vertices, vertices[1:] + vertices[:1]):
+        comprimento = math.hypot(x1 - x0, y1 - y0)
+        if comprimento < EPSILON:
+            continue
+        nx, ny = (y1 - y0) / comprimento, (x0 - x1) / comprimento
+        if all(abs(nx * ox + ny * oy) < 1 - EPSILON for ox, oy in normais):
+            normais.append((nx, ny))
+    return tuple(normais[2:])
+
+
+def _poligono(vertices):
+    """ Forma de um polígono convexo a partir dos seus vértices. """
+
+    xs, ys = [v[0] for v in vertices], [v[1] for v in vertices]
+    return Forma(None, vertices, _normais(vertices), (min(xs), max(xs), min(ys), max(ys)))
+
+
+@lru_cache(maxsize=FORMA_CACHE_SIZE)
+def forma_relativa(tipo, largura, altura, raio, rotacao):
+    """
+    Forma da peça posicionada em (0, 0), com as mesmas convenções dos stamps: o círculo fica no
+    quadrado [0, 2r] x [0, 2r], o retângulo ocupa o seu bounding box (rotações de 0 ou 90 graus) e o
+    diamante é girado em torno do centro do retângulo largura x altura.
+    """
+    if tipo == "circular":
+        return Forma((raio, raio, raio), None, None, (0, 2 * raio, 0, 2 * raio))
+
+    if tipo == "diamante":
+        cx, cy = largura / 2, altura / 2
+        return _poligono(tuple((cx + dx, cy + dy) for dx, dy in deslocamentos_vertices(largura, altura, rotacao)))
+
+    bb_largura, bb_altura = caixa_rotacionada(largura, altura, rotacao)
+    return _poligono(((0, 0), (bb_largura, 0), (bb_largura, bb_altura), (0, bb_altura)))
+
+
+def forma_da_peca(peca):
+    """ Forma relativa de uma peça (dicionário ou common.piece.Piece) na sua rotação atual. """
+
+    if peca["tipo"] == "circular":
+        return forma_relativa("circular", None, None, peca["r"], 0)
+    return forma_relativa(peca["tipo"], peca["largura"], peca["altura"], None, peca.get("rotacao", 0))
+
+
+def transladar(forma, x, y):
+    """ Forma deslocada para a posição (x, y). """
+
+    x0, x1, y0, y1 = forma.caixa
+    if forma.circulo is not None:
+        cx, cy, r = forma.circulo
+        return Forma((cx + x, cy + y, r), None, None, (x0 + x, x1 + x, y0 + y, y1 + y))
+
+    vertices = tuple((vx + x, vy + y) for vx, vy in forma.vertices)
+    return Forma(None, vertices, forma.normais, (x0 + x, x1 + x, y0 + y, y1 + y))
+
+
+def coordenadas_contato(forma, eixo):
+    """
+    Coordenadas no eixo (0 = x, 1 = y) em que outra peça pode encostar na forma: as dos vértices do
+    polígono ou as dos extremos do círculo.
+    """
+    if forma.circulo is not None:
+        return forma.caixa[2 * eixo], forma.caixa[2 * eixo + 1]
+    return tuple(vertice[eixo] for vertice in forma.vertices)
+
+
+def dentro_da_chapa(forma, largura, altura, margem):
+    """ Verifica se a forma fica dentro da chapa largura x altura, a pelo menos `margem` das bordas. """
+
+    x0, x1, y0, y1 = forma.caixa
+    return (x0 >= margem - EPSILON and x1 <= largura - margem + EPSILON and
+            y0 >= margem - EPSILON and y1 <= altura - margem + EPSILON)
+
+
+def colidem(a, b, distancia):
+    """ Retorna True se as formas a e b ficam a menos de `distancia` uma da outra (ver o início do módulo). """
+
+    limite = distancia - EPSILON
+    ax0, ax1, ay0, ay1 = a.caixa
+    bx0, bx1, by0, by1 = b.caixa
+    if bx0 - ax1 >= limite or ax0 - bx1 >= limite or by0 - ay1 >= limite or ay0 - by1 >= limite:
+        return False
+
+    if a.circulo is not None and b.circulo is not None:
+        (ax, ay, ar), (bx, by, br) = a.circulo, b.circulo
+        return math.hypot(bx - ax, by - ay) < ar + br + limite
+    if a.circulo is not None:
+        return _circulo_poligono(a.circulo, b.vertices, limite)
+    if b.circulo is not None:
+        return _circulo_poligono(b.circulo, a.vertices, limite)
+
+    for nx, ny in a.normais + b.normais:
+        projecoes_a = [nx * vx + ny * vy for vx, vy in a.vertices]
+        projecoes_b = [nx * vx + ny * vy for vx, vy in b.vertices]
+        if min(projecoes_b) - max(projecoes_a) >= limite or min(projecoes_a) - max(projecoes_b) >= limite:
+            return False
+    return True
+
+
+def _circulo_poligono(circulo, vertices, limite):
+    """ Retorna True se a distância entre o círculo e o polígono convexo for menor que `limite`. """
+
+    cx, cy, r = circulo
+    esquerda = direita = True
+    menor = math.inf
+    for (x0, y0), (x1, y1) in zip(vertices, vertices[1:] + vertices[:1]):
+        ex, ey = x1 - x0, y1 - y0
+        comprimento2 = ex * ex + ey * ey
+        t = 0.0 if comprimento2 == 0 else min(max(((cx - x0) * ex + (cy - y0) * ey) / comprimento2, 0.0), 1.0)
+        menor = min(menor, math.hypot(cx - x0 - t * ex, cy - y0 - t * ey))
+        lado = ex * (cy - y0) - ey * (cx - x0)
+        esquerda = esquerda and lado >= 0
+        direita = direita and lado <= 0
+
+    # O centro está dentro do polígono se estiver do mesmo lado de todas as arestas
+    if esquerda or direita:
+        return True
+    return menor < r + limite
+
+
+def intervalo_colisao(movel, fixa, eixo, distancia):
+    """
+    Intervalo aberto (inicio, fim) dos deslocamentos t no eixo (0 = x, 1 = y) em que a forma `movel`,
+    transladada de t nesse eixo, colide com `fixa` (como em colidem), ou None se não colidir em nenhum.
+    """
+    outro = 1 - eixo
+    if fixa.caixa[2 * outro] - movel.caixa[2 * outro + 1] >= distancia or \
+            movel.caixa[2 * outro] - fixa.caixa[2 * outro + 1] >= distancia:
+        return None
+
+    # Sobreposição das caixas (mais a distância) ao longo do eixo
+    inicio = fixa.caixa[2 * eixo] - movel.caixa[2 * eixo + 1] - distancia
+    fim = fixa.caixa[2 * eixo + 1] - movel.caixa[2 * eixo] + distancia
+
+    if movel.circulo is not None and fixa.circulo is not None:
+        trecho = _intervalo_disco(fixa.circulo, movel.circulo, eixo, movel.circulo[2] + fixa.circulo[2] + distancia)
+    elif movel.circulo is not None:
+        trecho = _intervalo_circulo_poligono(movel.circulo, fixa.vertices, eixo, distancia)
+    elif fixa.circulo is not None:
+        # O polígono se desloca de t em relação ao círculo: equivale ao círculo se deslocar de -t
+        trecho = _intervalo_circulo_poligono(fixa.circulo, movel.vertices, eixo, distancia)
+        trecho = None if trecho is None else (-trecho[1], -trecho[0])
+    else:
+        trecho = _intervalo_poligonos(movel, fixa, eixo, distancia)
+
+    if trecho is None:
+        return None
+    inicio, fim = max(inicio, trecho[0]), min(fim, trecho[1])
+    return (inicio, fim) if inicio < fim else None
+
+
+def _intervalo_disco(centro, ponto, eixo, raio):
+    """ Deslocamentos t no eixo em que `ponto` transladado de t fica a menos de `raio` de `centro`. """
+
+    outro = 1 - eixo
+    folga = raio * raio - (ponto[outro] - centro[outro]) ** 2
+    if folga <= 0:
+        return None
+    meio, metade = centro[eixo] - ponto[eixo], math.sqrt(folga)
+    return meio - metade, meio + metade
+
+
+def _intervalo_linear(a, b, minimo, maximo):
+    """ Valores de t com minimo < a + b * t < maximo, como intervalo (possivelmente infinito), ou None. """
+
+    if abs(b) < EPSILON:
+        return (-math.inf, math.inf) if minimo < a < maximo else None
+    inicio, fim = (minimo - a) / b, (maximo - a) / b
+    return (inicio, fim) if b > 0 else (fim, inicio)
+
+
+def _intervalo_poligonos(movel, fixa, eixo, distancia):
+    """ Deslocamentos em que as projeções dos polígonos se aproximam a menos de `distancia` em todos os eixos separadores. """
+
+    inicio, fim = -math.inf, math.inf
+    for nx, ny in movel.normais + fixa.normais:
+        projecoes_a = [nx * vx + ny * vy for vx, vy in movel.vertices]
+        projecoes_b = [nx * vx + ny * vy for vx, vy in fixa.vertices]
+        # Colide neste eixo se min(b) - (max(a) + t * c) < distancia e (min(a) + t * c) - max(b) < distancia
+        minimo = min(projecoes_b) - max(projecoes_a) - distancia
+        maximo = max(projecoes_b) - min(projecoes_a) + distancia
+        c = nx if eixo == 0 else ny
+        if abs(c) < EPSILON:
+            if minimo >= 0 or maximo <= 0:
+                return None
+            continue
+        if c > 0:
+            inicio, fim = max(inicio, minimo / c), min(fim, maximo / c)
+        else:
+            inicio, fim = max(inicio, maximo / c), min(fim, minimo / c)
+        if inicio >= fim:
+            return None
+    return inicio, fim
+
+
+def _intervalo_circulo_poligono(circulo, vertices, eixo, distancia):
+    """
+    Deslocamentos t no eixo em que o centro do círculo, transladado de t, fica a menos de r + distancia do
+    polígono convexo: a interseção da reta do centro com o polígono arredondado (faixas ao longo das arestas
+    e discos nos vértices). Uma reta que cruza o polígono cruza as suas arestas, então o interior não
+    precisa ser tratado à parte.
+    """
+    cx, cy, r = circulo
+    raio = r + distancia
+    inicio, fim = math.inf, -math.inf
+    for (x0, y0), (x1, y1) in zip(vertices, vertices[1:] + vertices[:1]):
+        trecho = _intervalo_disco((x0, y0), (cx, cy), eixo, raio)
+        if trecho is not None:
+            inicio, fim = min(inicio, trecho[0]), max(fim, trecho[1])
+
+        comprimento = math.hypot(x1 - x0, y1 - y0)
+        if comprimento < EPSILON:
+            continue
+        ux, uy = (x1 - x0) / comprimento, (y1 - y0) / comprimento
+        wx, wy = cx - x0, cy - y0
+        ao_longo = _intervalo_linear(wx * ux + wy * uy, (ux, uy)[eixo], 0.0, comprimento)
+        atraves = _intervalo_linear(wx * uy - wy * ux, (uy, -ux)[eixo], -raio, raio)
+        if ao_longo is not None and atraves is not None and max(ao_longo[0], atraves[0]) < min(ao_longo[1], atraves[1]):
+            inicio, fim = min(inicio, max(ao_longo[0], atraves[0])), max(fim, min(ao_longo[1], atraves[1]))
+
+    return (inicio, fim) if inicio < fim else None
@@ -0,0 +1,104 @@
+from collections import defaultdict
+from contextlib import nullcontext
+import time
+
+"""
+Cronômetros e contadores nomeados para medir onde o tempo é gasto na construção e avaliação de layouts.
+
+- Instrumentacao acumula, por nome, o tempo (em segundos) e o número de medições de cada cronômetro
+  (with instrumentacao.cronometro("busca"): ...) e o total de cada contador (instrumentacao.contar("rotacoes_testadas")).
+- Cronômetros podem ser aninhados: o tempo de "busca" também entra no de "empacotamento", que a contém.
+- extrair() retorna os valores acumulados desde a extração anterior e zera a instrumentação, o que permite
+  métricas por iteração; mesclar() soma valores extraídos em outro processo (ou em outra iteração).
+- INSTRUMENTACAO_DESATIVADA tem a mesma interface sem fazer nada: o cronômetro é um nullcontext
+  compartilhado e contar() retorna de imediato. Código que precisa de trabalho extra só para medir
+  (por exemplo, calcular quantas posições foram testadas) deve verificar instrumentacao.ativa antes.
+"""
+
+
+class Instrumentacao:
+    ativa = True
+
+    def __init__(self):
+        self.tempos = defaultdict(float)
+        self.medicoes = defaultdict(int)
+        self.contadores = defaultdict(int)
+
+    def cronometro(self, nome):
+        """ Context manager que soma ao cronômetro `nome` o tempo gasto no bloco. """
+        return _Cronometro(self, nome)
+
+    def adicionar_tempo(self, nome, segundos):
+        """ Soma uma medição de `segundos` ao cronômetro `nome`. """
+
+        self.tempos[nome] += segundos
+        self.medicoes[nome] += 1
+
+    def contar(self, nome, quantidade=1):
+        """ Soma `quantidade` ao contador `nome`. """
+        self.contadores[nome] += quantidade
+
+    def extrair(self):
+        """
+        Retorna {"tempos": {nome: segundos}, "medicoes": {nome: n}, "contadores": {nome: total}}
+        com os valores acumulados desde a última extração e zera a instrumentação.
+        """
+        dados = {"tempos": dict(self.tempos), "medicoes": dict(self.medicoes), "contadores": dict(self.contadores)}
+        self.tempos.clear()
+        self.medicoes.clear()
+        self.contadores.clear()
+        return dados
+
+    def mesclar(self, dados):
+        """ Soma à instrumentação os valores de um dicionário retornado por extrair(). """
+
+        for nome, segundos in dados["tempos"].items():
+            self.tempos[nome] += segundos
+        for nome, quantidade in dados["medicoes"].items():
+            self.medicoes[nome] += quantidade
+        for nome, quantidade in dados["contadores"].items():
+            self.contadores[nome] += quantidade
+
+
+class _Cronometro:
+    __slots__ = ("instrumentacao", "nome", "inicio")
+
+    def __init__(self, instrumentacao, nome):
+        self.instrumentacao = instrumentacao
+        self.nome = nome
+
+    def __enter__(self):
+        self.inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, *excecao):
+        self.instrumentacao.adicionar_tempo(self.nome, time.perf_counter() - self.inicio)
+        return False
+
+
+class InstrumentacaoDesativada:
+    ativa = False
+    _nulo = nullcontext()
+
+    def cronometro(self, nome):
+        return self._nulo
+
+    def adicionar_tempo(self, nome, segundos):
+        pass
+
+    def contar(self, nome, quantidade=1):
+        pass
+
+    def extrair(self):
+        return {"tempos": {}, "medicoes": {}, "contadores": {}}
+
+    def mesclar(self, dados):
+        pass
+
+
+INSTRUMENTACAO_DESATIVADA = InstrumentacaoDesativada()
+
+
+def criar_instrumentacao(ativa):
+    """ Retorna uma Instrumentacao nova, ou a instrumentação desativada compartilhada. """
+    return Instrumentacao() if ativa else INSTRUMENTACAO_DESATIVADA
@@ -0,0 +1,81 @@
+from collections import OrderedDict
+import hashlib
+import os
+import pickle
+
+"""
+Cache LRU de layouts indexado pelo vetor de decisões que os gerou.
+
+- O layout de uma formiga depende apenas das suas decisões (varredura, direção, ordem e rotação das peças)
+  e da instância (chapa e peças); o empacotamento é determinístico. Layouts repetidos são reaproveitados.
+- A chave é um hash SHA-1 da representação do vetor de decisões, estável entre execuções, o que permite
+  persistir o cache em disco (pickle) e reaproveitá-lo em execuções seguintes da mesma instância.
+- Cada entrada guarda o layout, a sua qualidade e a rotação efetivamente usada em cada posição da ordem
+  de empacotamento (usada no depósito de feromônio de rotação). As rotações ficam por posição, e não por
+  índice da peça, porque formigas com peças idênticas em outra ordem têm a mesma chave.
+- O cache é limitado a `capacidade` entradas; ao exceder, descarta a usada há mais tempo.
+"""
+class LayoutCache:
+    def __init__(self, capacidade=1024, arquivo=None):
+        self.capacidade = capacidade
+        self.arquivo = arquivo
+        self.entradas = OrderedDict()
+        self.acertos = 0
+        self.falhas = 0
+
+        if arquivo is not None and os.path.exists(arquivo):
+            self.carregar()
+
+    @staticmethod
+    def chave(decisoes):
+        """ Retorna a chave (hash hexadecimal) de um vetor de decisões formado por tuplas, strings e números. """
+        return hashlib.sha1(repr(decisoes).encode()).hexdigest()
+
+    def obter(self, chave):
+        """ Retorna (layout, qualidade, rotacoes) da chave, marcando-a como usada recentemente, ou None. """
+
+        entrada = self.entradas.get(chave)
+        if entrada is None:
+            self.falhas += 1
+            return None
+
+        self.entradas.move_to_end(chave)
+        self.acertos += 1
+        return entrada
+
+    def guardar(self, chave, layout, qualidade, rotacoes):
+        """
+        Guarda o layout (lista de dicionários), a qualidade e as rotações usadas (uma por posição da ordem
+        de empacotamento, None para peças não posicionadas) da chave, descartando a entrada mais antiga se necessário.
+        """
+        if self.capacidade <= 0:
+            return
+
+        self.entradas[chave] = (layout, qualidade, rotacoes)
+        self.entradas.move_to_end(chave)
+        while len(self.entradas) > self.capacidade:
+            self.entradas.popitem(last=False)
+
+    def __len__(self):
+        return len(self.entradas)
+
+    def carregar(self):
+        """ Carrega as entradas salvas em self.arquivo (as mais recentes, até a capacidade). """
+
+        with open(self.arquivo, "rb") as arquivo:
+            entradas = pickle.load(arquivo)
+        if self.capacidade <= 0:
+            return
+        for chave, entrada in list(entradas.items())[-self.capacidade:]:
+            self.entradas[chave] = entrada
+
+    def salvar(self):
+        """ Salva as entradas em self.arquivo (substituindo-o de forma atômica). """
+
+        if self.arquivo is None:
+            return
+
+        temporario = f"{self.arquivo}.tmp"
+        with open(temporario, "wb") as arquivo:
+            pickle.dump(self.entradas, arquivo)
+        os.replace(temporario, self.arquivo)
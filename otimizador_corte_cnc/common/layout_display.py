@@ -1,7 +1,15 @@
-import matplotlib.pyplot as plt
-import matplotlib.patches as patches
 import math
 
+"""
+Exibição e gravação de layouts com matplotlib.
+
+- matplotlib é opcional e só é importado quando um layout é desenhado: os otimizadores podem ser
+  importados e executados em máquinas sem matplotlib (ou sem backend gráfico).
+- display_layout abre uma janela com o layout (plt.show(), que bloqueia até a janela ser fechada).
+- save_layout desenha o layout fora da tela, em uma Figure sem pyplot, e grava em arquivo (PNG, SVG ou
+  outro formato suportado, escolhido pela extensão), sem abrir janelas nem depender do backend.
+"""
+
 def rotate_point(x, y, angle, cx, cy):
     """
     Rotates a point (x,y) around a pivot (cx,cy) by angle (in degrees).
@@ -23,7 +31,29 @@ class LayoutDisplayMixin:
         Each element must have 'tipo', 'x', 'y', and for rotatable objects,
         a 'rotacao' field representing the rotation angle in degrees.
         """
+        import matplotlib.pyplot as plt
+
         fig, ax = plt.subplots(figsize=(10, 5))
+        self.draw_layout(ax, layout, title)
+        plt.show()
+
+    def save_layout(self, layout, path, title="Layout"):
+        """
+        Draws the layout off-screen and saves it to path (the format, e.g. PNG or SVG, comes from the extension).
+        Does not use pyplot, so it never opens a window and works on headless machines.
+        """
+        from matplotlib.figure import Figure
+
+        fig = Figure(figsize=(10, 5))
+        self.draw_layout(fig.subplots(), layout, title)
+        fig.savefig(path)
+        return path
+
+    def draw_layout(self, ax, layout, title="Layout"):
+        """ Draws the sheet and the layout elements on a matplotlib Axes. """
+
+        import matplotlib.patches as patches
+
         ax.set_xlim(0, self.sheet_width)
         ax.set_ylim(0, self.sheet_height)
         ax.set_xlabel("Sheet Width")
@@ -91,5 +121,3 @@ class LayoutDisplayMixin:
                     angle=angle, edgecolor='blue', facecolor='none', lw=2
                 )
                 ax.add_patch(rect)
-        
-        plt.show()
\ No newline at end of file
@@ -0,0 +1,242 @@
+from common.packing_base import limites_stamp
+import numpy as np
+
+"""
+Matrizes de ocupação compactas usadas pelos algoritmos de empacotamento e pela avaliação de layouts.
+
+- OccupancyGrid guarda uma célula booleana (1 byte) por unidade da chapa, 8x menos que um grid de inteiros.
+- BitPackedGrid guarda 1 bit por célula (64x menos), com cada coluna x empacotada em bytes ao longo de y;
+  os testes de sobreposição são feitos com AND sobre os bytes da janela coberta pelo stamp.
+
+Ambas oferecem a mesma API: colide, sobreposicao e marcar (para stamps), densa e integral (para os
+mapas de viabilidade), limpar, copia e area_ocupada. As células podem ser fornecidas pelo chamador
+(por exemplo, uma fatia de um bloco de memória compartilhada, ver piece_table.SharedGrids).
+
+Os grids também mantêm, para cada sentido de varredura, um ponteiro para a primeira linha (ou coluna)
+que ainda tem células livres. Como as células só passam de livres a ocupadas, o ponteiro só avança, e
+limitar_busca o usa para que as buscas de posição pulem as linhas iniciais já cheias.
+"""
+class OccupancyGrid:
+    def __init__(self, largura, altura, celulas=None):
+        self.largura = largura
+        self.altura = altura
+        self.celulas = np.zeros((largura, altura), dtype=bool) if celulas is None else celulas
+        self._integral = None
+        self._linhas_livres = {}
+
+    @property
+    def nbytes(self):
+        """ Memória ocupada pelas células do grid, em bytes. """
+        return self.celulas.nbytes
+
+    def _janela(self, stamp, x, y):
+        """ Retorna a janela do grid coberta pelo stamp em (x, y) e a parte correspondente da máscara. """
+
+        limites = limites_stamp(stamp, x, y, self.largura, self.altura)
+        if limites is None:
+            return None, None
+
+        gx0, gx1, gy0, gy1, mx0, my0 = limites
+        return self.celulas[gx0:gx1, gy0:gy1], stamp.mask[mx0:mx0 + gx1 - gx0, my0:my0 + gy1 - gy0]
+
+    def colide(self, stamp, x, y):
+        """ Retorna True se alguma célula ocupada estiver sob a pegada do stamp em (x, y). """
+
+        janela, mask = self._janela(stamp, x, y)
+        if janela is None:
+            return False
+        if stamp.cheio:
+            return bool(janela.any())
+        return bool(np.any(janela & mask))
+
+    def sobreposicao(self, stamp, x, y):
+        """ Retorna quantas células já ocupadas ficam sob a pegada do stamp em (x, y). """
+
+        janela, mask = self._janela(stamp, x, y)
+        if janela is None:
+            return 0
+        return int(np.count_nonzero(janela & mask))
+
+    def marcar(self, stamp, x, y):
+        """ Marca como ocupadas as células cobertas pelo stamp em (x, y). """
+
+        janela, mask = self._janela(stamp, x, y)
+        if janela is not None:
+            janela |= mask
+            self._integral = None
+
+    def densa(self):
+        """ Retorna o grid como matriz booleana largura x altura. """
+        return self.celulas
+
+    def integral(self):
+        """
+        Retorna a imagem integral do grid (ver feasibility_map.integral_image), recalculada
+        apenas quando o grid muda.
+        """
+        if self._integral is None:
+            from common.feasibility_map import integral_image
+            self._integral = integral_image(self.densa())
+        return self._integral
+
+    def _linha_cheia(self, eixo, indice):
+        """ Retorna True se a linha y = indice (eixo=1) ou a coluna x = indice (eixo=0) estiver toda ocupada. """
+
+        if eixo == 1:
+            return bool(self.celulas[:, indice].all())
+        return bool(self.celulas[indice].all())
+
+    def primeira_linha_livre(self, eixo, crescente=True):
+        """
+        Retorna o índice da primeira linha (eixo=1, y fixo) ou coluna (eixo=0, x fixo), no sentido
+        indicado, que ainda tem alguma célula livre: o total de linhas (ou -1, se decrescente) quando
+        todas estão cheias. A busca recomeça do índice da chamada anterior, sem revisitar linhas cheias.
+        """
+        total = self.altura if eixo == 1 else self.largura
+        passo = 1 if crescente else -1
+        indice = self._linhas_livres.get((eixo, crescente), 0 if crescente else total - 1)
+
+        while 0 <= indice < total and self._linha_cheia(eixo, indice):
+            indice += passo
+
+        self._linhas_livres[(eixo, crescente)] = indice
+        return indice
+
+    def limitar_busca(self, stamp, x0, x1, y0, y1, esquerda_direita=True, cima_baixo=True, priorizar_horizontal=True):
+        """
+        Restringe o intervalo de âncoras [x0, x1] x [y0, y1] de uma busca descartando, no início da
+        varredura, as linhas (ou colunas, se não priorizar_horizontal) em que o stamp certamente cobre
+        uma linha cheia do grid. Só são descartadas âncoras que colidem, então a primeira posição livre
+        na ordem de varredura não muda. Retorna o novo (x0, x1, y0, y1), possivelmente vazio.
+        """
+        if x0 > x1 or y0 > y1:
+            return x0, x1, y0, y1
+
+        # Trabalha com a máscara indexada como [eixo secundário, eixo primário da varredura]
+        if priorizar_horizontal:
+            eixo, crescente, mask = 1, cima_baixo, stamp.mask
+            (p0, p1, dp, total_p), (s0, s1, ds, total_s) = (y0, y1, stamp.dy, self.altura), (x0, x1, stamp.dx, self.largura)
+        else:
+            eixo, crescente, mask = 0, esquerda_direita, stamp.mask.T
+            (p0, p1, dp, total_p), (s0, s1, ds, total_s) = (x0, x1, stamp.dx, self.largura), (y0, y1, stamp.dy, self.altura)
+
+        # Linhas da máscara que caem dentro do grid para todas as âncoras do intervalo e que têm
+        # alguma célula também dentro do grid para todas as âncoras
+        i0, i1 = max(0, -ds - s0), min(mask.shape[0] - 1, total_s - 1 - ds - s1)
+        k0, k1 = max(0, -dp - p0), min(mask.shape[1] - 1, total_p - 1 - dp - p1)
+        if i0 > i1 or k0 > k1:
+            return x0, x1, y0, y1
+
+        linhas = np.flatnonzero(mask[i0:i1 + 1, k0:k1 + 1].any(axis=0))
+        if linhas.size == 0:
+            return x0, x1, y0, y1
+
+        livre = self.primeira_linha_livre(eixo, crescente)
+        if crescente:
+            p0 = max(p0, livre - dp - k0 - int(linhas[0]))
+        else:
+            p1 = min(p1, livre - dp - k0 - int(linhas[-1]))
+
+        if priorizar_horizontal:
+            return x0, x1, p0, p1
+        return p0, p1, y0, y1
+
+    def limpar(self):
+        """ Marca todas as células como livres, reaproveitando a memória do grid. """
+
+        self.celulas.fill(0)
+        self._integral = None
+        self._linhas_livres = {}
+
+    def instantaneo(self):
+        """ Retorna uma cópia do estado do grid (células e ponteiros de linhas livres) para restaurar depois. """
+        return self.celulas.copy(), dict(self._linhas_livres)
+
+    def restaurar(self, celulas, linhas_livres):
+        """ Restaura um estado obtido com instantaneo, reaproveitando a memória do grid. """
+
+        self.celulas[...] = celulas
+        self._integral = None
+        self._linhas_livres = dict(linhas_livres)
+
+    def copia(self):
+        """ Retorna uma cópia independente do grid. """
+        return type(self)(self.largura, self.altura, self.celulas.copy())
+
+    def area_ocupada(self):
+        """ Número de células ocupadas. """
+        return int(np.count_nonzero(self.celulas))
+
+
+class BitPackedGrid(OccupancyGrid):
+    def __init__(self, largura, altura, celulas=None):
+        palavras = np.zeros((largura, (altura + 7) // 8), dtype=np.uint8) if celulas is None else celulas
+        super().__init__(largura, altura, palavras)
+        self._mascaras = {}
+
+    def _janela(self, stamp, x, y):
+        """
+        Retorna os bytes do grid cobertos pelo stamp em (x, y) e a máscara empacotada alinhada a eles
+        (deslocada pela fase y % 8). As máscaras empacotadas de stamps não recortados são reaproveitadas.
+        """
+        limites = limites_stamp(stamp, x, y, self.largura, self.altura)
+        if limites is None:
+            return None, None
+
+        gx0, gx1, gy0, gy1, mx0, my0 = limites
+        fase = gy0 % 8
+        inteiro = (gx1 - gx0, gy1 - gy0) == stamp.mask.shape
+        chave = (id(stamp.mask), fase)
+
+        cache = self._mascaras.get(chave) if inteiro else None
+        if cache is not None and cache[0] is stamp.mask:
+            empacotada = cache[1]
+        else:
+            mask = stamp.mask[mx0:mx0 + gx1 - gx0, my0:my0 + gy1 - gy0]
+            deslocada = np.zeros((mask.shape[0], fase + mask.shape[1]), dtype=bool)
+            deslocada[:, fase:] = mask
+            empacotada = np.packbits(deslocada, axis=1)
+            if inteiro:
+                self._mascaras[chave] = (stamp.mask, empacotada)
+
+        inicio = gy0 // 8
+        return self.celulas[gx0:gx1, inicio:inicio + empacotada.shape[1]], empacotada
+
+    def colide(self, stamp, x, y):
+        """ Retorna True se alguma célula ocupada estiver sob a pegada do stamp em (x, y). """
+
+        janela, mask = self._janela(stamp, x, y)
+        if janela is None:
+            return False
+        return bool(np.any(janela & mask))
+
+    def sobreposicao(self, stamp, x, y):
+        """ Retorna quantas células já ocupadas ficam sob a pegada do stamp em (x, y). """
+
+        janela, mask = self._janela(stamp, x, y)
+        if janela is None:
+            return 0
+        return int(np.unpackbits(janela & mask).sum())
+
+    def _linha_cheia(self, eixo, indice):
+        """ Retorna True se a linha y = indice (eixo=1) ou a coluna x = indice (eixo=0) estiver toda ocupada. """
+
+        if eixo == 1:
+            return bool(((self.celulas[:, indice // 8] >> (7 - indice % 8)) & 1).all())
+        return bool(np.unpackbits(self.celulas[indice], count=self.altura).all())
+
+    def densa(self):
+        """ Desempacota o grid em uma matriz booleana largura x altura. """
+        return np.unpackbits(self.celulas, axis=1, count=self.altura).view(bool)
+
+    def area_ocupada(self):
+        """ Número de células ocupadas. """
+        return int(np.unpackbits(self.celulas).sum())
+
+
+def criar_grid(largura, altura, compacto=False):
+    """ Cria um grid de ocupação vazio: BitPackedGrid se compacto, OccupancyGrid caso contrário. """
+
+    if compacto:
+        return BitPackedGrid(largura, altura)
+    return OccupancyGrid(largura, altura)
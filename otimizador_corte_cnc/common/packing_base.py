@@ -1,6 +1,19 @@
+from common.piece import CIRCULAR, TIPOS, Piece
+from common.rotation import caixa_rotacionada, deslocamentos_vertices
+from collections import namedtuple
+from functools import lru_cache
 import math
 import numpy as np
 
+# Stamp é a pegada rasterizada de uma peça: uma máscara booleana posicionada em (x + dx, y + dy)
+# em relação à posição da peça, se a máscara é toda preenchida (retângulos) e a extensão geométrica
+# real da peça (min_x, max_x, min_y, max_y), também relativa à posição, usada na checagem de limites.
+Stamp = namedtuple("Stamp", ["mask", "dx", "dy", "cheio", "extensao"])
+
+# Quantidade máxima de stamps distintos mantidos em cada cache: (tipo, dimensões, rotação e margem) para
+# círculos e retângulos e (dimensões, rotação) para diamantes.
+STAMP_CACHE_SIZE = 1024
+
 # PackingBase é uma classe base que centraliza métodos comuns para o empacotamento de peças,
 # como o cálculo da área, determinação do bounding box, rotação de vértices e geração de máscara
 # para peças circulares. Essa classe serve como fundação para classes que implementam algoritmos
@@ -10,6 +23,8 @@ class PackingBase:
     def get_area(self, peca):
         """ Retorna a área de uma peça """
 
+        if type(peca) is Piece:
+            return peca.area
         if peca["tipo"] == "retangular":
             return peca["largura"] * peca["altura"]
         elif peca["tipo"] == "circular":
@@ -21,40 +36,26 @@ class PackingBase:
     def get_bounding_box(self, peca):
         """ Retorna a largura e altura reais da peça após rotação """
 
+        if type(peca) is Piece:
+            return peca.caixa()
         if peca["tipo"] == "circular":
             return 2 * peca["r"], 2 * peca["r"]
-    
-        angulo = math.radians(peca["rotacao"])
+
+        # Memorizado por (largura, altura, rotação), com seno e cosseno das rotações tabelados
         largura_original = peca.get("largura", 2 * peca.get("r", 0))
         altura_original = peca.get("altura", 2 * peca.get("r", 0))
-        
-        largura_rotacionada = abs(largura_original * math.cos(angulo)) + abs(altura_original * math.sin(angulo))
-        altura_rotacionada = abs(largura_original * math.sin(angulo)) + abs(altura_original * math.cos(angulo))
-
-        return int(round(largura_rotacionada)), int(round(altura_rotacionada))
+        return caixa_rotacionada(largura_original, altura_original, peca["rotacao"])
     
     def get_rotated_vertices(self, peca, x, y):
         """
         Retorna os vértices reais do diamante após a rotação, preservando seu tamanho original.
+        Os deslocamentos dos vértices em relação ao centro são memorizados por (largura, altura, rotação).
         """
 
         largura = peca["largura"]
         altura = peca["altura"]
-        cx, cy = x + largura / 2, y + altura / 2 
-        angulo = math.radians(peca["rotacao"])
-        vertices_originais = [
-            (cx, y),
-            (x + largura, cy),
-            (cx, y + altura),
-            (x, cy)
-        ]
-        return [
-            (
-                (vx - cx) * math.cos(angulo) - (vy - cy) * math.sin(angulo) + cx,
-                (vx - cx) * math.sin(angulo) + (vy - cy) * math.cos(angulo) + cy
-            )
-            for vx, vy in vertices_originais
-        ]
+        cx, cy = x + largura / 2, y + altura / 2
+        return [(dx + cx, dy + cy) for dx, dy in deslocamentos_vertices(largura, altura, peca["rotacao"])]
     
     def get_circle_mask(self, raio, margem=0):
         """
@@ -81,4 +82,140 @@ class PackingBase:
         b3 = sign((px, py), C, D) < 0.0
         b4 = sign((px, py), D, A) < 0.0
 
-        return b1 == b2 == b3 == b4
\ No newline at end of file
+        return b1 == b2 == b3 == b4
+
+    def get_diamond_mask(self, vertices, min_x, max_x, min_y, max_y):
+        """
+        Versão vetorizada de is_point_inside_diamond: avalia de uma só vez todos os pontos
+        inteiros do retângulo [min_x, max_x] x [min_y, max_y].
+        Retorna uma máscara booleana indexada como o grid ([i - min_x, j - min_y]).
+        """
+        A, B, C, D = vertices
+        px = np.arange(min_x, max_x + 1)[:, None]
+        py = np.arange(min_y, max_y + 1)[None, :]
+
+        def sign(p2, p3):
+            return (px - p3[0]) * (p2[1] - p3[1]) - (p2[0] - p3[0]) * (py - p3[1])
+
+        b1 = sign(A, B) < 0.0
+        b2 = sign(B, C) < 0.0
+        b3 = sign(C, D) < 0.0
+        b4 = sign(D, A) < 0.0
+
+        return (b1 == b2) & (b2 == b3) & (b3 == b4)
+
+    def get_stamp(self, peca, margem=0):
+        """
+        Retorna o stamp (pegada rasterizada) da peça com a margem informada.
+        A pegada depende apenas do tipo, das dimensões, da rotação e da margem, por isso
+        é rasterizada uma única vez e compartilhada por todos os empacotadores.
+        """
+        if type(peca) is Piece:
+            if peca.codigo == CIRCULAR:
+                return rasterizar_recorte("circular", None, None, peca.r, 0, margem)
+            return rasterizar_recorte(TIPOS[peca.codigo], peca.largura, peca.altura, None, peca.rotacao, margem)
+        if peca["tipo"] == "circular":
+            return rasterizar_recorte("circular", None, None, peca["r"], 0, margem)
+        return rasterizar_recorte(peca["tipo"], peca["largura"], peca["altura"], None, peca.get("rotacao", 0), margem)
+
+    def cabe_na_chapa(self, peca, stamp, x, y):
+        """
+        Verifica se a peça posicionada em (x, y) respeita os limites da chapa considerando self.margem.
+        Diamantes exigem que todos os vértices estejam estritamente dentro da área útil.
+        """
+        min_x, max_x, min_y, max_y = stamp.extensao
+
+        if peca["tipo"] == "diamante":
+            return (self.margem <= x + min_x and x + max_x < self.sheet_width - self.margem and
+                    self.margem <= y + min_y and y + max_y < self.sheet_height - self.margem)
+
+        return (x + min_x - self.margem >= 0 and x + max_x + self.margem <= self.sheet_width and
+                y + min_y - self.margem >= 0 and y + max_y + self.margem <= self.sheet_height)
+
+    def faixa_valida(self, peca, stamp):
+        """
+        Retorna o intervalo de posições inteiras (x_min, x_max, y_min, y_max), inclusivo, que
+        satisfaz cabe_na_chapa, ou None se a peça não couber em nenhuma posição.
+        Usa as mesmas comparações de cabe_na_chapa, avaliadas para todas as coordenadas de uma vez.
+        """
+        min_x, max_x, min_y, max_y = stamp.extensao
+        xs = np.arange(self.sheet_width + 1)
+        ys = np.arange(self.sheet_height + 1)
+
+        if peca["tipo"] == "diamante":
+            validos_x = (self.margem <= xs + min_x) & (xs + max_x < self.sheet_width - self.margem)
+            validos_y = (self.margem <= ys + min_y) & (ys + max_y < self.sheet_height - self.margem)
+        else:
+            validos_x = (xs + min_x - self.margem >= 0) & (xs + max_x + self.margem <= self.sheet_width)
+            validos_y = (ys + min_y - self.margem >= 0) & (ys + max_y + self.margem <= self.sheet_height)
+
+        indices_x, indices_y = np.flatnonzero(validos_x), np.flatnonzero(validos_y)
+        if indices_x.size == 0 or indices_y.size == 0:
+            return None
+        return int(indices_x[0]), int(indices_x[-1]), int(indices_y[0]), int(indices_y[-1])
+
+
+def limites_stamp(stamp, x, y, largura, altura):
+    """
+    Retorna a parte do stamp em (x, y) que fica dentro de um grid largura x altura, como
+    (gx0, gx1, gy0, gy1, mx0, my0): a janela grid[gx0:gx1, gy0:gy1] corresponde a
+    stamp.mask[mx0:mx0 + (gx1 - gx0), my0:my0 + (gy1 - gy0)]. Retorna None se não houver interseção.
+    """
+    start_x, start_y = x + stamp.dx, y + stamp.dy
+    gx0, gy0 = max(start_x, 0), max(start_y, 0)
+    gx1 = min(start_x + stamp.mask.shape[0], largura)
+    gy1 = min(start_y + stamp.mask.shape[1], altura)
+
+    if gx0 >= gx1 or gy0 >= gy1:
+        return None
+    return gx0, gx1, gy0, gy1, gx0 - start_x, gy0 - start_y
+
+
+def rasterizar_recorte(tipo, largura, altura, raio, rotacao, margem):
+    """
+    Rasteriza uma peça posicionada na origem e retorna seu Stamp.
+    - Retângulos: bloco cheio do bounding box expandido pela margem.
+    - Círculos: disco de raio (raio + margem) centrado em (raio, raio).
+    - Diamantes: pontos inteiros estritamente internos ao losango rotacionado.
+    O losango não depende da margem, então os diamantes ficam em um cache próprio, sem a margem na
+    chave. As máscaras são somente leitura, pois são compartilhadas entre chamadas.
+    """
+    if tipo == "diamante":
+        return _rasterizar_diamante(largura, altura, rotacao)
+    return _rasterizar_com_margem(tipo, largura, altura, raio, rotacao, margem)
+
+
+@lru_cache(maxsize=STAMP_CACHE_SIZE)
+def _rasterizar_diamante(largura, altura, rotacao):
+    """ Stamp dos pontos inteiros estritamente internos ao losango rotacionado, na origem. """
+
+    geometria = PackingBase()
+    peca = {"tipo": "diamante", "largura": largura, "altura": altura, "rotacao": rotacao}
+    vertices = geometria.get_rotated_vertices(peca, 0, 0)
+    extensao = (min(v[0] for v in vertices), max(v[0] for v in vertices),
+                min(v[1] for v in vertices), max(v[1] for v in vertices))
+    dx, dy = math.floor(extensao[0]), math.floor(extensao[2])
+    mask = geometria.get_diamond_mask(vertices, dx, math.floor(extensao[1]), dy, math.floor(extensao[3]))
+    mask.flags.writeable = False
+    return Stamp(mask, dx, dy, False, extensao)
+
+
+@lru_cache(maxsize=STAMP_CACHE_SIZE)
+def _rasterizar_com_margem(tipo, largura, altura, raio, rotacao, margem):
+    """ Stamp de círculos e retângulos, expandidos pela margem. """
+
+    geometria = PackingBase()
+
+    if tipo == "circular":
+        mask = geometria.get_circle_mask(raio, margem)
+        extensao = (0, 2 * raio, 0, 2 * raio)
+        cheio = False
+    else:
+        peca = {"tipo": tipo, "largura": largura, "altura": altura, "rotacao": rotacao}
+        bb_largura, bb_altura = geometria.get_bounding_box(peca)
+        mask = np.ones((bb_largura + 2 * margem, bb_altura + 2 * margem), dtype=bool)
+        extensao = (0, bb_largura, 0, bb_altura)
+        cheio = True
+
+    mask.flags.writeable = False
+    return Stamp(mask, -margem, -margem, cheio, extensao)
@@ -0,0 +1,110 @@
+from collections import OrderedDict, namedtuple
+
+"""
+Checkpoints de empacotamento compartilhados entre execuções com o mesmo prefixo de peças.
+
+- O estado do FlexiblePacking depois de processar as k primeiras peças (grid de ocupação, peças
+  posicionadas e não posicionadas) depende apenas da configuração do empacotador e dessas k peças.
+- Os estados são guardados em uma trie indexada pelas peças (tipo, dimensões e rotação inicial), uma
+  trie por configuração. Um novo empacotamento retoma do checkpoint mais profundo do seu prefixo e só
+  processa as peças restantes.
+- O consumo de memória é limitado por orcamento_bytes: ao exceder, os checkpoints usados há mais tempo
+  são descartados (LRU) e os nós que ficam sem checkpoint e sem filhos são removidos da trie.
+"""
+
+# Estado salvo depois de processar as primeiras peças:
+# - celulas / linhas_livres: cópia das células do grid e dos ponteiros de linhas livres;
+# - estados: (rotacao, x, y) final de cada peça do prefixo (x e y são None para as não posicionadas,
+#   que mantêm a posição de entrada); colocadas: se cada uma foi posicionada.
+Checkpoint = namedtuple("Checkpoint", ["celulas", "linhas_livres", "estados", "colocadas", "nbytes"])
+
+
+class _No:
+    __slots__ = ("pai", "chave", "filhos", "checkpoint")
+
+    def __init__(self, pai=None, chave=None):
+        self.pai = pai
+        self.chave = chave
+        self.filhos = {}
+        self.checkpoint = None
+
+
+class PackingCheckpoints:
+    def __init__(self, orcamento_bytes=64 * 1024 * 1024):
+        self.orcamento_bytes = orcamento_bytes
+        self.raizes = {}
+        self.recentes = OrderedDict()
+        self.bytes_usados = 0
+        self.retomadas = 0
+        self.pecas_puladas = 0
+
+    @staticmethod
+    def chave_peca(peca):
+        """
+        Chave de uma peça na trie: tipo, dimensões e, para diamantes, a rotação inicial (que define a ordem
+        das rotações testadas). Retângulos e círculos testam sempre as mesmas rotações.
+        """
+        rotacao = peca.get("rotacao", 0) if peca["tipo"] == "diamante" else None
+        return (peca["tipo"], peca.get("largura"), peca.get("altura"), peca.get("r"), rotacao)
+
+    def buscar(self, contexto, chaves):
+        """
+        Percorre a trie da configuração `contexto` seguindo as chaves das peças e retorna
+        (profundidade, nó) do checkpoint mais profundo encontrado, ou (0, raiz) se não houver nenhum.
+        """
+        raiz = self.raizes.get(contexto)
+        if raiz is None:
+            raiz = self.raizes[contexto] = _No()
+
+        melhor = (0, raiz)
+        no = raiz
+        for profundidade, chave in enumerate(chaves, start=1):
+            no = no.filhos.get(chave)
+            if no is None:
+                break
+            if no.checkpoint is not None:
+                melhor = (profundidade, no)
+
+        if melhor[1].checkpoint is not None:
+            self.recentes.move_to_end(id(melhor[1]))
+            self.retomadas += 1
+            self.pecas_puladas += melhor[0]
+        return melhor
+
+    def filho(self, no, chave):
+        """ Retorna (criando, se necessário) o filho do nó para a próxima peça. """
+
+        filho = no.filhos.get(chave)
+        if filho is None:
+            filho = no.filhos[chave] = _No(no, chave)
+        return filho
+
+    def aceita(self, no, nbytes):
+        """
+        Indica se um checkpoint de nbytes seria guardado no nó (que ainda não tem checkpoint e o checkpoint
+        cabe no orçamento). Verificação barata, feita antes de copiar o grid para criar o checkpoint.
+        """
+        return no.checkpoint is None and nbytes <= self.orcamento_bytes
+
+    def guardar(self, no, checkpoint):
+        """ Guarda o checkpoint no nó (se ainda não houver um) e descarta os mais antigos acima do orçamento. """
+
+        if not self.aceita(no, checkpoint.nbytes):
+            return
+
+        no.checkpoint = checkpoint
+        self.recentes[id(no)] = no
+        self.bytes_usados += checkpoint.nbytes
+
+        while self.bytes_usados > self.orcamento_bytes:
+            _, antigo = self.recentes.popitem(last=False)
+            self.bytes_usados -= antigo.checkpoint.nbytes
+            antigo.checkpoint = None
+            self._podar(antigo)
+
+    def _podar(self, no):
+        """ Remove da trie o nó e seus ancestrais que ficaram sem checkpoint e sem filhos. """
+
+        while no.pai is not None and no.checkpoint is None and not no.filhos:
+            del no.pai.filhos[no.chave]
+            no = no.pai
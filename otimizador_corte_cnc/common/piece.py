@@ -0,0 +1,124 @@
+from common.rotation import caixa_rotacionada
+import math
+
+"""
+Modelo compacto de peça (recorte) usado nos laços de construção de layouts.
+
+- Piece guarda os campos em __slots__, com o tipo como código inteiro (RETANGULAR, CIRCULAR, DIAMANTE)
+  e a área calculada uma única vez; o bounding box de cada rotação é memorizado para todas as peças.
+- Copiar uma peça (copia ou copy.copy) copia apenas os campos, sem o custo de copy.deepcopy.
+- Para compatibilidade com o restante do projeto, Piece também aceita o acesso como dicionário
+  (peca["tipo"], peca.get("rotacao", 0), peca["x"] = ...) com as mesmas chaves do formato de entrada.
+- Piece.de_dict / Piece.para_dict convertem do/para o formato de dicionário usado por app.py;
+  chaves fora desse formato não são preservadas.
+"""
+
+TIPOS = ("retangular", "circular", "diamante")
+CODIGOS_TIPO = {tipo: codigo for codigo, tipo in enumerate(TIPOS)}
+RETANGULAR, CIRCULAR, DIAMANTE = range(len(TIPOS))
+
+# Campos que podem ser alterados depois da criação da peça (posição, rotação e chapa)
+CAMPOS_MUTAVEIS = ("x", "y", "rotacao", "chapa")
+
+# Chaves do formato de dicionário de cada tipo de peça ("chapa" só existe depois do empacotamento em várias chapas)
+CHAVES_CIRCULO = frozenset(("tipo", "r", "x", "y", "rotacao"))
+CHAVES_POLIGONO = frozenset(("tipo", "largura", "altura", "x", "y", "rotacao"))
+
+
+class Piece:
+    __slots__ = ("codigo", "largura", "altura", "r", "rotacao", "x", "y", "chapa", "area")
+
+    def __init__(self, codigo, largura=0, altura=0, r=0, rotacao=0, x=0, y=0, chapa=None):
+        self.codigo = codigo
+        self.largura = largura
+        self.altura = altura
+        self.r = r
+        self.rotacao = rotacao
+        self.x = x
+        self.y = y
+        self.chapa = chapa
+
+        if codigo == RETANGULAR:
+            self.area = largura * altura
+        elif codigo == CIRCULAR:
+            self.area = math.pi * (r ** 2)
+        else:
+            self.area = (largura * altura) / 2
+
+    @classmethod
+    def de_dict(cls, peca):
+        """ Cria uma peça a partir do formato de dicionário ({"tipo": ..., "largura": ..., ...}). """
+
+        codigo = CODIGOS_TIPO[peca["tipo"]]
+        if codigo == CIRCULAR:
+            return cls(codigo, r=peca["r"], rotacao=peca.get("rotacao", 0), x=peca.get("x", 0), y=peca.get("y", 0),
+                       chapa=peca.get("chapa"))
+        return cls(codigo, peca["largura"], peca["altura"], rotacao=peca.get("rotacao", 0), x=peca.get("x", 0),
+                   y=peca.get("y", 0), chapa=peca.get("chapa"))
+
+    def para_dict(self):
+        """ Converte a peça para o formato de dicionário. """
+
+        if self.codigo == CIRCULAR:
+            peca = {"tipo": "circular", "r": self.r, "x": self.x, "y": self.y, "rotacao": self.rotacao}
+        else:
+            peca = {"tipo": TIPOS[self.codigo], "largura": self.largura, "altura": self.altura,
+                    "x": self.x, "y": self.y, "rotacao": self.rotacao}
+        if self.chapa is not None:
+            peca["chapa"] = self.chapa
+        return peca
+
+    def copia(self):
+        """ Retorna uma cópia da peça (os campos são todos imutáveis, então a cópia rasa basta). """
+
+        nova = Piece.__new__(Piece)
+        for campo in Piece.__slots__:
+            setattr(nova, campo, getattr(self, campo))
+        return nova
+
+    __copy__ = copia
+
+    def __deepcopy__(self, memo):
+        return self.copia()
+
+    def caixa(self):
+        """ Largura e altura do bounding box da peça na rotação atual. """
+
+        if self.codigo == CIRCULAR:
+            return 2 * self.r, 2 * self.r
+        return caixa_rotacionada(self.largura, self.altura, self.rotacao)
+
+    def __contains__(self, chave):
+        if chave == "chapa":
+            return self.chapa is not None
+        return chave in (CHAVES_CIRCULO if self.codigo == CIRCULAR else CHAVES_POLIGONO)
+
+    def __getitem__(self, chave):
+        if chave not in self:
+            raise KeyError(chave)
+        if chave == "tipo":
+            return TIPOS[self.codigo]
+        return getattr(self, chave)
+
+    def __setitem__(self, chave, valor):
+        if chave not in CAMPOS_MUTAVEIS:
+            raise KeyError(f"Campo não pode ser alterado: {chave}")
+        setattr(self, chave, valor)
+
+    def get(self, chave, padrao=None):
+        """ Mesmo comportamento de dict.get sobre as chaves do formato de dicionário. """
+
+        return self[chave] if chave in self else padrao
+
+    def __repr__(self):
+        return f"Piece({self.para_dict()})"
+
+
+def pecas_de_dicts(pecas):
+    """ Converte uma lista de peças no formato de dicionário em Pieces. """
+    return [Piece.de_dict(peca) for peca in pecas]
+
+
+def dicts_de_pecas(pecas):
+    """ Converte uma lista de Pieces (ou de dicionários, mantidos como estão) para o formato de dicionário. """
+    return [peca.para_dict() if isinstance(peca, Piece) else peca for peca in pecas]
@@ -0,0 +1,158 @@
+from common.occupancy_grid import BitPackedGrid, OccupancyGrid
+from common.piece import CODIGOS_TIPO, TIPOS
+from multiprocessing import shared_memory
+import numpy as np
+
+"""
+Tabela de peças em colunas (array estruturado do NumPy) e blocos de memória compartilhada entre processos.
+
+- Cada peça ocupa uma linha de tamanho fixo: código do tipo (os mesmos de common.piece), largura, altura, raio, rotação, x, y e chapa.
+  As dimensões são inteiras (unidades do grid), como nos empacotadores.
+- tabela_de_pecas e pecas_da_tabela convertem entre a tabela e a lista de dicionários usada no resto do projeto.
+- SharedPieceTable guarda uma tabela em multiprocessing.shared_memory: os processos de trabalho a anexam
+  pelo nome e leem/escrevem as peças sem serialização (pickle) das listas de dicionários.
+- SharedGrids guarda um grid de ocupação de rascunho por processo de trabalho no mesmo tipo de bloco,
+  reaproveitado entre empacotamentos em vez de alocado a cada formiga.
+"""
+
+PIECE_DTYPE = np.dtype([
+    ("tipo", np.int8),
+    ("largura", np.int32),
+    ("altura", np.int32),
+    ("r", np.int32),
+    ("rotacao", np.int16),
+    ("x", np.int32),
+    ("y", np.int32),
+    ("chapa", np.int32)
+])
+
+
+def tabela_de_pecas(pecas, tabela=None):
+    """
+    Preenche (ou cria, se tabela for None) uma tabela com as peças (dicionários ou Pieces).
+    Campos ausentes ficam com 0; a chapa ausente fica com -1.
+    """
+    if tabela is None:
+        tabela = np.zeros(len(pecas), dtype=PIECE_DTYPE)
+
+    for linha, peca in zip(tabela, pecas):
+        linha["tipo"] = CODIGOS_TIPO[peca["tipo"]]
+        linha["largura"] = peca.get("largura", 0)
+        linha["altura"] = peca.get("altura", 0)
+        linha["r"] = peca.get("r", 0)
+        linha["rotacao"] = peca.get("rotacao", 0)
+        linha["x"] = peca.get("x", 0)
+        linha["y"] = peca.get("y", 0)
+        linha["chapa"] = peca.get("chapa", -1)
+    return tabela
+
+
+def pecas_da_tabela(tabela):
+    """ Converte as linhas da tabela em dicionários no formato de entrada dos empacotadores. """
+
+    pecas = []
+    for tipo, largura, altura, r, rotacao, x, y, chapa in tabela.tolist():
+        if TIPOS[tipo] == "circular":
+            peca = {"tipo": "circular", "r": r, "x": x, "y": y, "rotacao": rotacao}
+        else:
+            peca = {"tipo": TIPOS[tipo], "largura": largura, "altura": altura, "x": x, "y": y, "rotacao": rotacao}
+        if chapa >= 0:
+            peca["chapa"] = chapa
+        pecas.append(peca)
+    return pecas
+
+
+class SharedPieceTable:
+    def __init__(self, memoria, forma, dono):
+        self.memoria = memoria
+        self.forma = forma
+        self.dono = dono
+        self.tabela = np.ndarray(forma, dtype=PIECE_DTYPE, buffer=memoria.buf)
+
+    @classmethod
+    def criar(cls, forma, pecas=None):
+        """
+        Aloca uma tabela compartilhada com a forma dada (número de linhas ou tupla, p. ex. formigas x peças),
+        opcionalmente preenchida com as peças informadas.
+        """
+        forma = (forma,) if isinstance(forma, int) else tuple(forma)
+        tamanho = max(int(np.prod(forma)) * PIECE_DTYPE.itemsize, 1)
+        tabela = cls(shared_memory.SharedMemory(create=True, size=tamanho), forma, dono=True)
+        tabela.tabela.fill(0)
+        if pecas is not None:
+            tabela_de_pecas(pecas, tabela.tabela)
+        return tabela
+
+    @classmethod
+    def anexar(cls, referencia):
+        """ Anexa, em outro processo, a tabela identificada por referencia (ver a propriedade referencia). """
+
+        nome, forma = referencia
+        return cls(shared_memory.SharedMemory(name=nome), forma, dono=False)
+
+    @property
+    def referencia(self):
+        """ Identificação (nome, forma) enviada aos processos de trabalho no lugar da tabela. """
+        return self.memoria.name, self.forma
+
+    def pecas(self, *indices):
+        """ Retorna as peças de tabela[indices] como lista de dicionários. """
+        return pecas_da_tabela(self.tabela[indices] if indices else self.tabela)
+
+    def fechar(self):
+        """ Libera a tabela neste processo e, no processo que a criou, remove o bloco compartilhado. """
+
+        self.tabela = None
+        self.memoria.close()
+        if self.dono:
+            self.memoria.unlink()
+
+
+class SharedGrids:
+    def __init__(self, memoria, quantidade, largura, altura, compacto, dono):
+        self.memoria = memoria
+        self.quantidade = quantidade
+        self.largura = largura
+        self.altura = altura
+        self.compacto = compacto
+        self.dono = dono
+
+        colunas = (altura + 7) // 8 if compacto else altura
+        dtype = np.uint8 if compacto else bool
+        self.celulas = np.ndarray((quantidade, largura, colunas), dtype=dtype, buffer=memoria.buf)
+
+    @classmethod
+    def criar(cls, quantidade, largura, altura, compacto=False):
+        """ Aloca `quantidade` grids de ocupação vazios em um único bloco compartilhado. """
+
+        colunas = (altura + 7) // 8 if compacto else altura
+        tamanho = max(quantidade * largura * colunas, 1)
+        grids = cls(shared_memory.SharedMemory(create=True, size=tamanho), quantidade, largura, altura, compacto, dono=True)
+        grids.celulas.fill(0)
+        return grids
+
+    @classmethod
+    def anexar(cls, referencia):
+        """ Anexa, em outro processo, os grids identificados por referencia (ver a propriedade referencia). """
+
+        nome, quantidade, largura, altura, compacto = referencia
+        return cls(shared_memory.SharedMemory(name=nome), quantidade, largura, altura, compacto, dono=False)
+
+    @property
+    def referencia(self):
+        """ Identificação enviada aos processos de trabalho no lugar dos grids. """
+        return self.memoria.name, self.quantidade, self.largura, self.altura, self.compacto
+
+    def grade(self, indice):
+        """ Retorna o grid de ocupação `indice`, com as células no bloco compartilhado (sem cópia). """
+
+        classe = BitPackedGrid if self.compacto else OccupancyGrid
+        return classe(self.largura, self.altura, self.celulas[indice])
+
+    def fechar(self):
+        """ Libera os grids neste processo e, no processo que os criou, remove o bloco compartilhado. """
+
+        self.celulas = None
+        self.memoria.close()
+        if self.dono:
+            self.memoria.unlink()
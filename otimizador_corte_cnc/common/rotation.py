@@ -0,0 +1,48 @@
+from functools import lru_cache
+import math
+
+"""
+Tabelas de rotação compartilhadas pelos empacotadores.
+
+- As rotações testadas vão de 0 a 90 graus em incrementos de 10 graus: seno e cosseno desses ângulos
+  são calculados uma única vez (com math.radians, math.sin e math.cos, gerando exatamente os mesmos valores).
+- caixa_rotacionada e deslocamentos_vertices memorizam, por (largura, altura, rotação), o bounding box
+  e os deslocamentos dos vértices do diamante em relação ao seu centro.
+"""
+
+ANGULOS_ROTACAO = tuple(range(0, 100, 10))
+SENO_COSSENO = {angulo: (math.sin(math.radians(angulo)), math.cos(math.radians(angulo))) for angulo in ANGULOS_ROTACAO}
+
+# Quantidade máxima de combinações (largura, altura, rotação) memorizadas
+ROTACOES_CACHE_SIZE = 4096
+
+
+def seno_cosseno(rotacao):
+    """ Retorna (seno, cosseno) da rotação em graus, pela tabela quando o ângulo é um dos pré-calculados. """
+
+    valores = SENO_COSSENO.get(rotacao)
+    if valores is None:
+        angulo = math.radians(rotacao)
+        valores = (math.sin(angulo), math.cos(angulo))
+    return valores
+
+
+@lru_cache(maxsize=ROTACOES_CACHE_SIZE)
+def caixa_rotacionada(largura, altura, rotacao):
+    """ Largura e altura inteiras do bounding box de um retângulo largura x altura girado. """
+
+    seno, cosseno = seno_cosseno(rotacao)
+    largura_rotacionada = abs(largura * cosseno) + abs(altura * seno)
+    altura_rotacionada = abs(largura * seno) + abs(altura * cosseno)
+    return int(round(largura_rotacionada)), int(round(altura_rotacionada))
+
+
+@lru_cache(maxsize=ROTACOES_CACHE_SIZE)
+def deslocamentos_vertices(largura, altura, rotacao):
+    """
+    Deslocamentos, em relação ao centro, dos vértices (superior, direito, inferior, esquerdo)
+    de um diamante largura x altura girado.
+    """
+    seno, cosseno = seno_cosseno(rotacao)
+    originais = ((0.0, -altura / 2), (largura / 2, 0.0), (0.0, altura / 2), (-largura / 2, 0.0))
+    return tuple((dx * cosseno - dy * seno, dx * seno + dy * cosseno) for dx, dy in originais)
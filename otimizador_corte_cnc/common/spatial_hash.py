@@ -0,0 +1,48 @@
+from collections import defaultdict
+import math
+
+"""
+Índice espacial em grid uniforme (spatial hash) das peças posicionadas pelo GeometricPacking.
+
+- A chapa é dividida em células quadradas de lado tamanho_celula; cada item é registrado em todas as
+  células que a sua caixa (x0, x1, y0, y1) cobre, e só as células ocupadas existem no dicionário.
+- consultar(caixa) retorna os itens registrados nas células cobertas pela caixa: os únicos que podem
+  tocá-la. Com células do tamanho típico das peças, cada consulta examina poucas peças vizinhas,
+  qualquer que seja a resolução da chapa.
+"""
+class SpatialHash:
+    def __init__(self, tamanho_celula):
+        if tamanho_celula <= 0:
+            raise ValueError(f"Tamanho de célula inválido: {tamanho_celula}. O tamanho deve ser positivo.")
+
+        self.tamanho_celula = tamanho_celula
+        self.celulas = defaultdict(list)
+
+    def _celulas(self, caixa):
+        """ Índices (i, j) das células cobertas pela caixa (x0, x1, y0, y1). """
+
+        x0, x1, y0, y1 = caixa
+        t = self.tamanho_celula
+        return ((i, j) for i in range(math.floor(x0 / t), math.floor(x1 / t) + 1)
+                for j in range(math.floor(y0 / t), math.floor(y1 / t) + 1))
+
+    def inserir(self, item, caixa):
+        """ Registra o item em todas as células cobertas pela caixa. """
+
+        for celula in self._celulas(caixa):
+            self.celulas[celula].append(item)
+
+    def consultar(self, caixa):
+        """ Retorna o conjunto dos itens registrados nas células cobertas pela caixa. """
+
+        itens = set()
+        celulas = self.celulas
+        for celula in self._celulas(caixa):
+            encontrados = celulas.get(celula)
+            if encontrados:
+                itens.update(encontrados)
+        return itens
+
+    def limpar(self):
+        """ Remove todos os itens. """
+        self.celulas.clear()
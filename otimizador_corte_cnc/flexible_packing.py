@@ -1,6 +1,10 @@
 from common.packing_base import PackingBase
+from common.occupancy_grid import criar_grid
+from common.coarse_grid import CoarseGrid
+from common.packing_checkpoints import Checkpoint
+from common.instrumentation import INSTRUMENTACAO_DESATIVADA
+from common.feasibility_map import BUSCA_CONVOLUCAO, BUSCA_VARREDURA, BUSCAS, buscar_retangulo, buscar_stamp
 import copy
-import numpy as np
 
 """
 Implementa um algoritmo flexível de empacotamento de peças em uma chapa, permitindo diferentes estratégias de posicionamento.
@@ -10,165 +14,255 @@ Implementa um algoritmo flexível de empacotamento de peças em uma chapa, permi
     - De cima para baixo ou de baixo para cima.
 - Suporta peças retangulares, circulares e diamantes, aplicando rotações configuráveis (0 a 90 graus em incrementos de 10 graus).
 - Utiliza uma matriz de ocupação (grid) para verificar colisões e garantir que as peças não se sobreponham.
+- Peças retangulares são posicionadas a partir de um mapa de viabilidade calculado sobre a imagem integral do grid.
+- Círculos e diamantes podem ser testados posição a posição (busca="varredura") ou por um mapa de colisões
+  calculado por convolução 2D (busca="convolucao").
+- A matriz de ocupação usa 1 byte por célula, ou 1 bit por célula com grade_compacta=True; um grid já alocado
+  (por exemplo, o grid de rascunho compartilhado de um processo de trabalho) pode ser reaproveitado com grade=...
+- As buscas começam da primeira linha da varredura com células livres, mantida de forma incremental pelo grid.
 - Adiciona uma margem opcional entre os recortes para evitar cortes imprecisos ou colisões mecânicas.
 - Mantém a ordem original dos recortes na entrada.
+- Com checkpoints=PackingCheckpoints(...), retoma do estado salvo por um empacotamento anterior com o mesmo
+  prefixo de peças e a mesma configuração, processando só as peças restantes (o resultado é o mesmo).
+- Aceita recortes como dicionários ou como common.piece.Piece; as peças posicionadas são cópias rasas das de entrada.
+- Com instrumentacao=Instrumentacao() (common.instrumentation), mede o tempo de busca, de marcação e dos checkpoints
+  e conta rotações testadas, posições testadas, chamadas de cabe_no_espaco e peças retomadas de checkpoints.
+- Com fator_reducao > 1, a busca é multirresolução: a posição é procurada primeiro em um grid grosso
+  (common.coarse_grid, cada célula cobre fator_reducao x fator_reducao células) e depois refinada no grid
+  completo, só na vizinhança da posição grossa encontrada. O grid grosso é conservador, então o resultado
+  continua sem colisões na resolução completa; como posições encostadas em peças já posicionadas podem
+  não aparecer no grid grosso, o layout pode diferir do da busca completa, que só é usada quando o grid
+  grosso não tem nenhuma posição para a peça (por mapa de viabilidade, mesmo com busca="varredura").
+  Se o fator deixar menos de CELULAS_GROSSAS_MINIMAS células grossas em algum eixo, a busca é a completa.
 
 Essa abordagem é ideal para otimizar o corte de materiais em processos industriais, como fabricação de móveis, corte de chapas metálicas, vidro, madeira e tecidos.
 """
+
+# Mínimo de células do grid grosso em cada eixo da chapa: com menos, cada célula grossa cobre uma fração
+# grande da chapa, o grid grosso quase não descarta posições e a busca multirresolução é desativada.
+CELULAS_GROSSAS_MINIMAS = 8
+
 class FlexiblePacking(PackingBase):
     def __init__(self, sheet_width, sheet_height, recortes_disponiveis, varrer_esquerda_direita=True, varrer_cima_baixo=True,
-                 priorizar_horizontal=True, margem=1):
+                 priorizar_horizontal=True, margem=1, busca=BUSCA_VARREDURA, grade_compacta=False, grade=None,
+                 checkpoints=None, instrumentacao=None, fator_reducao=1):
+        if busca not in BUSCAS:
+            raise ValueError(f"Busca desconhecida: {busca}. Opções: {', '.join(BUSCAS)}")
+
         self.sheet_width = sheet_width
         self.sheet_height = sheet_height
         self.recortes = recortes_disponiveis
         self.layout = []
-        self.grid = np.zeros((sheet_width, sheet_height), dtype=int)
+        self.nao_posicionados = []
+        self.grade_compacta = grade_compacta
+        self.grid = grade if grade is not None else criar_grid(sheet_width, sheet_height, grade_compacta)
         self.margem = margem
         self.varrer_esquerda_direita = varrer_esquerda_direita
         self.varrer_cima_baixo = varrer_cima_baixo	
         self.priorizar_horizontal = priorizar_horizontal
-
-    def cabe_no_espaco(self, peca, x, y):
+        self.busca = busca
+        self.checkpoints = checkpoints
+        self.instrumentacao = instrumentacao if instrumentacao is not None else INSTRUMENTACAO_DESATIVADA
+        self.fator_reducao = fator_reducao
+        self.grid_grosso = None
+        if fator_reducao > 1 and min(sheet_width, sheet_height) >= CELULAS_GROSSAS_MINIMAS * fator_reducao:
+            self.grid_grosso = CoarseGrid(sheet_width, sheet_height, fator_reducao)
+
+    def cabe_no_espaco(self, peca, x, y, stamp=None):
         """
         Verifica se a peça pode ser colocada sem ultrapassar os limites da chapa e sem sobreposição.
         Agora adiciona uma margem de 1 pixel entre os recortes.
+        A verificação de sobreposição é feita com uma única redução sobre a fatia do grid coberta
+        pelo stamp (pegada rasterizada e cacheada) da peça.
+        """
+        if stamp is None:
+            stamp = self.get_stamp(peca, self.margem)
+
+        if not self.cabe_na_chapa(peca, stamp, x, y):
+            return False
+
+        return not self.grid.colide(stamp, x, y)
+
+    def marcar_ocupacao(self, peca, stamp=None):
+        """
+        Marca a área ocupada pela peça na matriz de ocupação, garantindo uma margem de 1 pixel.
         """
+        if stamp is None:
+            stamp = self.get_stamp(peca, self.margem)
+
+        self.grid.marcar(stamp, peca["x"], peca["y"])
+        if self.grid_grosso is not None:
+            self.grid_grosso.marcar(stamp, peca["x"], peca["y"])
 
-        if peca["tipo"] == "circular":
-            raio = peca["r"]
-            centro_x = x + raio
-            centro_y = y + raio
-
-            # Verifica se o círculo (com margem) está dentro dos limites
-            if (centro_x - raio - self.margem < 0 or 
-                centro_x + raio + self.margem > self.sheet_width or 
-                centro_y - raio - self.margem < 0 or 
-                centro_y + raio + self.margem > self.sheet_height):
-                return False
-
-            # Obtém a máscara do círculo
-            mask = self.get_circle_mask(raio)
-            mask_shape = mask.shape
-
-            # Determina a posição inicial da máscara no grid
-            start_x = int(round(centro_x - (raio + self.margem)))
-            start_y = int(round(centro_y - (raio + self.margem)))
-
-            # Verifica a sobreposição usando a máscara
-            for i in range(mask_shape[0]):
-                for j in range(mask_shape[1]):
-                    if mask[i, j]:
-                        grid_x = start_x + i
-                        grid_y = start_y + j
-                        if grid_x < 0 or grid_x >= self.sheet_width or grid_y < 0 or grid_y >= self.sheet_height:
-                            continue
-                        if self.grid[grid_x, grid_y] == 1:
-                            return False
-
-        elif peca["tipo"] == "diamante":
-            vertices = self.get_rotated_vertices(peca, x, y)
-
-            for vx, vy in vertices:
-                if not (self.margem <= vx < self.sheet_width - self.margem and self.margem <= vy < self.sheet_height - self.margem):
-                    return False
-
-            min_x = max(int(min(v[0] for v in vertices)) - self.margem, 0)
-            max_x = min(int(max(v[0] for v in vertices)) + self.margem, self.sheet_width - 1)
-            min_y = max(int(min(v[1] for v in vertices)) - self.margem, 0)
-            max_y = min(int(max(v[1] for v in vertices)) + self.margem, self.sheet_height - 1)
-
-            range_x = range(min_x, max_x + 1) if self.varrer_esquerda_direita else range(max_x, min_x - 1, -1)
-            range_y = range(min_y, max_y + 1) if self.varrer_cima_baixo else range(max_y, min_y - 1, -1)
-
-            for i in range_x:
-                for j in range_y:
-                    if self.is_point_inside_diamond(i, j, vertices):
-                        if self.grid[i, j] == 1:
-                            return False
+    def buscar_posicao(self, peca, stamp, largura, altura):
+        """
+        Retorna a primeira posição (x, y) em que a peça cabe, seguindo a ordem de varredura
+        configurada, ou None se ela não couber na chapa.
+        Retângulos usam a imagem integral do grid (cada posição é testada em O(1) e o mapa
+        completo é calculado de uma vez); as demais peças são testadas posição a posição ou,
+        com busca="convolucao", pelo mapa de colisões calculado por convolução. Com o grid grosso
+        (fator_reducao > 1), a busca completa só é feita se buscar_posicao_grossa não encontrar posição,
+        e sempre pelos mapas de viabilidade: em geral a peça não cabe, e o mapa descarta todas as
+        posições de uma vez, com o mesmo resultado da varredura.
+        """
+        if self.grid_grosso is not None:
+            posicao = self.buscar_posicao_grossa(peca, stamp)
+            if posicao is not None:
+                return posicao
+
+        ordem = (self.varrer_esquerda_direita, self.varrer_cima_baixo, self.priorizar_horizontal)
+
+        if stamp.cheio or self.busca == BUSCA_CONVOLUCAO or self.grid_grosso is not None:
+            faixa = self.faixa_valida(peca, stamp)
+            if faixa is None:
+                return None
+
+            x_min, x_max, y_min, y_max = faixa
+            limites = self.grid.limitar_busca(stamp, max(x_min, 0), min(x_max, self.sheet_width - largura),
+                                              max(y_min, 0), min(y_max, self.sheet_height - altura), *ordem)
+            if self.instrumentacao.ativa:
+                # O mapa de viabilidade avalia todas as posições da janela de busca de uma vez
+                x0, x1, y0, y1 = limites
+                self.instrumentacao.contar("posicoes_testadas", max(x1 - x0 + 1, 0) * max(y1 - y0 + 1, 0))
+
+            if not stamp.cheio:
+                return buscar_stamp(self.grid.densa(), stamp, *limites, *ordem)
+            return buscar_retangulo(self.grid.integral(), stamp, *limites, *ordem)
+
+        # Pula as linhas iniciais da varredura que já estão cheias
+        x0, x1, y0, y1 = self.grid.limitar_busca(stamp, 0, self.sheet_width - largura, 0, self.sheet_height - altura, *ordem)
+        return self.varrer(peca, stamp, x0, x1, y0, y1)
+
+    def varrer(self, peca, stamp, x0, x1, y0, y1):
+        """
+        Testa com cabe_no_espaco cada posição de [x0, x1] x [y0, y1], na ordem de varredura configurada,
+        e retorna a primeira em que a peça cabe, ou None.
+        """
+        range_x = range(x0, x1 + 1) if self.varrer_esquerda_direita else range(x1, x0 - 1, -1)
+        range_y = range(y0, y1 + 1) if self.varrer_cima_baixo else range(y1, y0 - 1, -1)
 
+        # Alterna entre percorrer horizontalmente ou verticalmente
+        if self.priorizar_horizontal:
+            iteracoes = ((x, y) for y in range_y for x in range_x)
+        else:
+            iteracoes = ((x, y) for x in range_x for y in range_y)
+
+        # Testa cada posição disponível
+        posicao = None
+        for x, y in iteracoes:
+            if self.cabe_no_espaco(peca, x, y, stamp):
+                posicao = (x, y)
+                break
+
+        if self.instrumentacao.ativa:
+            testadas = self.posicoes_testadas(range_x, range_y, posicao)
+            self.instrumentacao.contar("posicoes_testadas", testadas)
+            self.instrumentacao.contar("chamadas_cabe_no_espaco", testadas)
+        return posicao
+
+    def buscar_posicao_grossa(self, peca, stamp):
+        """
+        Busca multirresolução: procura, no grid grosso, a primeira âncora (i, j) na ordem de varredura em
+        que o stamp reduzido não colide (pelos mesmos mapas de viabilidade da busca completa) e refina no
+        grid completo com varrer, testando as posições finas entre as âncoras grossas vizinhas. A posição
+        fina (i * fator, j * fator) está livre, então o refinamento sempre encontra uma posição.
+        Retorna None se nenhuma âncora grossa for viável.
+        """
+        faixa = self.faixa_valida(peca, stamp)
+        if faixa is None:
+            return None
+
+        f = self.fator_reducao
+        x_min, x_max, y_min, y_max = faixa
+        ordem = (self.varrer_esquerda_direita, self.varrer_cima_baixo, self.priorizar_horizontal)
+        reduzido = self.grid_grosso.stamp_reduzido(stamp)
+        grosso = self.grid_grosso.grid
+        limites = (-(-x_min // f), x_max // f, -(-y_min // f), y_max // f)
+        if self.instrumentacao.ativa:
+            i0, i1, j0, j1 = limites
+            self.instrumentacao.contar("posicoes_grossas_testadas", max(i1 - i0 + 1, 0) * max(j1 - j0 + 1, 0))
+
+        if reduzido.cheio:
+            ancora = buscar_retangulo(grosso.integral(), reduzido, *limites, *ordem)
         else:
-            largura, altura = self.get_bounding_box(peca)
+            ancora = buscar_stamp(grosso.densa(), reduzido, *limites, *ordem)
+        if ancora is None:
+            return None
+
+        i, j = ancora
+        return self.varrer(peca, stamp, max((i - 1) * f, x_min), min((i + 1) * f, x_max),
+                           max((j - 1) * f, y_min), min((j + 1) * f, y_max))
+
+    def posicoes_testadas(self, range_x, range_y, posicao):
+        """ Número de posições testadas pela varredura até encontrar `posicao` (ou todas, se for None). """
+
+        if posicao is None:
+            return len(range_x) * len(range_y)
 
-            if (
-                x - self.margem < 0 or 
-                y - self.margem < 0 or 
-                x + largura + self.margem > self.sheet_width or 
-                y + altura + self.margem > self.sheet_height
-            ):
-                return False  
+        x, y = posicao
+        if self.priorizar_horizontal:
+            return range_y.index(y) * len(range_x) + range_x.index(x) + 1
+        return range_x.index(x) * len(range_y) + range_y.index(y) + 1
 
-            range_x = range(-self.margem, largura + self.margem) if self.varrer_esquerda_direita else range(largura + self.margem - 1, -self.margem - 1, -1)
-            range_y = range(-self.margem, altura + self.margem) if self.varrer_cima_baixo else range(altura + self.margem - 1, -self.margem - 1, -1)
+    def contexto_checkpoint(self):
+        """ Configuração que, junto com o prefixo de peças, determina o estado do empacotamento. """
 
-            for i in range_x:
-                for j in range_y:
-                    if 0 <= x + i < self.sheet_width and 0 <= y + j < self.sheet_height:
-                        if self.grid[x + i, y + j] == 1:
-                            return False
+        return (self.sheet_width, self.sheet_height, self.varrer_esquerda_direita, self.varrer_cima_baixo,
+                self.priorizar_horizontal, self.margem, self.busca, type(self.grid).__name__, self.fator_reducao)
 
-        return True
+    def tamanho_checkpoint(self, num_pecas):
+        """ Memória (em bytes) de um checkpoint depois de processar num_pecas peças, sem criá-lo. """
+        return self.grid.nbytes + 64 * num_pecas
 
-    def marcar_ocupacao(self, peca):
+    def criar_checkpoint(self, estados, colocadas):
         """
-        Marca a área ocupada pela peça na matriz de ocupação, garantindo uma margem de 1 pixel.
+        Cria o checkpoint do estado atual, depois de processar as len(estados) primeiras peças, com o
+        estado final (rotacao, x, y) registrado para cada uma logo depois de processá-la.
         """
-        x, y = peca["x"], peca["y"]
-
-        if peca["tipo"] == "circular":
-            raio = peca["r"]
-            centro_x = x + raio
-            centro_y = y + raio
+        celulas, linhas_livres = self.grid.instantaneo()
+        return Checkpoint(celulas, linhas_livres, tuple(estados), tuple(colocadas), self.tamanho_checkpoint(len(estados)))
+
+    def restaurar_checkpoint(self, checkpoint):
+        """ Restaura grid, layout e peças não posicionadas a partir de um checkpoint do prefixo dos recortes. """
+
+        self.grid.restaurar(checkpoint.celulas, checkpoint.linhas_livres)
+        if self.grid_grosso is not None:
+            self.grid_grosso.reconstruir(self.grid.densa())
+        for peca, (rotacao, x, y), colocada in zip(self.recortes, checkpoint.estados, checkpoint.colocadas):
+            peca["rotacao"] = rotacao
+            if colocada:
+                peca["x"], peca["y"] = x, y
+                self.layout.append(copy.copy(peca))
+            else:
+                self.nao_posicionados.append(peca)
+        return list(checkpoint.estados), list(checkpoint.colocadas)
 
-            mask = self.get_circle_mask(raio)
-            mask_shape = mask.shape
-            start_x = int(round(centro_x - (raio + self.margem)))
-            start_y = int(round(centro_y - (raio + self.margem)))
-            
-            for i in range(mask_shape[0]):
-                for j in range(mask_shape[1]):
-                    if mask[i, j]:
-                        grid_x = start_x + i
-                        grid_y = start_y + j
-                        if 0 <= grid_x < self.sheet_width and 0 <= grid_y < self.sheet_height:
-                            self.grid[grid_x, grid_y] = 1
-
-        elif peca["tipo"] == "diamante":
-            vertices = self.get_rotated_vertices(peca, x, y)
-
-            min_x = max(int(min(v[0] for v in vertices)) - self.margem, 0)
-            max_x = min(int(max(v[0] for v in vertices)) + self.margem, self.sheet_width - 1)
-            min_y = max(int(min(v[1] for v in vertices)) - self.margem, 0)
-            max_y = min(int(max(v[1] for v in vertices)) + self.margem, self.sheet_height - 1)
-
-            range_x = range(min_x, max_x + 1) if self.varrer_esquerda_direita else range(max_x, min_x - 1, -1)
-            range_y = range(min_y, max_y + 1) if self.varrer_cima_baixo else range(max_y, min_y - 1, -1)
-
-            for i in range_x:
-                for j in range_y:
-                    if self.is_point_inside_diamond(i, j, vertices):
-                        if 0 <= i < self.sheet_width and 0 <= j < self.sheet_height:
-                            self.grid[i, j] = 1
-
-        else:  
-            largura, altura = self.get_bounding_box(peca)
-
-            range_x = range(-self.margem, largura + self.margem) if self.varrer_esquerda_direita else range(largura + self.margem - 1, -self.margem - 1, -1)
-            range_y = range(-self.margem, altura + self.margem) if self.varrer_cima_baixo else range(altura + self.margem - 1, -self.margem - 1, -1)
-
-            for i in range_x:
-                for j in range_y:
-                    if 0 <= x + i < self.sheet_width and 0 <= y + j < self.sheet_height:
-                        self.grid[x + i, y + j] = 1
-
-    
     def empacotar(self):
         """ Organiza as peças dentro da chapa considerando as configurações de varredura e margem. """
 
         # Reinicia layout e grid para evitar resíduos de execuções anteriores
         self.layout = []
-        self.grid = np.zeros((self.sheet_width, self.sheet_height), dtype=int)
-
-        for peca in self.recortes:
+        self.nao_posicionados = []
+        self.grid.limpar()
+        if self.grid_grosso is not None:
+            self.grid_grosso.limpar()
+
+        # Sem checkpoints se nem o grid cabe no orçamento: toda cópia seria descartada
+        checkpoints = self.checkpoints
+        if checkpoints is not None and self.grid.nbytes > checkpoints.orcamento_bytes:
+            checkpoints = None
+
+        # Retoma do checkpoint mais profundo com o mesmo prefixo de peças, se houver
+        inicio, no, estados, colocadas = 0, None, [], []
+        if checkpoints is not None:
+            chaves = [checkpoints.chave_peca(peca) for peca in self.recortes]
+            inicio, no = checkpoints.buscar(self.contexto_checkpoint(), chaves)
+            if no.checkpoint is not None:
+                estados, colocadas = self.restaurar_checkpoint(no.checkpoint)
+                self.instrumentacao.contar("pecas_retomadas", inicio)
+
+        for indice in range(inicio, len(self.recortes)):
+            peca = self.recortes[indice]
             encontrou_posicao = False
             
             # Retângulos só poderão rotacionar em 0 ou 90
@@ -178,31 +272,38 @@ class FlexiblePacking(PackingBase):
                 # Mantém a rotação original primeiro, depois testa outras de 0 a 90 (se necessário)
                 rotacoes = [0] if peca["tipo"] == "circular" else [peca.get("rotacao", 0)] + [r for r in range(0, 100, 10) if r != peca.get("rotacao", 0)]
             
+            rotacao_inicial = peca.get("rotacao", 0)
             for rotacao in rotacoes:
                 peca["rotacao"] = rotacao
                 largura, altura = self.get_bounding_box(peca)
-
-                # Define as ordens de varredura da chapa
-                range_x = range(0, self.sheet_width - largura + 1) if self.varrer_esquerda_direita else range(self.sheet_width - largura, -1, -1)
-                range_y = range(0, self.sheet_height - altura + 1) if self.varrer_cima_baixo else range(self.sheet_height - altura, -1, -1)
-
-                # Alterna entre percorrer horizontalmente ou verticalmente
-                if self.priorizar_horizontal:
-                    iteracoes = [(x, y) for y in range_y for x in range_x]
-                else:
-                    iteracoes = [(x, y) for x in range_x for y in range_y]
-
-                # Testa cada posição disponível
-                for x, y in iteracoes:
-                    if self.cabe_no_espaco(peca, x, y):
-                        peca["x"], peca["y"] = x, y
-                        self.layout.append(copy.deepcopy(peca))
-                        self.marcar_ocupacao(peca)
-                        encontrou_posicao = True
-                        break
+                stamp = self.get_stamp(peca, self.margem)
+                self.instrumentacao.contar("rotacoes_testadas")
+
+                with self.instrumentacao.cronometro("busca"):
+                    posicao = self.buscar_posicao(peca, stamp, largura, altura)
+                if posicao is not None:
+                    peca["x"], peca["y"] = posicao
+                    self.layout.append(copy.copy(peca))
+                    with self.instrumentacao.cronometro("marcacao"):
+                        self.marcar_ocupacao(peca, stamp)
+                    encontrou_posicao = True
 
                 # Se encontrou um local, não precisa testar outras rotações
                 if encontrou_posicao:
                     break
 
+            # A peça não posicionada volta à rotação de entrada, para que a próxima chapa comece dela
+            if not encontrou_posicao:
+                peca["rotacao"] = rotacao_inicial
+                self.nao_posicionados.append(peca)
+
+            if checkpoints is not None:
+                estados.append((peca["rotacao"], peca["x"], peca["y"]) if encontrou_posicao else (peca["rotacao"], None, None))
+                colocadas.append(encontrou_posicao)
+                with self.instrumentacao.cronometro("checkpoints"):
+                    # Só copia o grid se o checkpoint for guardado
+                    no = checkpoints.filho(no, chaves[indice])
+                    if checkpoints.aceita(no, self.tamanho_checkpoint(len(estados))):
+                        checkpoints.guardar(no, self.criar_checkpoint(estados, colocadas))
+
         return self.layout
\ No newline at end of file
@@ -0,0 +1,302 @@
+from common.packing_base import PackingBase
+from common.geometry import EPSILON, colidem, coordenadas_contato, dentro_da_chapa, forma_da_peca, intervalo_colisao, transladar
+from common.spatial_hash import SpatialHash
+from common.instrumentation import INSTRUMENTACAO_DESATIVADA
+import copy
+import math
+
+"""
+Empacotamento com geometria contínua: a mesma heurística do FlexiblePacking, sem rasterizar a chapa.
+
+- As peças são polígonos (retângulos e diamantes) e círculos com coordenadas exatas (common.geometry);
+  a colisão é verificada por eixos separadores e por distâncias, e não há matriz de ocupação.
+- A margem tem o mesmo significado dos stamps: cada peça fica a pelo menos `margem` das bordas da
+  chapa e a pelo menos 2 * margem das outras peças.
+- As peças posicionadas ficam em um índice espacial em grid uniforme (common.spatial_hash), então
+  cada teste de posição só compara a peça com as vizinhas.
+- As posições candidatas vêm dos pontos de contato. As linhas candidatas (na ordem de varredura) são as
+  bordas da chapa e as coordenadas dos vértices (ou dos extremos dos círculos) das peças já posicionadas,
+  deslocadas para que a nova peça encoste nelas. Em cada linha, as peças que cruzam a faixa da linha
+  dão os intervalos em que a nova peça colide (common.geometry.intervalo_colisao), e a primeira posição
+  livre é a primeira fora deles: a nova peça encosta na vizinha anterior. Em seguida, a peça é deslizada
+  em direção ao início da varredura, nos dois eixos, até encostar nas peças de trás.
+- O custo depende do número de peças, não da resolução da chapa. As posições são inteiras, como nos
+  demais empacotadores, e o layout tem o mesmo formato (as colisões são testadas na geometria exata).
+- Suporta as mesmas opções de varredura, rotações e o mesmo formato de entrada do FlexiblePacking.
+"""
+
+# Máximo de rodadas de deslizamento (nos dois eixos) de uma peça depois de encontrar a posição livre
+MAX_DESLIZAMENTOS = 4
+
+
+class GeometricPacking(PackingBase):
+    def __init__(self, sheet_width, sheet_height, recortes_disponiveis, varrer_esquerda_direita=True, varrer_cima_baixo=True,
+                 priorizar_horizontal=True, margem=1, tamanho_celula=None, instrumentacao=None):
+        self.sheet_width = sheet_width
+        self.sheet_height = sheet_height
+        self.recortes = recortes_disponiveis
+        self.layout = []
+        self.nao_posicionados = []
+        self.margem = margem
+        self.varrer_esquerda_direita = varrer_esquerda_direita
+        self.varrer_cima_baixo = varrer_cima_baixo
+        self.priorizar_horizontal = priorizar_horizontal
+        self.instrumentacao = instrumentacao if instrumentacao is not None else INSTRUMENTACAO_DESATIVADA
+        self.formas = []
+        self.indice = SpatialHash(tamanho_celula if tamanho_celula is not None else self.tamanho_celula_padrao())
+        self.testes = 0
+        self.linhas = 0
+
+    def tamanho_celula_padrao(self):
+        """ Lado das células do índice espacial: a maior dimensão média das peças, somada à distância entre elas. """
+
+        if not self.recortes:
+            return max(self.sheet_width, self.sheet_height, 1)
+
+        dimensoes = [max(self.get_bounding_box(peca)) for peca in self.recortes]
+        return max(sum(dimensoes) / len(dimensoes) + 2 * self.margem, 1)
+
+    def cabe_no_espaco(self, peca, x, y, forma=None):
+        """
+        Verifica se a peça pode ser colocada em (x, y) dentro da chapa, com a margem das bordas, e a
+        pelo menos 2 * margem das peças já posicionadas (apenas as vizinhas no índice espacial são testadas).
+        `forma` é a forma relativa da peça (common.geometry.forma_da_peca), se já tiver sido calculada.
+        """
+        if forma is None:
+            forma = forma_da_peca(peca)
+        self.testes += 1
+
+        posicionada = transladar(forma, x, y)
+        if not dentro_da_chapa(posicionada, self.sheet_width, self.sheet_height, self.margem):
+            return False
+        return next(self.colisoes(posicionada), None) is None
+
+    def colisoes(self, posicionada):
+        """ Gera os índices das peças posicionadas a menos de 2 * margem da forma (já transladada). """
+
+        distancia = 2 * self.margem
+        x0, x1, y0, y1 = posicionada.caixa
+        formas = self.formas
+        for i in self.indice.consultar((x0 - distancia, x1 + distancia, y0 - distancia, y1 + distancia)):
+            if colidem(posicionada, formas[i], distancia):
+                yield i
+
+    def marcar_ocupacao(self, peca, forma=None):
+        """ Registra a peça, na sua posição, no índice espacial das peças posicionadas. """
+
+        if forma is None:
+            forma = forma_da_peca(peca)
+
+        posicionada = transladar(forma, peca["x"], peca["y"])
+        self.indice.inserir(len(self.formas), posicionada.caixa)
+        self.formas.append(posicionada)
+
+    def faixa_valida(self, forma):
+        """
+        Retorna o intervalo de posições inteiras (x_min, x_max, y_min, y_max), inclusivo, em que a forma
+        fica dentro da chapa com a margem das bordas, ou None se ela não couber em nenhuma posição.
+        """
+        fx0, fx1, fy0, fy1 = forma.caixa
+        x_min, x_max = math.ceil(self.margem - fx0 - EPSILON), math.floor(self.sheet_width - self.margem - fx1 + EPSILON)
+        y_min, y_max = math.ceil(self.margem - fy0 - EPSILON), math.floor(self.sheet_height - self.margem - fy1 + EPSILON)
+        if x_min > x_max or y_min > y_max:
+            return None
+        return x_min, x_max, y_min, y_max
+
+    def candidatos(self, indices, eixo, forma, minimo, maximo, crescente):
+        """
+        Posições inteiras candidatas no eixo (0 = x, 1 = y), na ordem de varredura: os extremos da faixa
+        válida e as posições em que a forma encosta (a 2 * margem) nas coordenadas de contato das peças
+        posicionadas de `indices`, antes ou depois delas, arredondadas para longe da peça.
+        """
+        inicio, fim = forma.caixa[2 * eixo], forma.caixa[2 * eixo + 1]
+        distancia = 2 * self.margem
+        valores = {minimo, maximo}
+        for i in indices:
+            for c in coordenadas_contato(self.formas[i], eixo):
+                depois = math.ceil(c + distancia - inicio - EPSILON)
+                antes = math.floor(c - distancia - fim + EPSILON)
+                if minimo <= depois <= maximo:
+                    valores.add(depois)
+                if minimo <= antes <= maximo:
+                    valores.add(antes)
+        return sorted(valores, reverse=not crescente)
+
+    def intervalos(self, forma, posicao, eixo, inicio, fim):
+        """
+        Intervalos de colisão da forma, posicionada em `posicao` e deslocada no eixo (0 = x, 1 = y), com
+        as peças posicionadas que cruzam o corredor percorrido pela forma entre as coordenadas inicio e fim
+        do eixo (os deslocamentos são medidos a partir da coordenada 0 no eixo).
+        """
+        distancia = 2 * self.margem
+        base = list(posicao)
+        base[eixo] = 0
+        movel = transladar(forma, *base)
+
+        caixa = list(movel.caixa)
+        outro = 1 - eixo
+        caixa[2 * eixo], caixa[2 * eixo + 1] = caixa[2 * eixo] + inicio - distancia, caixa[2 * eixo + 1] + fim + distancia
+        caixa[2 * outro], caixa[2 * outro + 1] = caixa[2 * outro] - distancia, caixa[2 * outro + 1] + distancia
+
+        intervalos = []
+        for i in self.indice.consultar(caixa):
+            intervalo = intervalo_colisao(movel, self.formas[i], eixo, distancia)
+            if intervalo is not None:
+                intervalos.append(intervalo)
+        return intervalos
+
+    def primeira_livre(self, intervalos, minimo, maximo, crescente):
+        """
+        Primeira posição inteira de [minimo, maximo], na ordem de varredura, fora de todos os intervalos
+        abertos de colisão (as extremidades, em que a peça só encosta, são livres), ou None.
+        """
+        if not crescente:
+            intervalos = [(-fim, -inicio) for inicio, fim in intervalos]
+            minimo, maximo = -maximo, -minimo
+
+        posicao = minimo
+        for inicio, fim in sorted(intervalos):
+            if posicao - inicio <= EPSILON:
+                break
+            if fim - posicao > EPSILON:
+                posicao = math.ceil(fim - EPSILON)
+
+        if posicao > maximo:
+            return None
+        return posicao if crescente else -posicao
+
+    def buscar_posicao(self, peca, forma):
+        """
+        Retorna a primeira posição (x, y) livre, seguindo a ordem de varredura configurada: em cada linha
+        candidata (ou coluna, se não priorizar_horizontal), a primeira posição fora dos intervalos de
+        colisão das peças vizinhas. A posição encontrada é deslizada até encostar (ver deslizar).
+        Retorna None se a peça não couber.
+        """
+        faixa = self.faixa_valida(forma)
+        if faixa is None:
+            return None
+
+        x_min, x_max, y_min, y_max = faixa
+        limites = ((x_min, x_max), (y_min, y_max))
+        crescente = (self.varrer_esquerda_direita, self.varrer_cima_baixo)
+        primario = 1 if self.priorizar_horizontal else 0
+        secundario = 1 - primario
+        minimo, maximo = limites[secundario]
+
+        for p in self.candidatos(range(len(self.formas)), primario, forma, *limites[primario], crescente[primario]):
+            self.linhas += 1
+            posicao = [0, 0]
+            posicao[primario] = p
+            intervalos = self.intervalos(forma, posicao, secundario, minimo, maximo)
+
+            # A verificação exata confirma a posição (e descarta erros de arredondamento nos intervalos)
+            inicio, fim = (minimo, maximo) if crescente[secundario] else (maximo, minimo)
+            while True:
+                s = self.primeira_livre(intervalos, min(inicio, fim), max(inicio, fim), crescente[secundario])
+                if s is None:
+                    break
+                posicao[secundario] = s
+                if self.cabe_no_espaco(peca, *posicao, forma):
+                    return self.deslizar(peca, forma, tuple(posicao))
+                inicio = self.saltar_colisoes(forma, posicao, secundario, crescente[secundario])
+        return None
+
+    def saltar_colisoes(self, forma, posicao, eixo, crescente):
+        """
+        Próxima posição a testar no eixo depois que a verificação exata rejeitou `posicao`: o fim (na ordem
+        de varredura) dos intervalos de colisão das peças que colidem ali, recalculados a partir delas, e
+        pelo menos uma unidade adiante. O avanço não depende da resolução da chapa.
+        """
+        atual = posicao[eixo]
+        proxima = atual + 1 if crescente else atual - 1
+        base = list(posicao)
+        base[eixo] = 0
+        movel = transladar(forma, *base)
+
+        for i in self.colisoes(transladar(forma, *posicao)):
+            intervalo = intervalo_colisao(movel, self.formas[i], eixo, 2 * self.margem)
+            if intervalo is None:
+                continue
+            if crescente:
+                proxima = max(proxima, math.ceil(intervalo[1] - EPSILON))
+            else:
+                proxima = min(proxima, math.floor(intervalo[0] + EPSILON))
+        return proxima
+
+    def deslizar(self, peca, forma, posicao):
+        """
+        Desloca a peça, a partir da posição livre `posicao`, em direção ao início da varredura até encostar
+        nas peças de trás (ou na borda da chapa): primeiro no eixo das linhas, depois no outro, enquanto
+        houver movimento. Retorna a posição final, sempre livre.
+        """
+        x_min, x_max, y_min, y_max = self.faixa_valida(forma)
+        limites = ((x_min, x_max), (y_min, y_max))
+        crescente = (self.varrer_esquerda_direita, self.varrer_cima_baixo)
+        eixos = (1, 0) if self.priorizar_horizontal else (0, 1)
+
+        for _ in range(MAX_DESLIZAMENTOS):
+            movida = False
+            for eixo in eixos:
+                atual = posicao[eixo]
+                if crescente[eixo]:
+                    limite = limites[eixo][0]
+                    barreiras = [math.ceil(fim - EPSILON) for inicio, fim in self.intervalos(forma, posicao, eixo, limite, atual)
+                                 if fim <= atual + EPSILON]
+                    destino = max([limite] + barreiras)
+                else:
+                    limite = limites[eixo][1]
+                    barreiras = [math.floor(inicio + EPSILON) for inicio, fim in self.intervalos(forma, posicao, eixo, atual, limite)
+                                 if inicio >= atual - EPSILON]
+                    destino = min([limite] + barreiras)
+
+                if destino == atual:
+                    continue
+                nova = list(posicao)
+                nova[eixo] = destino
+                if self.cabe_no_espaco(peca, *nova, forma):
+                    posicao, movida = tuple(nova), True
+            if not movida:
+                break
+        return posicao
+
+    def empacotar(self):
+        """ Organiza as peças dentro da chapa considerando as configurações de varredura e margem. """
+
+        # Reinicia layout e índice para evitar resíduos de execuções anteriores
+        self.layout = []
+        self.nao_posicionados = []
+        self.formas = []
+        self.indice.limpar()
+        self.testes = 0
+        self.linhas = 0
+
+        for peca in self.recortes:
+            # Retângulos só rotacionam em 0 ou 90; diamantes mantêm a rotação original primeiro
+            if peca["tipo"] == "retangular":
+                rotacoes = [0, 90]
+            else:
+                rotacoes = [0] if peca["tipo"] == "circular" else [peca.get("rotacao", 0)] + [r for r in range(0, 100, 10) if r != peca.get("rotacao", 0)]
+
+            rotacao_inicial = peca.get("rotacao", 0)
+            posicao = None
+            for rotacao in rotacoes:
+                peca["rotacao"] = rotacao
+                forma = forma_da_peca(peca)
+                self.instrumentacao.contar("rotacoes_testadas")
+                with self.instrumentacao.cronometro("busca"):
+                    posicao = self.buscar_posicao(peca, forma)
+                if posicao is not None:
+                    peca["x"], peca["y"] = posicao
+                    self.layout.append(copy.copy(peca))
+                    with self.instrumentacao.cronometro("marcacao"):
+                        self.marcar_ocupacao(peca, forma)
+                    break
+
+            # A peça não posicionada volta à rotação de entrada, para que a próxima chapa comece dela
+            if posicao is None:
+                peca["rotacao"] = rotacao_inicial
+                self.nao_posicionados.append(peca)
+
+        self.instrumentacao.contar("linhas_testadas", self.linhas)
+        self.instrumentacao.contar("chamadas_cabe_no_espaco", self.testes)
+        return self.layout
@@ -0,0 +1,97 @@
+from flexible_packing import FlexiblePacking
+from concurrent.futures import ProcessPoolExecutor
+
+"""
+Empacotamento em várias chapas (bin packing) usando o FlexiblePacking (ou outro empacotador de uma
+chapa, como o GeometricPacking) em cada chapa.
+
+- As peças que não cabem em uma chapa transbordam para uma nova chapa, até que todas sejam posicionadas
+  (ou até max_chapas). Peças que não cabem nem em uma chapa vazia ficam em nao_posicionados.
+- Cada peça do layout recebe o campo "chapa" com o índice (a partir de 0) da chapa em que foi posicionada.
+- Quando as peças já estão atribuídas às chapas, cada chapa pode ser empacotada em paralelo
+  (empacotar_atribuicao); as sobras de cada chapa transbordam depois para novas chapas.
+"""
+
+def _empacotar_chapa(tarefa):
+    """ Empacota uma chapa em um processo de trabalho e retorna (layout, nao_posicionados). """
+
+    empacotador, sheet_width, sheet_height, recortes, opcoes = tarefa
+    packer = empacotador(sheet_width, sheet_height, recortes, **opcoes)
+    return packer.empacotar(), packer.nao_posicionados
+
+class MultiSheetPacking:
+    def __init__(self, sheet_width, sheet_height, recortes_disponiveis, max_chapas=None, empacotador=FlexiblePacking,
+                 **opcoes_empacotamento):
+        """
+        :param max_chapas: Número máximo de chapas (None = sem limite).
+        :param empacotador: Classe que empacota cada chapa (FlexiblePacking ou GeometricPacking).
+        :param opcoes_empacotamento: Parâmetros repassados ao empacotador de cada chapa
+            (varredura, margem, busca, grade_compacta).
+        """
+        self.sheet_width = sheet_width
+        self.sheet_height = sheet_height
+        self.recortes = recortes_disponiveis
+        self.max_chapas = max_chapas
+        self.empacotador = empacotador
+        self.opcoes = opcoes_empacotamento
+        self.layout = []
+        self.chapas = []
+        self.nao_posicionados = []
+
+    def adicionar_chapa(self, layout_chapa):
+        """ Registra o layout de uma nova chapa, marcando o índice da chapa em cada peça. """
+
+        indice = len(self.chapas)
+        for peca in layout_chapa:
+            peca["chapa"] = indice
+        self.chapas.append(layout_chapa)
+        self.layout.extend(layout_chapa)
+
+    def transbordar(self, pendentes):
+        """ Empacota as peças pendentes em chapas novas, uma de cada vez, enquanto houver progresso. """
+
+        while pendentes and (self.max_chapas is None or len(self.chapas) < self.max_chapas):
+            packer = self.empacotador(self.sheet_width, self.sheet_height, pendentes, **self.opcoes)
+            layout_chapa = packer.empacotar()
+
+            # Nenhuma das peças restantes cabe em uma chapa vazia
+            if not layout_chapa:
+                break
+
+            self.adicionar_chapa(layout_chapa)
+            pendentes = packer.nao_posicionados
+
+        self.nao_posicionados = pendentes
+
+    def empacotar(self):
+        """ Empacota todas as peças, abrindo novas chapas para as que não couberem nas anteriores. """
+
+        self.layout = []
+        self.chapas = []
+        self.transbordar(list(self.recortes))
+        return self.layout
+
+    def empacotar_atribuicao(self, atribuicao, num_workers=1):
+        """
+        Empacota peças já atribuídas às chapas: atribuicao[i] é a lista de peças da chapa i.
+        As chapas são independentes, então são empacotadas em paralelo quando num_workers > 1.
+        As peças que não couberem na chapa atribuída transbordam para novas chapas.
+        """
+        self.layout = []
+        self.chapas = []
+        tarefas = [(self.empacotador, self.sheet_width, self.sheet_height, recortes, self.opcoes) for recortes in atribuicao]
+
+        if num_workers is not None and num_workers > 1:
+            with ProcessPoolExecutor(max_workers=num_workers) as executor:
+                resultados = list(executor.map(_empacotar_chapa, tarefas))
+        else:
+            resultados = [_empacotar_chapa(tarefa) for tarefa in tarefas]
+
+        pendentes = []
+        for layout_chapa, sobras in resultados:
+            if layout_chapa:
+                self.adicionar_chapa(layout_chapa)
+            pendentes.extend(sobras)
+
+        self.transbordar(pendentes)
+        return self.layout
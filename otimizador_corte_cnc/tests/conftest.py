@@ -0,0 +1,8 @@
+import os
+import sys
+
+"""
+Configuração dos testes: os módulos do otimizador são importados pelo nome (from common... e
+from flexible_packing ...), como em app.py, então a pasta otimizador_corte_cnc entra no sys.path.
+"""
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,87 @@
+from benchmarks.instancias import PECAS_README
+from common.packing_base import PackingBase
+import itertools
+import math
+import numpy as np
+
+"""
+Funções de apoio dos testes: as peças do README, as configurações de varredura e uma rasterização de
+referência célula a célula (a lógica dos laços originais de cabe_no_espaco e marcar_ocupacao), usada
+para conferir os caminhos vetorizados e os layouts gerados pelos empacotadores.
+"""
+
+# Todas as configurações de varredura: (varrer_esquerda_direita, varrer_cima_baixo, priorizar_horizontal)
+VARREDURAS = tuple(itertools.product((True, False), repeat=3))
+
+_base = PackingBase()
+
+
+def pecas_readme(repeticoes=1):
+    """ Cópias das peças do README (repetidas `repeticoes` vezes). """
+    return [dict(peca) for peca in PECAS_README * repeticoes]
+
+
+def opcoes_varredura(varredura):
+    """ Parâmetros de varredura dos empacotadores para uma configuração de VARREDURAS. """
+
+    esquerda_direita, cima_baixo, horizontal = varredura
+    return {"varrer_esquerda_direita": esquerda_direita, "varrer_cima_baixo": cima_baixo,
+            "priorizar_horizontal": horizontal}
+
+
+def pegada_referencia(peca, x, y, margem):
+    """ Células (i, j) cobertas pela peça em (x, y) com a margem, testadas uma a uma. """
+
+    if peca["tipo"] == "circular":
+        r = peca["r"]
+        return [(i, j) for i in range(x - margem, x + 2 * r + margem + 1) for j in range(y - margem, y + 2 * r + margem + 1)
+                if (i - x - r) ** 2 + (j - y - r) ** 2 <= (r + margem) ** 2]
+
+    if peca["tipo"] == "diamante":
+        # O losango é rasterizado na origem (pontos estritamente internos) e deslocado para (x, y)
+        vertices = _base.get_rotated_vertices(peca, 0, 0)
+        xs, ys = [v[0] for v in vertices], [v[1] for v in vertices]
+        return [(x + i, y + j) for i in range(math.floor(min(xs)), math.floor(max(xs)) + 1)
+                for j in range(math.floor(min(ys)), math.floor(max(ys)) + 1) if _base.is_point_inside_diamond(i, j, vertices)]
+
+    largura, altura = _base.get_bounding_box(peca)
+    return [(i, j) for i in range(x - margem, x + largura + margem) for j in range(y - margem, y + altura + margem)]
+
+
+def dentro_referencia(peca, x, y, largura_chapa, altura_chapa, margem):
+    """ Limites da chapa, como nos laços originais de cabe_no_espaco. """
+
+    if peca["tipo"] == "diamante":
+        return all(margem <= vx < largura_chapa - margem and margem <= vy < altura_chapa - margem
+                   for vx, vy in _base.get_rotated_vertices(peca, x, y))
+
+    largura, altura = _base.get_bounding_box(peca)
+    return x - margem >= 0 and y - margem >= 0 and x + largura + margem <= largura_chapa and y + altura + margem <= altura_chapa
+
+
+def contagem_pegadas(layout, largura_chapa, altura_chapa, margem):
+    """ Quantas pegadas (com margem) de peças do layout cobrem cada célula da chapa. """
+
+    contagem = np.zeros((largura_chapa, altura_chapa), dtype=int)
+    for peca in layout:
+        for i, j in pegada_referencia(peca, peca["x"], peca["y"], margem):
+            if 0 <= i < largura_chapa and 0 <= j < altura_chapa:
+                contagem[i, j] += 1
+    return contagem
+
+
+def assert_layout_valido(layout, largura_chapa, altura_chapa, margem=1):
+    """ Todas as peças dentro da chapa e nenhuma célula coberta por duas pegadas com margem. """
+
+    for peca in layout:
+        assert dentro_referencia(peca, peca["x"], peca["y"], largura_chapa, altura_chapa, margem), peca
+    assert contagem_pegadas(layout, largura_chapa, altura_chapa, margem).max(initial=0) <= 1
+
+
+def por_chapa(layout):
+    """ Peças do layout agrupadas pelo campo "chapa" (0 fora do modo de várias chapas). """
+
+    chapas = {}
+    for peca in layout:
+        chapas.setdefault(peca.get("chapa", 0), []).append(peca)
+    return list(chapas.values())
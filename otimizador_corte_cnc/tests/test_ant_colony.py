@@ -0,0 +1,98 @@
+from ant_colony import AntColony, roulette_select
+from common.piece import dicts_de_pecas
+from flexible_packing import FlexiblePacking
+from helpers import VARREDURAS, assert_layout_valido, opcoes_varredura, pecas_readme, por_chapa
+from multi_sheet_packing import MultiSheetPacking
+import numpy as np
+import pytest
+
+
+def executar(**opcoes):
+    """ Executa uma colônia pequena, com semente fixa, sobre as peças do README. """
+
+    colonia = AntColony(3, 2, 200, 100, pecas_readme(), seed=7, **opcoes)
+    layout = colonia.run()
+    return colonia, layout
+
+
+@pytest.mark.parametrize("multi_sheet", (False, True))
+def test_modo_paralelo_igual_ao_sequencial(multi_sheet):
+    sequencial, layout_sequencial = executar(multi_sheet=multi_sheet)
+    paralelo, layout_paralelo = executar(multi_sheet=multi_sheet, num_workers=2)
+
+    assert layout_paralelo == layout_sequencial
+    assert paralelo.optimized_solution["quality"] == sequencial.optimized_solution["quality"]
+    for chapa in por_chapa(layout_paralelo):
+        assert_layout_valido(chapa, 200, 100)
+
+
+@pytest.mark.parametrize("varredura", VARREDURAS)
+def test_avaliacao_analitica_igual_a_rasterizada(varredura):
+    colonia = AntColony(1, 1, 200, 100, pecas_readme())
+    layout = FlexiblePacking(200, 100, pecas_readme(), margem=1, **opcoes_varredura(varredura)).empacotar()
+
+    assert colonia.evaluate_layout(layout, from_packer=True) == pytest.approx(colonia.evaluate_layout(layout))
+
+
+def test_avaliacao_analitica_igual_a_rasterizada_em_varias_chapas():
+    colonia = AntColony(1, 1, 200, 100, pecas_readme(2), multi_sheet=True)
+    layout = MultiSheetPacking(200, 100, pecas_readme(2), margem=1).empacotar()
+
+    assert colonia.evaluate_layout(layout, from_packer=True) == pytest.approx(colonia.evaluate_layout(layout))
+
+
+def test_rotacoes_do_cache_seguem_a_ordem_da_formiga():
+    # Peças 1 e 7 são idênticas: as duas ordens abaixo têm a mesma chave no cache de layouts
+    dimensoes = ((30, 30), (20, 10), (35, 25), (10, 10), (40, 20), (15, 30), (12, 8), (20, 10))
+    pecas = [{"tipo": "retangular", "largura": largura, "altura": altura, "rotacao": 0} for largura, altura in dimensoes]
+    ordens = ([1, 0, 2, 3, 4, 5, 6, 7], [7, 0, 2, 3, 4, 5, 6, 1])
+
+    com_cache = AntColony(1, 1, 80, 50, pecas, checkpoint_budget_mb=0)
+    sem_cache = AntColony(1, 1, 80, 50, pecas, layout_cache_size=0, checkpoint_budget_mb=0)
+    for ordem in ordens:
+        decisao = {"scan": "left_to_right_top_to_bottom", "direction": "vertical", "order": ordem, "rotations": None}
+        esperada = sem_cache.construct_and_evaluate(0, decisao)
+        obtida = com_cache.construct_and_evaluate(0, decisao)
+
+        assert obtida["rotation"] == esperada["rotation"]
+        assert dicts_de_pecas(obtida["layout"]) == dicts_de_pecas(esperada["layout"])
+    assert obtida["cache_hit"]
+
+
+# Chapa apertada: sempre falta alguma peça, então a qualidade de todas as formigas é negativa
+PECAS_APERTADAS = [{"tipo": "retangular", "largura": largura, "altura": altura, "rotacao": 0}
+                   for largura, altura in ((30, 30), (20, 10), (35, 25), (10, 10), (40, 20), (15, 30), (12, 8))]
+
+
+@pytest.mark.parametrize("order_alpha", (1.0, 0.5))
+def test_qualidade_negativa_nao_deixa_feromonios_negativos(order_alpha):
+    colonia = AntColony(6, 4, 80, 50, [dict(peca) for peca in PECAS_APERTADAS], seed=0, order_alpha=order_alpha)
+    layout = colonia.run()
+
+    assert colonia.optimized_solution["quality"] < 0
+    for pheromones in (colonia.pheromones_scan, colonia.pheromones_direction, colonia.pheromones_order, colonia.pheromones_rotation):
+        assert (pheromones >= 0).all()
+    assert sorted(colonia.optimized_solution["order"]) == list(range(len(PECAS_APERTADAS)))
+    assert_layout_valido(layout, 80, 50)
+
+
+def test_sample_orders_sempre_gera_permutacoes():
+    colonia = AntColony(1, 1, 200, 100, pecas_readme(), seed=0)
+    colonia.initialize_pheromones()
+    rng = np.random.default_rng(0)
+
+    # Feromônios arbitrários, inclusive negativos e linhas inteiras zeradas
+    colonia.pheromones_order = rng.normal(size=colonia.pheromones_order.shape)
+    colonia.pheromones_order[[0, 5]] = 0.0
+    for order_alpha in (1.0, 0.5):
+        colonia.order_alpha = order_alpha
+        orders = colonia.sample_orders(rng, 2000)
+        assert (np.sort(orders, axis=1) == np.arange(12)).all()
+
+
+def test_roulette_select_nunca_escolhe_peso_nulo_ou_negativo():
+    weights = np.array([[0.0, 2.0, -5.0, 1.0, 0.0], [-1.0, -1.0, 0.0, 0.0, 0.0], [3.0, 0.0, 0.0, 0.0, 0.0]])
+    for u in (0.0, 0.5, np.nextafter(1.0, 0.0)):
+        choice = roulette_select(weights, np.full(3, u))
+        assert choice[0] in (1, 3)
+        assert choice[1] == 0 and choice[2] == 0
@@ -0,0 +1,20 @@
+from benchmarks.benchmark import REPETICOES_MINIMAS, comparar
+
+
+def resultado(minimo_s, repeticoes=REPETICOES_MINIMAS, memoria=1000, aproveitamento=0.5):
+    return {"minimo_s": minimo_s, "repeticoes": repeticoes, "memoria_pico_bytes": memoria, "aproveitamento": aproveitamento}
+
+
+def test_comparar_usa_o_tempo_minimo_e_a_tolerancia():
+    baseline = {"a/x": resultado(1.0), "b/x": resultado(1.0)}
+    _, regressoes = comparar({"a/x": resultado(1.2), "b/x": resultado(1.5)}, baseline, tolerancia=0.25)
+
+    assert regressoes == ["b/x"]
+
+
+def test_comparar_ignora_tempo_com_poucas_repeticoes():
+    baseline = {"a/x": resultado(1.0, repeticoes=1)}
+
+    assert comparar({"a/x": resultado(3.0)}, baseline)[1] == []
+    assert comparar({"a/x": resultado(3.0, memoria=5000)}, baseline)[1] == ["a/x"]
+    assert comparar({"a/x": resultado(1.0, aproveitamento=0.4)}, baseline)[1] == ["a/x"]
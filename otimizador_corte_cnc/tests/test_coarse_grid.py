@@ -0,0 +1,29 @@
+from benchmarks.instancias import instancia_mista, instancia_readme
+from flexible_packing import CELULAS_GROSSAS_MINIMAS, FlexiblePacking
+from helpers import VARREDURAS, assert_layout_valido, opcoes_varredura
+import pytest
+
+
+@pytest.mark.parametrize("varredura", VARREDURAS)
+@pytest.mark.parametrize("fator", (2, 4, 8))
+def test_busca_multirresolucao_sem_colisoes(varredura, fator):
+    for instancia in (instancia_readme(2), instancia_mista(40)):
+        recortes = [dict(peca) for peca in instancia.recortes]
+        packer = FlexiblePacking(instancia.largura, instancia.altura, recortes, margem=1, fator_reducao=fator,
+                                 **opcoes_varredura(varredura))
+        layout = packer.empacotar()
+
+        assert packer.grid_grosso is not None
+        assert len(layout) + len(packer.nao_posicionados) == len(recortes)
+        assert_layout_valido(layout, instancia.largura, instancia.altura)
+
+
+def test_poucas_celulas_grossas_usam_a_busca_completa():
+    instancia = instancia_readme(1)
+    fator = instancia.altura // CELULAS_GROSSAS_MINIMAS + 1
+    grosso = FlexiblePacking(instancia.largura, instancia.altura, [dict(peca) for peca in instancia.recortes],
+                             margem=1, fator_reducao=fator)
+    completo = FlexiblePacking(instancia.largura, instancia.altura, [dict(peca) for peca in instancia.recortes], margem=1)
+
+    assert grosso.grid_grosso is None
+    assert grosso.empacotar() == completo.empacotar()
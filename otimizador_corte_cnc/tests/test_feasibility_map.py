@@ -0,0 +1,51 @@
+from flexible_packing import FlexiblePacking
+from helpers import VARREDURAS, opcoes_varredura, pecas_readme
+import pytest
+
+RETANGULOS = ((29, 29, 0), (60, 8, 0), (60, 8, 90), (44, 4, 0), (12, 30, 0), (3, 3, 0))
+
+
+def empacotador_parcial(varredura, **opcoes):
+    """ Empacotador com as 8 primeiras peças do README já posicionadas (grid parcialmente ocupado). """
+
+    packer = FlexiblePacking(200, 100, pecas_readme()[:8], margem=1, **opcoes_varredura(varredura), **opcoes)
+    packer.empacotar()
+    return packer
+
+
+def busca_por_varredura(packer, peca):
+    """ Primeira posição pela varredura posição a posição, em toda a chapa (como no empacotar original). """
+
+    largura, altura = packer.get_bounding_box(peca)
+    return packer.varrer(peca, packer.get_stamp(peca, packer.margem), 0, packer.sheet_width - largura,
+                         0, packer.sheet_height - altura)
+
+
+@pytest.mark.parametrize("varredura", VARREDURAS)
+def test_retangulos_pela_imagem_integral_igual_a_varredura(varredura):
+    packer = empacotador_parcial(varredura)
+
+    for largura, altura, rotacao in RETANGULOS:
+        peca = {"tipo": "retangular", "largura": largura, "altura": altura, "rotacao": rotacao}
+        stamp = packer.get_stamp(peca, packer.margem)
+        assert packer.buscar_posicao(peca, stamp, *packer.get_bounding_box(peca)) == busca_por_varredura(packer, peca)
+
+
+@pytest.mark.parametrize("varredura", VARREDURAS)
+def test_mapa_de_colisoes_por_convolucao_igual_a_varredura(varredura):
+    packer = empacotador_parcial(varredura, busca="convolucao")
+    pecas = [{"tipo": "circular", "r": r, "rotacao": 0} for r in (3, 9, 16)]
+    pecas += [{"tipo": "diamante", "largura": 29, "altura": 48, "rotacao": rotacao} for rotacao in (0, 20, 50, 90)]
+    pecas += [{"tipo": "diamante", "largura": 8, "altura": 6, "rotacao": 40}]
+
+    for peca in pecas:
+        stamp = packer.get_stamp(peca, packer.margem)
+        assert packer.buscar_posicao(peca, stamp, *packer.get_bounding_box(peca)) == busca_por_varredura(packer, peca), peca
+
+
+@pytest.mark.parametrize("varredura", VARREDURAS)
+def test_layout_por_convolucao_igual_ao_da_varredura(varredura):
+    layouts = [FlexiblePacking(200, 100, pecas_readme(), margem=1, busca=busca, **opcoes_varredura(varredura)).empacotar()
+               for busca in ("varredura", "convolucao")]
+
+    assert layouts[0] == layouts[1]
@@ -0,0 +1,41 @@
+from flexible_packing import FlexiblePacking
+from helpers import VARREDURAS, assert_layout_valido, contagem_pegadas, dentro_referencia, opcoes_varredura, pecas_readme, pegada_referencia
+import random
+import pytest
+
+ROTACOES = {"retangular": (0, 90), "circular": (0,), "diamante": tuple(range(0, 100, 10))}
+
+
+def test_cabe_no_espaco_igual_a_verificacao_celula_a_celula():
+    packer = FlexiblePacking(200, 100, pecas_readme(), margem=1)
+    packer.empacotar()
+    ocupado = packer.grid.densa()
+    rng = random.Random(0)
+
+    for _ in range(400):
+        peca = dict(rng.choice(pecas_readme()), rotacao=0)
+        peca["rotacao"] = rng.choice(ROTACOES[peca["tipo"]])
+        x, y = rng.randrange(-3, 200), rng.randrange(-3, 100)
+        esperado = dentro_referencia(peca, x, y, 200, 100, 1) and not any(
+            ocupado[i, j] for i, j in pegada_referencia(peca, x, y, 1) if 0 <= i < 200 and 0 <= j < 100)
+        assert packer.cabe_no_espaco(peca, x, y) == esperado, (peca, x, y)
+
+
+def test_marcar_ocupacao_igual_a_marcacao_celula_a_celula():
+    packer = FlexiblePacking(200, 100, [], margem=1)
+    layout = []
+    for peca, rotacao in zip(pecas_readme(), (0, 90, 0, 90, 0, 0, 90, 0, 30, 70, 0, 0)):
+        peca["rotacao"] = rotacao
+        packer.marcar_ocupacao(peca)
+        layout.append(peca)
+
+    assert (packer.grid.densa() == (contagem_pegadas(layout, 200, 100, 1) > 0)).all()
+
+
+@pytest.mark.parametrize("varredura", VARREDURAS)
+def test_layout_sem_sobreposicao(varredura):
+    packer = FlexiblePacking(200, 100, pecas_readme(), margem=1, **opcoes_varredura(varredura))
+    layout = packer.empacotar()
+
+    assert len(layout) + len(packer.nao_posicionados) == 12
+    assert_layout_valido(layout, 200, 100)
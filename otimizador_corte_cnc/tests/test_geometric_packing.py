@@ -0,0 +1,32 @@
+from benchmarks.instancias import instancia_mista, instancia_readme
+from common.geometry import colidem, dentro_da_chapa, forma_da_peca, transladar
+from geometric_packing import GeometricPacking
+from helpers import VARREDURAS, opcoes_varredura
+import pytest
+
+
+@pytest.mark.parametrize("varredura", VARREDURAS)
+def test_layout_sem_sobreposicao_geometrica(varredura):
+    for instancia in (instancia_readme(1), instancia_readme(2), instancia_mista(40)):
+        recortes = [dict(peca) for peca in instancia.recortes]
+        packer = GeometricPacking(instancia.largura, instancia.altura, recortes, margem=1, **opcoes_varredura(varredura))
+        layout = packer.empacotar()
+        formas = [transladar(forma_da_peca(peca), peca["x"], peca["y"]) for peca in layout]
+
+        assert len(layout) + len(packer.nao_posicionados) == len(recortes)
+        assert all(dentro_da_chapa(forma, instancia.largura, instancia.altura, 1) for forma in formas)
+        for i, forma in enumerate(formas):
+            assert not any(colidem(forma, outra, 2) for outra in formas[:i])
+
+
+@pytest.mark.parametrize("crescente", (True, False))
+def test_rejeicao_salta_o_intervalo_da_peca_que_colide(crescente):
+    packer = GeometricPacking(200, 100, [], margem=1)
+    packer.marcar_ocupacao({"tipo": "retangular", "largura": 20, "altura": 10, "x": 50, "y": 1})
+    forma = forma_da_peca({"tipo": "retangular", "largura": 10, "altura": 10})
+
+    # Com 2 * margem de distância, colide com a peça posicionada para x no intervalo aberto (38, 72)
+    proxima = packer.saltar_colisoes(forma, [60, 1], 0, crescente)
+
+    assert proxima == (72 if crescente else 38)
+    assert packer.cabe_no_espaco(None, proxima, 1, forma)
@@ -0,0 +1,19 @@
+from flexible_packing import FlexiblePacking
+from geometric_packing import GeometricPacking
+from multi_sheet_packing import MultiSheetPacking
+import pytest
+
+
+@pytest.mark.parametrize("empacotador", (FlexiblePacking, GeometricPacking))
+def test_peca_transbordada_mantem_a_rotacao_de_entrada(empacotador):
+    retangulo = {"tipo": "retangular", "largura": 58, "altura": 38, "x": 0, "y": 0, "rotacao": 0}
+    diamante = {"tipo": "diamante", "largura": 20, "altura": 30, "x": 0, "y": 0, "rotacao": 30}
+
+    sozinho = empacotador(60, 40, [dict(diamante)], margem=1).empacotar()
+    packer = MultiSheetPacking(60, 40, [dict(retangulo), dict(diamante)], empacotador=empacotador, margem=1)
+    layout = packer.empacotar()
+
+    transbordado = [peca for peca in layout if peca["tipo"] == "diamante"]
+    assert [peca["chapa"] for peca in transbordado] == [1]
+    assert transbordado[0]["rotacao"] == sozinho[0]["rotacao"] == 30
+    assert (transbordado[0]["x"], transbordado[0]["y"]) == (sozinho[0]["x"], sozinho[0]["y"])
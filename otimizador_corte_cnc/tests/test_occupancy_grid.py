@@ -0,0 +1,42 @@
+from common.occupancy_grid import BitPackedGrid, OccupancyGrid
+from common.packing_base import PackingBase
+from flexible_packing import FlexiblePacking
+from helpers import VARREDURAS, opcoes_varredura, pecas_readme
+import random
+import pytest
+
+_base = PackingBase()
+
+
+def test_grid_compacto_igual_ao_grid_de_bytes():
+    # Altura que não é múltipla de 8, para cobrir o último byte parcial de cada coluna
+    grids = (OccupancyGrid(61, 37), BitPackedGrid(61, 37))
+    rng = random.Random(0)
+    pecas = pecas_readme()
+
+    for passo in range(300):
+        peca = dict(rng.choice(pecas), rotacao=rng.choice((0, 30, 90)))
+        peca["largura"], peca["altura"] = rng.randint(1, 30), rng.randint(1, 30)
+        peca["r"] = rng.randint(1, 6)
+        stamp = _base.get_stamp(peca, 1)
+        x, y = rng.randrange(-8, 65), rng.randrange(-8, 41)
+
+        assert grids[0].colide(stamp, x, y) == grids[1].colide(stamp, x, y)
+        assert grids[0].sobreposicao(stamp, x, y) == grids[1].sobreposicao(stamp, x, y)
+        if passo % 10 == 0:
+            for grid in grids:
+                grid.marcar(stamp, x, y)
+            assert (grids[0].densa() == grids[1].densa()).all()
+            assert grids[0].area_ocupada() == grids[1].area_ocupada()
+            assert (grids[0].integral() == grids[1].integral()).all()
+            for eixo in (0, 1):
+                for crescente in (True, False):
+                    assert grids[0].primeira_linha_livre(eixo, crescente) == grids[1].primeira_linha_livre(eixo, crescente)
+
+
+@pytest.mark.parametrize("varredura", VARREDURAS)
+def test_layout_com_grid_compacto_igual(varredura):
+    layouts = [FlexiblePacking(200, 100, pecas_readme(), margem=1, grade_compacta=compacta, **opcoes_varredura(varredura)).empacotar()
+               for compacta in (False, True)]
+
+    assert layouts[0] == layouts[1]
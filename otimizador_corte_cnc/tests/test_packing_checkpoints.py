@@ -0,0 +1,68 @@
+from common.instrumentation import Instrumentacao
+from common.packing_checkpoints import PackingCheckpoints
+from flexible_packing import FlexiblePacking
+from helpers import pecas_readme
+import random
+import pytest
+
+
+@pytest.mark.parametrize("opcoes", ({}, {"grade_compacta": True}, {"fator_reducao": 4}, {"priorizar_horizontal": False}))
+def test_empacotamento_retomado_igual_ao_completo(opcoes):
+    checkpoints = PackingCheckpoints()
+    instrumentacao = Instrumentacao()
+    rng = random.Random(0)
+    pecas = pecas_readme()
+
+    # Cada ordem mantém um prefixo da anterior (inteira, no corte 12) e embaralha o restante
+    ordens = [list(range(12))]
+    for corte in (7, 12, 3):
+        resto = ordens[-1][corte:]
+        rng.shuffle(resto)
+        ordens.append(ordens[-1][:corte] + resto)
+
+    for ordem in ordens:
+        retomado = FlexiblePacking(200, 100, [dict(pecas[i]) for i in ordem], margem=1, checkpoints=checkpoints,
+                                   instrumentacao=instrumentacao, **opcoes)
+        completo = FlexiblePacking(200, 100, [dict(pecas[i]) for i in ordem], margem=1, **opcoes)
+
+        assert retomado.empacotar() == completo.empacotar()
+        assert retomado.nao_posicionados == completo.nao_posicionados
+        assert (retomado.grid.densa() == completo.grid.densa()).all()
+        assert [peca["rotacao"] for peca in retomado.recortes] == [peca["rotacao"] for peca in completo.recortes]
+
+    # O embaralhamento pode manter peças depois do corte, então os prefixos comuns podem ser mais longos
+    assert instrumentacao.contadores["pecas_retomadas"] >= 7 + 12 + 3
+
+
+def contar_instantaneos(packer):
+    """ Substitui grid.instantaneo do empacotador por uma versão que conta as cópias do grid. """
+
+    copias = []
+    original = packer.grid.instantaneo
+    packer.grid.instantaneo = lambda: copias.append(1) or original()
+    return copias
+
+
+def test_aceita_somente_no_sem_checkpoint_dentro_do_orcamento():
+    checkpoints = PackingCheckpoints(orcamento_bytes=1000)
+    packer = FlexiblePacking(10, 10, pecas_readme()[:1], margem=1)
+    packer.empacotar()
+    _, raiz = checkpoints.buscar(packer.contexto_checkpoint(), [])
+    no = checkpoints.filho(raiz, checkpoints.chave_peca(packer.recortes[0]))
+
+    assert checkpoints.aceita(no, 1000)
+    assert not checkpoints.aceita(no, 1001)
+    checkpoints.guardar(no, packer.criar_checkpoint([(0, None, None)], [False]))
+    assert not checkpoints.aceita(no, 1)
+
+
+def test_grid_acima_do_orcamento_desativa_checkpoints():
+    pecas = pecas_readme()
+    packer = FlexiblePacking(200, 100, [dict(peca) for peca in pecas], margem=1,
+                             checkpoints=PackingCheckpoints(orcamento_bytes=200 * 100 - 1))
+    copias = contar_instantaneos(packer)
+    completo = FlexiblePacking(200, 100, [dict(peca) for peca in pecas], margem=1)
+
+    assert packer.empacotar() == completo.empacotar()
+    assert copias == []
+    assert packer.checkpoints.raizes == {}
@@ -0,0 +1,17 @@
+from common.rotation import ANGULOS_ROTACAO, caixa_rotacionada, deslocamentos_vertices
+import math
+import pytest
+
+
+@pytest.mark.parametrize("rotacao", ANGULOS_ROTACAO + (45, 135))
+def test_tabelas_de_rotacao_iguais_ao_calculo_direto(rotacao):
+    angulo = math.radians(rotacao)
+    seno, cosseno = math.sin(angulo), math.cos(angulo)
+
+    for largura, altura in ((29, 48), (60, 8), (1, 1), (139, 29)):
+        caixa = (int(round(abs(largura * cosseno) + abs(altura * seno))), int(round(abs(largura * seno) + abs(altura * cosseno))))
+        assert caixa_rotacionada(largura, altura, rotacao) == caixa
+
+        vertices = ((0.0, -altura / 2), (largura / 2, 0.0), (0.0, altura / 2), (-largura / 2, 0.0))
+        assert deslocamentos_vertices(largura, altura, rotacao) == tuple(
+            (dx * cosseno - dy * seno, dx * seno + dy * cosseno) for dx, dy in vertices)
@@ -0,0 +1,28 @@
+from common.packing_base import PackingBase, _rasterizar_diamante, rasterizar_recorte
+from helpers import pecas_readme, pegada_referencia
+import pytest
+
+_base = PackingBase()
+
+
+def celulas_do_stamp(stamp, x, y):
+    """ Células cobertas pelo stamp na posição (x, y). """
+
+    return {(x + stamp.dx + i, y + stamp.dy + j) for i, j in zip(*stamp.mask.nonzero())}
+
+
+@pytest.mark.parametrize("margem", (0, 1, 3))
+@pytest.mark.parametrize("rotacao", (0, 30, 90))
+def test_stamp_igual_a_rasterizacao_de_referencia(margem, rotacao):
+    for peca in pecas_readme():
+        if peca["tipo"] != "circular":
+            peca["rotacao"] = rotacao
+        assert celulas_do_stamp(_base.get_stamp(peca, margem), 7, 5) == set(pegada_referencia(peca, 7, 5, margem)), peca
+
+
+def test_stamp_do_diamante_compartilhado_entre_margens():
+    _rasterizar_diamante.cache_clear()
+    stamps = {id(rasterizar_recorte("diamante", 29, 48, None, 40, margem)) for margem in range(5)}
+
+    assert len(stamps) == 1
+    assert _rasterizar_diamante.cache_info().currsize == 1